@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import User, School, StudentProfile, TeacherProfile
+from .models import User, School, StudentProfile, TeacherProfile, OutboundEmail, StudentCodeCounter
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 
 @admin.register(User)
@@ -9,3 +9,5 @@ class UserAdmin(BaseUserAdmin):
 admin.site.register(School)
 admin.site.register(StudentProfile)
 admin.site.register(TeacherProfile)
+admin.site.register(OutboundEmail)
+admin.site.register(StudentCodeCounter)
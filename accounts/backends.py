@@ -0,0 +1,44 @@
+# accounts/backends.py
+from django.contrib.auth.backends import ModelBackend
+from django.db.models import IntegerField, Value
+from django.db.models.functions import Lower
+
+from .models import User, StudentProfile
+
+
+def find_login_user(identifier):
+    """
+    The user whose username is `identifier`, else the student whose code
+    matches it case-insensitively, in one query. Each half of the UNION
+    is served by an index (username's unique index, student_code_lower_idx).
+    """
+    by_username = User.objects.filter(username=identifier).annotate(
+        matched_by=Value(0, output_field=IntegerField())
+    )
+    code_owner = StudentProfile.objects.alias(code=Lower('student_code')).filter(code=identifier.lower())
+    by_code = User.objects.filter(pk__in=code_owner.values('user_id')).annotate(
+        matched_by=Value(1, output_field=IntegerField())
+    )
+    return by_username.union(by_code).order_by('matched_by').first()
+
+
+class UsernameOrStudentCodeBackend(ModelBackend):
+    """
+    Log in with a username or a student code. The password is hashed
+    exactly once per attempt: against the matched user, or (as
+    ModelBackend does) against a throwaway user when nobody matches, so
+    unknown logins take as long as wrong passwords.
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(User.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        user = find_login_user(username.strip())
+        if user is None:
+            User().set_password(password)
+            return None
+        if user.check_password(password) and self.user_can_authenticate(user):
+            return user
+        return None
@@ -0,0 +1,76 @@
+# accounts/management/commands/bench_login.py
+import time
+
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.hashers import get_hasher, make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from accounts.backends import UsernameOrStudentCodeBackend
+from accounts.models import School, StudentProfile, User, assign_student_codes
+
+PASSWORD = "morning-bell"
+
+
+def _legacy_login(identifier, password):
+    """The old login_view flow: username first, then a student-code lookup and a second hash."""
+    backend = ModelBackend()
+    user = backend.authenticate(None, username=identifier, password=password)
+    if user is None:
+        try:
+            student = StudentProfile.objects.select_related('user').get(student_code=identifier)
+            user = backend.authenticate(None, username=student.user.username, password=password)
+        except StudentProfile.DoesNotExist:
+            user = None
+    return user
+
+
+class Command(BaseCommand):
+    help = "Benchmark login throughput (old two-step flow vs the student-code backend). Writes nothing."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=1000, help="Temporary students to create.")
+        parser.add_argument('--logins', type=int, default=20, help="Logins timed per scenario.")
+
+    def handle(self, *args, **options):
+        hasher = get_hasher()
+        self.stdout.write(f"Hasher: {hasher.algorithm}, {getattr(hasher, 'iterations', '?')} iterations")
+
+        with transaction.atomic():
+            profiles = self._make_students(options['students'])
+            picks = [profiles[i * len(profiles) // options['logins']] for i in range(options['logins'])]
+            scenarios = [
+                ('username', [(p.user.username, PASSWORD) for p in picks]),
+                ('student code', [(p.student_code, PASSWORD) for p in picks]),
+                ('wrong password', [(p.student_code, "nope") for p in picks]),
+            ]
+            backend = UsernameOrStudentCodeBackend()
+
+            self.stdout.write(f"{'scenario':>15} {'old ms/login':>13} {'new ms/login':>13} {'new logins/s':>13}")
+            for name, attempts in scenarios:
+                old = self._time(lambda: [_legacy_login(i, pw) for i, pw in attempts])
+                new = self._time(lambda: [backend.authenticate(None, username=i, password=pw) for i, pw in attempts])
+                n = len(attempts)
+                self.stdout.write(f"{name:>15} {old / n * 1e3:>13.1f} {new / n * 1e3:>13.1f} {n / new:>13.1f}")
+            transaction.set_rollback(True)
+
+    @staticmethod
+    def _make_students(count):
+        school = School.objects.create(name="Login Benchmark School", school_code="lbs")
+        password = make_password(PASSWORD)
+        users = User.objects.bulk_create([
+            User(username=f"lbs-student-{i}", password=password, is_student=True, school=school)
+            for i in range(count)
+        ])
+        profiles = [
+            StudentProfile(user=user, roll_no=str(i % 40 + 1), class_name=str(i // 200 + 1), section="abcde"[i // 40 % 5])
+            for i, user in enumerate(users)
+        ]
+        assign_student_codes(school, profiles)
+        return StudentProfile.objects.bulk_create(profiles)
+
+    @staticmethod
+    def _time(fn):
+        start = time.perf_counter()
+        fn()
+        return time.perf_counter() - start
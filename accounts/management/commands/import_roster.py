@@ -0,0 +1,49 @@
+# accounts/management/commands/import_roster.py
+import csv
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.models import School
+from accounts.roster import import_roster
+from classroom.models import VirtualClassroom
+
+
+class Command(BaseCommand):
+    help = "Create a school's students from a roster CSV (see accounts.roster.ROSTER_COLUMNS)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('school_code')
+        parser.add_argument('csv_file')
+        parser.add_argument('--classroom', type=int,
+                            help="Put every student in this VirtualClassroom id (default: match class_name/section).")
+        parser.add_argument('--default-password', help="Password for rows that don't give one.")
+
+    def handle(self, *args, **options):
+        school = School.objects.filter(school_code=options['school_code']).first()
+        if school is None:
+            raise CommandError(f"Unknown school '{options['school_code']}'.")
+
+        classroom = None
+        if options['classroom']:
+            classroom = VirtualClassroom.objects.filter(pk=options['classroom'], school=school).first()
+            if classroom is None:
+                raise CommandError(f"School '{school.school_code}' has no classroom {options['classroom']}.")
+
+        try:
+            with open(options['csv_file'], newline='', encoding='utf-8-sig') as fh:
+                rows = list(csv.DictReader(fh))
+        except (OSError, UnicodeDecodeError, csv.Error) as e:
+            raise CommandError(f"Could not read {options['csv_file']}: {e}")
+
+        started = time.perf_counter()
+        result = import_roster(school, rows, classroom=classroom, default_password=options['default_password'])
+        elapsed = time.perf_counter() - started
+
+        for rejected in result['rejected']:
+            self.stderr.write(f"  row {rejected['row']}: {rejected['error']}")
+        if result['unassigned']:
+            self.stdout.write(f"{result['unassigned']} students have no matching classroom.")
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(result['created'])} students created, {len(result['rejected'])} rows rejected in {elapsed:.2f}s."
+        ))
@@ -0,0 +1,28 @@
+# accounts/management/commands/send_queued_mail.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from accounts.utils import deliver_queued_emails
+
+
+class Command(BaseCommand):
+    help = "Deliver queued outbound emails (OTPs, parent alerts). Use --loop to run as a worker."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help="Keep polling the queue until interrupted.")
+        parser.add_argument('--interval', type=float, default=2.0, help="Seconds to sleep when the queue is empty.")
+        parser.add_argument('--batch-size', type=int, default=None)
+
+    def handle(self, *args, **options):
+        while True:
+            # Drain everything that is currently due
+            while True:
+                sent, retried, dead = deliver_queued_emails(options['batch_size'])
+                if not (sent or retried or dead):
+                    break
+                self.stdout.write(f"sent={sent} retried={retried} dead={dead}")
+
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
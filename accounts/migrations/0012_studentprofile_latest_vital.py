@@ -0,0 +1,35 @@
+# Generated by Django 4.2 on 2026-10-18 16:28
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('health', '0001_initial'),
+        ('accounts', '0011_remove_studentprofile_image'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='studentprofile',
+            name='latest_label',
+            field=models.CharField(blank=True, max_length=50),
+        ),
+        migrations.AddField(
+            model_name='studentprofile',
+            name='latest_recorded_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='studentprofile',
+            name='latest_score',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='studentprofile',
+            name='latest_vital',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='health.vitalrecord'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2 on 2026-10-18 17:05
+
+from django.db import migrations, models
+
+
+def seed_counters(apps, schema_editor):
+    """Start each base code's counter after the highest code already issued for it."""
+    StudentProfile = apps.get_model('accounts', 'StudentProfile')
+    StudentCodeCounter = apps.get_model('accounts', 'StudentCodeCounter')
+
+    issued = {}
+    for code in StudentProfile.objects.exclude(student_code='').values_list('student_code', flat=True).iterator():
+        base, _, number = code.rpartition('-')
+        if not (base and number.isdigit()):
+            base, number = code, 1
+        issued[base] = max(issued.get(base, 0), int(number))
+    StudentCodeCounter.objects.bulk_create(
+        [StudentCodeCounter(base_code=base, last_issued=last) for base, last in issued.items()], batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0013_outboundemail'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StudentCodeCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('base_code', models.CharField(max_length=50, unique=True)),
+                ('last_issued', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(seed_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2 on 2026-10-18 17:07
+
+from django.db import migrations, models
+import django.db.models.functions.text
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0014_studentcodecounter'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='studentprofile',
+            index=models.Index(django.db.models.functions.text.Lower('student_code'), name='student_code_lower_idx'),
+        ),
+    ]
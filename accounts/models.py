@@ -1,4 +1,5 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models.functions import Lower
 from django.contrib.auth.models import AbstractUser
 from django.utils import timezone
 import random
@@ -34,6 +35,102 @@ class User(AbstractUser):
         return otp
 
 # ---------------------- Student Profile ----------------------
+def school_code_prefix(school):
+    return (school.school_code or school.name[:3]).lower()
+
+
+def student_code_base(school, class_name, section, roll_no):
+    """e.g. 'pps5a07': school code, class, section and 2-digit roll number."""
+    class_code = str(class_name).lower().replace(" ", "")
+    section_code = str(section).lower()
+    roll_code = str(roll_no).zfill(2)
+    return f"{school_code_prefix(school)}{class_code}{section_code}{roll_code}"
+
+
+class StudentCodeCounter(models.Model):
+    """How many student codes have been issued for a base code ('pps5a07')."""
+    base_code = models.CharField(max_length=50, unique=True)
+    last_issued = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.base_code}: {self.last_issued}"
+
+
+def _numbered_code(base, number):
+    return base if number == 1 else f"{base}-{number}"
+
+
+def _code_has_base(code, base):
+    """True for `base` itself and its numbered variants ('pps5a07-3')."""
+    if code == base:
+        return True
+    prefix, _, number = code.rpartition('-')
+    return prefix == base and number.isdigit()
+
+
+def allocate_student_codes(bases):
+    """
+    Return a fresh student code for each base code in `bases`, in order
+    (duplicates get consecutive numbers: 'pps5a07', 'pps5a07-2', ...).
+
+    Counters are row-locked with select_for_update, so concurrent
+    registrations can't be handed the same code; the queries don't depend
+    on how many codes are requested. Codes that already exist without
+    having gone through a counter are skipped.
+    """
+    bases = list(bases)
+    if not bases:
+        return []
+    wanted = set(bases)
+    with transaction.atomic():
+        StudentCodeCounter.objects.bulk_create(
+            [StudentCodeCounter(base_code=base) for base in wanted], ignore_conflicts=True
+        )
+        counters = {c.base_code: c for c in StudentCodeCounter.objects.select_for_update().filter(base_code__in=wanted)}
+
+        def issue(base):
+            counter = counters[base]
+            counter.last_issued += 1
+            return _numbered_code(base, counter.last_issued)
+
+        start = {base: counter.last_issued for base, counter in counters.items()}
+        codes, taken = list(bases), set()
+        recheck = wanted
+        while True:
+            for base in recheck:
+                counters[base].last_issued = start[base]
+            for i, base in enumerate(bases):
+                if base in recheck:
+                    code = issue(base)
+                    while code in taken:
+                        code = issue(base)
+                    codes[i] = code
+            # Codes already in use (e.g. set by hand) are skipped: number those bases again around them
+            clashes = set(StudentProfile.objects.filter(
+                student_code__in=[code for base, code in zip(bases, codes) if base in recheck]
+            ).values_list('student_code', flat=True))
+            if not clashes:
+                break
+            taken |= clashes
+            recheck = {base for base, code in zip(bases, codes) if code in clashes}
+        StudentCodeCounter.objects.bulk_update(counters.values(), ['last_issued'])
+    return codes
+
+
+def assign_student_codes(school, profiles):
+    """
+    Set student_code on many unsaved profiles of one school with a single
+    allocate_student_codes call (same scheme as StudentProfile.save()).
+    Used for bulk_create.
+    """
+    codes = allocate_student_codes(
+        student_code_base(school, p.class_name, p.section, p.roll_no) for p in profiles
+    )
+    for profile, code in zip(profiles, codes):
+        profile.student_code = code
+    return profiles
+
+
 class StudentProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='student_profile')
     roll_no = models.CharField(max_length=50)
@@ -48,21 +145,28 @@ class StudentProfile(models.Model):
     student_code = models.CharField(max_length=50, unique=True, blank=True)
     created_at = models.DateTimeField(default=timezone.now)
 
+    # Snapshot of the most recent VitalRecord, kept in sync by health.signals
+    # so dashboards can read one row per student instead of the full history.
+    latest_vital = models.ForeignKey(
+        'health.VitalRecord', on_delete=models.SET_NULL, null=True, blank=True, related_name='+'
+    )
+    latest_score = models.FloatField(null=True, blank=True)
+    latest_label = models.CharField(max_length=50, blank=True)
+    latest_recorded_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Case-insensitive student-code login (accounts.backends)
+            models.Index(Lower('student_code'), name='student_code_lower_idx'),
+        ]
+
     def save(self, *args, **kwargs):
         if self.user and self.user.school:
-            school_code = (self.user.school.school_code or self.user.school.name[:3]).lower()
-            class_code = str(self.class_name).lower().replace(" ", "")
-            section_code = str(self.section).lower()
-            roll_code = str(self.roll_no).zfill(2)
-
-            base_code = f"{school_code}{class_code}{section_code}{roll_code}"
-
-            similar_codes = StudentProfile.objects.filter(student_code__startswith=base_code).exclude(pk=self.pk)
-            if similar_codes.exists():
-                count = similar_codes.count() + 1
-                self.student_code = f"{base_code}-{count}"
-            else:
-                self.student_code = base_code
+            base_code = student_code_base(self.user.school, self.class_name, self.section, self.roll_no)
+
+            # Plain profile edits keep their code; only a new school/class/section/roll needs one
+            if not _code_has_base(self.student_code, base_code):
+                self.student_code = allocate_student_codes([base_code])[0]
         super().save(*args, **kwargs)
 
     def __str__(self):
@@ -104,3 +208,39 @@ class JoinRequest(models.Model):
     def __str__(self):
         status = "✅ Approved" if self.approved else "⏳ Pending"
         return f"{self.student.user.username} → {self.teacher.username} ({status})"
+
+
+# ---------------------- Outbound Email Queue ----------------------
+class OutboundEmail(models.Model):
+    """
+    An email waiting to be delivered by `manage.py send_queued_mail`.
+    Views enqueue (accounts.utils.enqueue_email) instead of calling send_mail,
+    so a slow mail provider never blocks a request.
+    """
+    PENDING = 'pending'
+    SENT = 'sent'
+    DEAD = 'dead'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (SENT, 'Sent'),
+        (DEAD, 'Dead-lettered'),
+    ]
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=255, blank=True)
+    to = models.JSONField(default=list)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbound_email_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} → {', '.join(self.to)} ({self.status})"
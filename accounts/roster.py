@@ -0,0 +1,189 @@
+# accounts/roster.py
+"""
+Bulk student onboarding from a roster (CSV rows or JSON objects).
+
+Every row is validated first; the accepted ones are then created with a
+handful of bulk queries in one transaction: Users, StudentProfiles (codes
+from one allocate_student_codes call) and class memberships.
+Signals don't fire for bulk_create, so no per-student profile creation,
+JoinRequest or Notification happens; the class's leaderboard is marked
+dirty instead.
+"""
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import transaction
+from django.utils.dateparse import parse_date
+from django.utils.text import slugify
+
+from .models import User, StudentProfile, assign_student_codes
+
+ROSTER_COLUMNS = (
+    'username', 'first_name', 'last_name', 'email', 'password', 'roll_no', 'class_name', 'section',
+    'dob', 'height_cm', 'weight_kg', 'parent_email', 'personal_contact', 'address',
+)
+
+
+def _clean(value):
+    return str(value).strip() if value is not None else ''
+
+
+def _clean_row(row, classroom):
+    """Return (user fields, profile fields, password) for a roster row, or raise ValueError."""
+    roll_no = _clean(row.get('roll_no'))
+    if not roll_no:
+        raise ValueError("roll_no is required.")
+    class_name = _clean(row.get('class_name')) or (classroom.class_name if classroom else '')
+    section = _clean(row.get('section')) or (classroom.section if classroom else '')
+    if not class_name or not section:
+        raise ValueError("class_name and section are required.")
+    for field, value in (('roll_no', roll_no), ('class_name', class_name), ('section', section)):
+        max_length = StudentProfile._meta.get_field(field).max_length
+        if len(value) > max_length:
+            raise ValueError(f"{field} must be at most {max_length} characters.")
+    if classroom and (class_name.lower(), section.lower()) != (classroom.class_name.lower(), classroom.section.lower()):
+        raise ValueError(f"Row is for {class_name}-{section}, not {classroom.class_name}-{classroom.section}.")
+
+    email = _clean(row.get('email'))
+    parent_email = _clean(row.get('parent_email'))
+    for value in (email, parent_email):
+        if value:
+            try:
+                validate_email(value)
+            except ValidationError:
+                raise ValueError(f"Invalid email '{value}'.")
+
+    dob = _clean(row.get('dob'))
+    if dob:
+        try:
+            dob = parse_date(dob)
+        except ValueError:
+            dob = None
+        if dob is None:
+            raise ValueError("dob must be YYYY-MM-DD.")
+
+    measurements = {}
+    for field in ('height_cm', 'weight_kg'):
+        value = _clean(row.get(field))
+        try:
+            measurements[field] = float(value) if value else None
+        except ValueError:
+            raise ValueError(f"{field} must be a number.")
+
+    username = _clean(row.get('username'))
+    if username:
+        try:
+            # The model's own rules: allowed characters and max_length=150
+            User._meta.get_field('username').run_validators(username)
+        except ValidationError as e:
+            raise ValueError(f"Invalid username '{username[:40]}': {' '.join(e.messages)}")
+
+    user_fields = {
+        'username': username,
+        'first_name': _clean(row.get('first_name'))[:150],
+        'last_name': _clean(row.get('last_name'))[:150],
+        'email': email,
+    }
+    profile_fields = {
+        'roll_no': roll_no,
+        'class_name': class_name,
+        'section': section,
+        'dob': dob or None,
+        'parent_contact': parent_email or None,
+        'personal_contact': _clean(row.get('personal_contact'))[:20],
+        'address': _clean(row.get('address')),
+        **measurements,
+    }
+    return user_fields, profile_fields, _clean(row.get('password'))
+
+
+def _default_username(school, profile_fields):
+    return slugify(f"{school.school_code}-{profile_fields['class_name']}{profile_fields['section']}-"
+                   f"{profile_fields['roll_no']}")[:150]
+
+
+def import_roster(school, rows, classroom=None, default_password=None):
+    """
+    Create students of `school` from roster rows (dicts with ROSTER_COLUMNS keys).
+    With `classroom`, every student joins it; otherwise each joins the
+    school's class matching its class_name/section, if there is one.
+
+    Rows without a password get `default_password` (hashed once for the
+    whole roster), or an unusable password if that is None too.
+    Returns {'created': [StudentProfile], 'rejected': [{'row', 'error'}], 'unassigned': int}.
+    """
+    from classroom.models import VirtualClassroom
+    from health.leaderboard import mark_leaderboard_dirty
+
+    rejected, accepted = [], []
+    for row_no, row in enumerate(rows, 1):
+        if not isinstance(row, dict):
+            rejected.append({'row': row_no, 'error': "Row must be an object."})
+            continue
+        try:
+            user_fields, profile_fields, password = _clean_row(row, classroom)
+        except ValueError as e:
+            rejected.append({'row': row_no, 'error': str(e)})
+            continue
+        user_fields['username'] = user_fields['username'] or _default_username(school, profile_fields)
+        accepted.append((row_no, user_fields, profile_fields, password))
+
+    # Usernames must be new and unique within the roster: one query for all of them
+    usernames = [user_fields['username'] for _, user_fields, _, _ in accepted]
+    existing = set(User.objects.filter(username__in=usernames).values_list('username', flat=True))
+    seen, unique_rows = set(), []
+    for entry in accepted:
+        username = entry[1]['username']
+        if username in existing or username in seen:
+            rejected.append({'row': entry[0], 'error': f"Username '{username}' is already taken."})
+            continue
+        seen.add(username)
+        unique_rows.append(entry)
+    rejected.sort(key=lambda r: r['row'])
+
+    # Password hashing is deliberately slow: hash the shared default only once
+    shared_hash = make_password(default_password) if default_password else make_password(None)
+
+    if classroom:
+        classes = {(classroom.class_name.lower(), classroom.section.lower()): classroom}
+    else:
+        classes = {
+            (vc.class_name.lower(), vc.section.lower()): vc
+            for vc in VirtualClassroom.objects.filter(school=school)
+        }
+
+    users = [
+        User(is_student=True, school=school,
+             password=make_password(password) if password else shared_hash, **user_fields)
+        for _, user_fields, _, password in unique_rows
+    ]
+    with transaction.atomic():
+        User.objects.bulk_create(users, batch_size=500)
+        if any(user.pk is None for user in users):
+            # Backends that can't return ids from bulk inserts
+            ids = dict(User.objects.filter(username__in=[u.username for u in users]).values_list('username', 'id'))
+            for user in users:
+                user.pk = ids[user.username]
+
+        profiles = [
+            StudentProfile(user=user, **profile_fields)
+            for user, (_, _, profile_fields, _) in zip(users, unique_rows)
+        ]
+        assign_student_codes(school, profiles)
+        StudentProfile.objects.bulk_create(profiles, batch_size=500)
+        if any(profile.pk is None for profile in profiles):
+            ids = dict(StudentProfile.objects.filter(user__in=users).values_list('user_id', 'id'))
+            for profile in profiles:
+                profile.pk = ids[profile.user_id]
+
+        Membership = VirtualClassroom.students.through
+        memberships = []
+        for profile in profiles:
+            vc = classes.get((profile.class_name.lower(), profile.section.lower()))
+            if vc is not None:
+                memberships.append(Membership(virtualclassroom_id=vc.pk, studentprofile_id=profile.pk))
+        Membership.objects.bulk_create(memberships, batch_size=1000, ignore_conflicts=True)
+
+    if memberships:
+        mark_leaderboard_dirty(school.pk)
+    return {'created': profiles, 'rejected': rejected, 'unassigned': len(profiles) - len(memberships)}
@@ -1,3 +1,305 @@
-from django.test import TestCase
+import os
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
 
-# Create your tests here.
+from django.core import mail
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from classroom.models import VirtualClassroom
+from .models import School, User, OutboundEmail, StudentProfile, StudentCodeCounter, allocate_student_codes
+from .backends import UsernameOrStudentCodeBackend
+from .roster import import_roster
+from .utils import enqueue_email, deliver_queued_emails, _claim_due_emails
+
+
+class FailingBackend(BaseEmailBackend):
+    """Email backend whose every send fails, for retry/dead-letter tests."""
+
+    def send_messages(self, email_messages):
+        raise ConnectionError("mail provider unavailable")
+
+
+@override_settings(
+    EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+    MAIL_QUEUE_MAX_ATTEMPTS=3,
+    MAIL_QUEUE_BACKOFF_SECONDS=30,
+)
+class MailQueueTests(TestCase):
+
+    def run_worker(self):
+        call_command('send_queued_mail', stdout=StringIO())
+
+    def make_due(self):
+        OutboundEmail.objects.update(next_attempt_at=timezone.now())
+
+    def test_worker_delivers_queued_mail_in_batches(self):
+        for i in range(5):
+            enqueue_email(f"Subject {i}", "Body", [f"parent{i}@example.com"])
+        self.assertEqual(len(mail.outbox), 0)
+
+        with self.settings(MAIL_QUEUE_BATCH_SIZE=2):
+            self.run_worker()
+
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertFalse(OutboundEmail.objects.exclude(status=OutboundEmail.SENT).exists())
+        self.assertEqual(mail.outbox[0].to, ["parent0@example.com"])
+
+    def test_failures_back_off_exponentially_then_dead_letter(self):
+        email = enqueue_email("Alert", "Body", ["parent@example.com"])
+
+        with self.settings(EMAIL_BACKEND='accounts.tests.FailingBackend'):
+            before = timezone.now()
+            self.assertEqual(deliver_queued_emails(), (0, 1, 0))
+            email.refresh_from_db()
+            self.assertEqual(email.attempts, 1)
+            self.assertGreaterEqual(email.next_attempt_at, before + timedelta(seconds=30))
+            self.assertIn("mail provider unavailable", email.last_error)
+
+            # Not due yet: nothing happens
+            self.assertEqual(deliver_queued_emails(), (0, 0, 0))
+
+            self.make_due()
+            before = timezone.now()
+            deliver_queued_emails()
+            email.refresh_from_db()
+            self.assertGreaterEqual(email.next_attempt_at, before + timedelta(seconds=60))
+
+            self.make_due()
+            self.assertEqual(deliver_queued_emails(), (0, 0, 1))
+            email.refresh_from_db()
+            self.assertEqual(email.status, OutboundEmail.DEAD)
+            self.assertEqual(email.attempts, 3)
+
+        # Dead letters are never retried
+        self.make_due()
+        self.run_worker()
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_unreachable_provider_backs_off_the_whole_batch(self):
+        for i in range(3):
+            enqueue_email(f"Subject {i}", "Body", [f"parent{i}@example.com"])
+        before = timezone.now()
+        with patch('accounts.utils.get_connection', side_effect=ConnectionError("no route to provider")):
+            self.assertEqual(deliver_queued_emails(), (0, 3, 0))
+
+        for email in OutboundEmail.objects.all():
+            self.assertEqual((email.status, email.attempts), (OutboundEmail.PENDING, 1))
+            self.assertIn("no route to provider", email.last_error)
+            # The retry delay, not the lease, decides when it is due again
+            self.assertLess(email.next_attempt_at, before + timedelta(seconds=60))
+
+        self.make_due()
+        self.assertEqual(deliver_queued_emails(), (3, 0, 0))
+
+    def test_enqueue_only_by_default(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            email = enqueue_email("OTP", "Body", ["teacher@example.com"])
+        self.assertEqual(len(mail.outbox), 0)
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), (OutboundEmail.PENDING, 0))
+
+    @override_settings(MAIL_SEND_ON_COMMIT=True)
+    def test_send_on_commit_claims_the_email(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            email = enqueue_email("OTP", "Body", ["teacher@example.com"])
+            self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(len(mail.outbox), 1)
+        email.refresh_from_db()
+        self.assertEqual(email.status, OutboundEmail.SENT)
+        # The worker finds nothing left to send
+        self.assertEqual(deliver_queued_emails(), (0, 0, 0))
+
+        # Already claimed by a worker: the on-commit send leaves it alone
+        with self.captureOnCommitCallbacks() as callbacks:
+            email = enqueue_email("OTP", "Body", ["teacher@example.com"])
+        self.assertEqual(len(_claim_due_emails(10)), 1)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(len(mail.outbox), 1)
+
+        with self.settings(EMAIL_BACKEND='accounts.tests.FailingBackend'):
+            with self.captureOnCommitCallbacks(execute=True):
+                email = enqueue_email("OTP", "Body", ["teacher@example.com"])
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), (OutboundEmail.PENDING, 1))
+
+    def test_quick_checkup_alert_only_enqueues(self):
+        school = School.objects.create(name="Pine School", school_code="pps")
+        teacher = User.objects.create_user("teacher", password="pw", is_teacher=True, school=school)
+        student = User.objects.create_user("student", password="pw", is_student=True, school=school).student_profile
+        student.roll_no, student.class_name, student.section = "1", "5", "a"
+        student.parent_contact = "parent@example.com"
+        student.save()
+        vc = VirtualClassroom.objects.create(school=school, teacher=teacher, class_name="5", section="a")
+        vc.students.add(student)
+
+        self.client.force_login(teacher)
+        response = self.client.post(reverse('quick_checkup', args=[vc.pk]) + "?idx=0", {'alert': '1'})
+
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(OutboundEmail.objects.get().to, ["parent@example.com"])
+
+        self.run_worker()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn("Health Alert", mail.outbox[0].subject)
+
+
+class RosterImportTests(TestCase):
+
+    def setUp(self):
+        self.school = School.objects.create(name="Pine School", school_code="pps")
+        self.teacher = User.objects.create_user("teacher", password="pw", is_teacher=True, school=self.school)
+        self.vc = VirtualClassroom.objects.create(school=self.school, teacher=self.teacher, class_name="5", section="a")
+        # An existing student already holds the base code for roll 7
+        existing = User.objects.create_user("old7", password="pw", is_student=True, school=self.school).student_profile
+        existing.roll_no, existing.class_name, existing.section = "7", "5", "a"
+        existing.save()
+
+    def test_import_creates_users_profiles_and_memberships_in_bulk(self):
+        rows = [{'roll_no': str(i), 'first_name': f"Kid{i}", 'dob': '2015-01-02'} for i in range(1, 51)]
+        rows.append({'roll_no': '7', 'username': 'old7'})
+        rows.append({'first_name': 'No roll'})
+
+        with self.assertNumQueries(12):
+            result = import_roster(self.school, rows, classroom=self.vc, default_password="welcome1")
+
+        self.assertEqual(len(result['created']), 50)
+        self.assertEqual([r['row'] for r in result['rejected']], [51, 52])
+        self.assertEqual(self.vc.students.count(), 50)
+
+        codes = list(StudentProfile.objects.values_list('student_code', flat=True))
+        self.assertEqual(len(codes), len(set(codes)))
+        self.assertTrue(StudentProfile.objects.filter(student_code='pps5a07-2', roll_no='7').exists())
+        user = User.objects.get(username='pps-5a-1')
+        self.assertTrue(user.is_student)
+        self.assertTrue(user.check_password("welcome1"))
+
+    def test_usernames_follow_the_user_model_rules(self):
+        rows = [
+            {'roll_no': '1', 'username': 'asha.k'},
+            {'roll_no': '2', 'username': 'bad name!'},
+            {'roll_no': '3', 'username': 'x' * 151},
+            {'roll_no': '4', 'username': 'y' * 150},
+        ]
+        result = import_roster(self.school, rows, classroom=self.vc)
+        self.assertEqual([r['row'] for r in result['rejected']], [2, 3])
+        self.assertIn("Invalid username", result['rejected'][0]['error'])
+        self.assertEqual(sorted(p.user.username for p in result['created']), ['asha.k', 'y' * 150])
+
+    def test_profile_fields_longer_than_the_model_allows_are_rejected(self):
+        rows = [
+            {'roll_no': '1' * 51, 'class_name': '5', 'section': 'a'},
+            {'roll_no': '2', 'class_name': '5' * 51, 'section': 'a'},
+            {'roll_no': '3', 'class_name': '5', 'section': 'a' * 11},
+            {'roll_no': '4', 'class_name': '5', 'section': 'a' * 10},
+        ]
+        result = import_roster(self.school, rows)
+        self.assertEqual([r['row'] for r in result['rejected']], [1, 2, 3])
+        self.assertEqual(result['rejected'][2]['error'], "section must be at most 10 characters.")
+        self.assertEqual([p.roll_no for p in result['created']], ['4'])
+
+    def test_default_password_from_json_and_form(self):
+        self.client.force_login(self.teacher)
+        url = reverse('roster_import', args=[self.vc.pk])
+        self.client.post(url, data={'students': [{'roll_no': '1', 'username': 'asha'}], 'default_password': 'json-pw1'},
+                         content_type='application/json')
+        self.assertTrue(User.objects.get(username='asha').check_password('json-pw1'))
+
+        upload = SimpleUploadedFile('roster.csv', b"username,roll_no\nravi,2\n", content_type='text/csv')
+        self.client.post(url, {'file': upload, 'default_password': 'form-pw1'})
+        self.assertTrue(User.objects.get(username='ravi').check_password('form-pw1'))
+
+    def test_teacher_view_and_command(self):
+        self.client.force_login(self.teacher)
+        response = self.client.post(
+            reverse('roster_import', args=[self.vc.pk]),
+            data={'students': [{'roll_no': '1', 'username': 'asha', 'password': 'secret99'}]},
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['students'][0]['student_code'], 'pps5a01')
+        self.assertTrue(User.objects.get(username='asha').check_password('secret99'))
+
+        path = os.path.join(tempfile.mkdtemp(), 'roster.csv')
+        with open(path, 'w') as fh:
+            fh.write("username,roll_no,class_name,section\nravi,2,5,a\nmeera,1,6,b\n")
+        out = StringIO()
+        call_command('import_roster', 'pps', path, stdout=out)
+        self.assertIn("2 students created", out.getvalue())
+        self.assertIn("1 students have no matching classroom", out.getvalue())
+        self.assertTrue(self.vc.students.filter(user__username='ravi').exists())
+
+
+class StudentCodeAllocationTests(TestCase):
+
+    def setUp(self):
+        self.school = School.objects.create(name="Pine School", school_code="pps")
+
+    def make_student(self, username, roll_no, class_name="5", section="a"):
+        profile = User.objects.create_user(username, password="pw", is_student=True, school=self.school).student_profile
+        profile.roll_no, profile.class_name, profile.section = roll_no, class_name, section
+        profile.save()
+        return profile
+
+    def test_codes_are_numbered_per_base_and_edits_keep_them(self):
+        first = self.make_student("a", "7")
+        second = self.make_student("b", "7")
+        self.assertEqual((first.student_code, second.student_code), ("pps5a07", "pps5a07-2"))
+
+        # An edit that doesn't touch the identifying fields allocates nothing
+        first.address = "12 Hill Road"
+        with self.assertNumQueries(1):
+            first.save()
+        self.assertEqual(first.student_code, "pps5a07")
+
+        first.roll_no = "8"
+        first.save()
+        self.assertEqual(first.student_code, "pps5a08")
+        # Codes are never handed out twice, even after the holder moved on
+        self.assertEqual(self.make_student("c", "7").student_code, "pps5a07-3")
+
+    def test_bulk_allocation_skips_codes_taken_outside_the_counters(self):
+        legacy = self.make_student("legacy", "1")
+        StudentProfile.objects.filter(pk=legacy.pk).update(student_code="pps5a02")
+
+        with self.assertNumQueries(7):
+            codes = allocate_student_codes(["pps5a02"] * 3 + ["pps5a03"] * 1000)
+        self.assertEqual(codes[:4], ["pps5a02-2", "pps5a02-3", "pps5a02-4", "pps5a03"])
+        self.assertEqual(len(set(codes)), len(codes))
+        self.assertEqual(StudentCodeCounter.objects.get(base_code="pps5a03").last_issued, 1000)
+
+
+class LoginBackendTests(TestCase):
+
+    def setUp(self):
+        self.school = School.objects.create(name="Pine School", school_code="pps")
+        self.user = User.objects.create_user("kid", password="pw12345", is_student=True, school=self.school)
+        profile = self.user.student_profile
+        profile.roll_no, profile.class_name, profile.section = "7", "5", "a"
+        profile.save()
+        self.backend = UsernameOrStudentCodeBackend()
+
+    def test_username_or_case_insensitive_student_code(self):
+        for identifier in ("kid", "pps5a07", "PPS5A07"):
+            with self.subTest(identifier=identifier), self.assertNumQueries(1):
+                self.assertEqual(self.backend.authenticate(None, username=identifier, password="pw12345"), self.user)
+        self.assertIsNone(self.backend.authenticate(None, username="pps5a07", password="wrong"))
+        self.assertIsNone(self.backend.authenticate(None, username="nobody", password="pw12345"))
+
+    def test_password_is_hashed_once_per_attempt(self):
+        with patch.object(User, 'check_password', autospec=True, return_value=False) as check:
+            self.backend.authenticate(None, username="pps5a07", password="wrong")
+        self.assertEqual(check.call_count, 1)
+
+    def test_login_view_accepts_student_code(self):
+        response = self.client.post(reverse('login'), {'username': 'PPS5A07', 'password': 'pw12345'})
+        self.assertRedirects(response, reverse('health:student_dashboard'), fetch_redirect_response=False)
+        self.assertEqual(int(self.client.session['_auth_user_id']), self.user.pk)
@@ -1,8 +1,126 @@
-from django.core.mail import send_mail
+from datetime import timedelta
+
+from django.core.mail import EmailMessage, get_connection
 from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import OutboundEmail
+
+
+def enqueue_email(subject, message, recipient_list, from_email=None):
+    """
+    Queue an email for `manage.py send_queued_mail` instead of sending it
+    inside the request. Same arguments as django.core.mail.send_mail.
+
+    With settings.MAIL_SEND_ON_COMMIT the email is also tried once when the
+    current transaction commits, through the same lease as the worker, so
+    the two never send it twice; a failed send stays queued for the worker.
+    """
+    email = OutboundEmail.objects.create(
+        subject=subject,
+        body=message,
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+        to=list(recipient_list),
+    )
+    if settings.MAIL_SEND_ON_COMMIT:
+        transaction.on_commit(lambda: deliver_queued_emails(pks=[email.pk]))
+    return email
+
+
+def _retry_delay(attempts):
+    """Exponential backoff: base, 2*base, 4*base, ... capped at MAIL_QUEUE_MAX_BACKOFF_SECONDS."""
+    delay = settings.MAIL_QUEUE_BACKOFF_SECONDS * (2 ** (attempts - 1))
+    return timedelta(seconds=min(delay, settings.MAIL_QUEUE_MAX_BACKOFF_SECONDS))
+
+
+def _claim_due_emails(batch_size, pks=None):
+    """
+    Lease up to batch_size due emails (only those in pks, if given) by pushing
+    their next_attempt_at past the lease window, so concurrent workers skip
+    them and a crashed worker's batch becomes due again once the lease runs out.
+    """
+    now = timezone.now()
+    due = OutboundEmail.objects.select_for_update(skip_locked=True).filter(
+        status=OutboundEmail.PENDING, next_attempt_at__lte=now
+    )
+    if pks is not None:
+        due = due.filter(pk__in=pks)
+    with transaction.atomic():
+        due = list(due.order_by('next_attempt_at', 'id')[:batch_size])
+        if due:
+            OutboundEmail.objects.filter(pk__in=[e.pk for e in due]).update(
+                next_attempt_at=now + timedelta(seconds=settings.MAIL_QUEUE_LEASE_SECONDS)
+            )
+    return due
+
+
+def deliver_queued_emails(batch_size=None, pks=None):
+    """
+    Send one batch of due emails (only those in pks, if given) over a single
+    backend connection. Failures are retried with exponential backoff and
+    dead-lettered after MAIL_QUEUE_MAX_ATTEMPTS. Returns (sent, retried, dead) counts.
+    """
+    batch = _claim_due_emails(batch_size or settings.MAIL_QUEUE_BATCH_SIZE, pks)
+    if not batch:
+        return 0, 0, 0
+    return _deliver(batch)
+
+
+def _record_failure(email, error):
+    """Back off or dead-letter an email whose attempt failed; True if it is dead."""
+    email.last_error = f"{type(error).__name__}: {error}"
+    if email.attempts >= settings.MAIL_QUEUE_MAX_ATTEMPTS:
+        email.status = OutboundEmail.DEAD
+        return True
+    email.next_attempt_at = timezone.now() + _retry_delay(email.attempts)
+    return False
+
+
+def _deliver(batch):
+    sent = retried = dead = 0
+    connection = connection_error = None
+    try:
+        connection = get_connection()
+        connection.open()
+    except Exception as e:
+        # Provider unreachable: every email of the batch backs off as if its send failed
+        connection_error = e
+
+    try:
+        for email in batch:
+            email.attempts += 1
+            error = connection_error
+            if error is None:
+                try:
+                    EmailMessage(
+                        email.subject, email.body, email.from_email, email.to, connection=connection
+                    ).send()
+                except Exception as e:
+                    error = e
+
+            if error is not None:
+                if _record_failure(email, error):
+                    dead += 1
+                else:
+                    retried += 1
+            else:
+                email.status = OutboundEmail.SENT
+                email.sent_at = timezone.now()
+                email.last_error = ''
+                sent += 1
+    finally:
+        if connection_error is None:
+            connection.close()
+
+    OutboundEmail.objects.bulk_update(
+        batch, ['status', 'attempts', 'next_attempt_at', 'last_error', 'sent_at']
+    )
+    return sent, retried, dead
+
 
 def send_teacher_otp_email(user):
     otp = user.generate_otp()
     subject = "🔐 Rakshara Teacher Login OTP Verification"
     message = f"Hello {user.username},\n\nYour One-Time Password (OTP) is: {otp}\n\nThis code is valid for 5 minutes.\n\n- Rakshara Security Team"
-    send_mail(subject, message, settings.DEFAULT_FROM_EMAIL, [user.email])
+    enqueue_email(subject, message, [user.email], settings.DEFAULT_FROM_EMAIL)
@@ -6,13 +6,12 @@ from .forms import StudentSignUpForm, TeacherSignUpForm, StudentProfileEditForm
 from .models import School, StudentProfile, User, TeacherProfile, Notification, JoinRequest
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import logout as django_logout
-from .utils import send_teacher_otp_email
+from .utils import send_teacher_otp_email, enqueue_email
 from django.utils import timezone
 from datetime import timedelta
 from .models import User
 import random
 from django.conf import settings
-from django.core.mail import send_mail
 from django.utils import translation
 
 
@@ -112,7 +111,7 @@ def teacher_register(request):
                 otp = user.generate_otp()
                 subject = "Teacher Account Verification OTP"
                 message = f"Dear {user.username},\n\nYour OTP for verification is: {otp}\n\nPlease enter this to activate your account."
-                send_mail(subject, message, settings.EMAIL_HOST_USER, [user.email])
+                enqueue_email(subject, message, [user.email], settings.EMAIL_HOST_USER)
 
                 request.session['pending_teacher_id'] = user.id
                 messages.info(request, "OTP sent to your registered email. Please verify to activate your account.")
@@ -143,17 +142,9 @@ def login_view(request):
         username_or_id = request.POST.get("username")
         password = request.POST.get("password")
 
-        user = None
+        # accounts.backends resolves a username or student code in one query
         user = authenticate(request, username=username_or_id, password=password)
 
-        if user is None:
-            from accounts.models import StudentProfile
-            try:
-                student = StudentProfile.objects.get(student_code=username_or_id)
-                user = authenticate(request, username=student.user.username, password=password)
-            except StudentProfile.DoesNotExist:
-                user = None
-
         if user is not None:
             if getattr(user, "is_teacher", False):
                 otp = str(random.randint(100000, 999999))
@@ -162,7 +153,7 @@ def login_view(request):
 
                 subject = "Login Verification OTP"
                 message = f"Dear {user.username},\n\nYour OTP for login is: {otp}\n\nUse this to complete your login."
-                send_mail(subject, message, settings.EMAIL_HOST_USER, [user.email])
+                enqueue_email(subject, message, [user.email], settings.EMAIL_HOST_USER)
 
                 request.session['pending_login_user_id'] = user.id
                 messages.info(request, "OTP sent to your email. Please verify to complete login.")
@@ -1,3 +1,19 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import ModelInfo
+
+
+@admin.register(ModelInfo)
+class ModelInfoAdmin(admin.ModelAdmin):
+    list_display = ('version', 'name', 'is_active', 'activated_at', 'date_loaded')
+    readonly_fields = ('is_active', 'activated_at')
+    actions = ['activate_version']
+
+    @admin.action(description="Activate selected version")
+    def activate_version(self, request, queryset):
+        if queryset.count() != 1:
+            self.message_user(request, "Select exactly one version to activate.", level='error')
+            return
+        info = queryset.get()
+        info.activate()
+        self.message_user(request, f"Activated {info}.")
@@ -0,0 +1,191 @@
+# ai_engine/compiled.py
+"""
+Pure-NumPy inference for the fitted IsolationForest and StandardScaler.
+
+`export_compiled(model, scaler, path)` flattens every tree of the forest
+into shared node arrays (feature, threshold, children) plus one
+precomputed path length per leaf (depth + the c(n) correction for the
+samples left in it), and stores them with the scaler's mean/scale in an
+uncompressed .npz. `load_compiled(path)` memory-maps those arrays, so
+gunicorn workers share one copy of the pages, and returns drop-in
+replacements for the scaler (`transform`) and the forest
+(`decision_function`, `score_samples`, `predict`). Serving never imports
+sklearn; only the exporter does.
+"""
+import zipfile
+
+import numpy as np
+
+FORMAT_VERSION = 1
+LEAF = -1
+
+
+def _leaf_path_lengths(model, tree_idx, estimator):
+    """Per-node depth + c(n_node_samples) - 1, exactly as IsolationForest adds it up."""
+    from sklearn.ensemble._iforest import _average_path_length
+
+    tree = estimator.tree_
+    if hasattr(model, '_decision_path_lengths'):
+        depths = np.asarray(model._decision_path_lengths[tree_idx], dtype=float)
+        correction = np.asarray(model._average_path_length_per_tree[tree_idx], dtype=float)
+    else:  # older sklearn computes these per call
+        depths = np.zeros(tree.node_count)
+        depths[0] = 1.0
+        for node in range(tree.node_count):
+            for child in (tree.children_left[node], tree.children_right[node]):
+                if child != LEAF:
+                    depths[child] = depths[node] + 1.0
+        correction = _average_path_length(tree.n_node_samples)
+    return depths + correction - 1.0
+
+
+def export_compiled(model, scaler, path):
+    """Write `model` (fitted IsolationForest) and `scaler` (fitted StandardScaler) to `path` (.npz)."""
+    from sklearn.ensemble._iforest import _average_path_length
+
+    n_trees = len(model.estimators_)
+    node_counts = [est.tree_.node_count for est in model.estimators_]
+    offsets = np.concatenate([[0], np.cumsum(node_counts)[:-1]]).astype(np.int64)
+
+    feature, threshold, children, value = [], [], [], []
+    for tree_idx, (est, features, offset) in enumerate(
+        zip(model.estimators_, model.estimators_features_, offsets)
+    ):
+        tree = est.tree_
+        is_leaf = tree.children_left == LEAF
+        # Map the tree's (possibly subsampled) feature indices back to input columns
+        features = np.asarray(features)
+        # (leaves get column 0; their comparison result is never used)
+        feature.append(features[np.where(is_leaf, 0, tree.feature)])
+        threshold.append(tree.threshold)
+        # Leaves point at themselves, so the evaluator can step a fixed number of times
+        own = np.arange(tree.node_count) + offset
+        children.append(np.column_stack([
+            np.where(is_leaf, own, tree.children_left + offset),
+            np.where(is_leaf, own, tree.children_right + offset),
+        ]))
+        value.append(np.where(is_leaf, _leaf_path_lengths(model, tree_idx, est), 0.0))
+
+    max_samples = getattr(model, '_max_samples', model.max_samples_)
+    np.savez(
+        path,
+        format_version=np.array(FORMAT_VERSION),
+        scaler_mean=np.asarray(scaler.mean_, dtype=np.float64),
+        scaler_scale=np.asarray(scaler.scale_, dtype=np.float64),
+        feature=np.concatenate(feature).astype(np.int32),
+        threshold=np.concatenate(threshold).astype(np.float64),
+        children=np.concatenate(children).astype(np.int32),
+        value=np.concatenate(value).astype(np.float64),
+        roots=offsets.astype(np.int32),
+        max_depth=np.array(max(est.tree_.max_depth for est in model.estimators_)),
+        denominator=np.array(n_trees * _average_path_length([max_samples])[0], dtype=np.float64),
+        offset=np.array(model.offset_, dtype=np.float64),
+    )
+
+
+def _mmap_npz(path):
+    """
+    Map every array of an uncompressed .npz read-only, straight from the
+    file (np.load ignores mmap_mode for archives). Compressed members are
+    read into memory instead.
+    """
+    arrays = {}
+    with zipfile.ZipFile(path) as archive, open(path, 'rb') as fh:
+        for info in archive.infolist():
+            name = info.filename[:-4] if info.filename.endswith('.npy') else info.filename
+            if info.compress_type != zipfile.ZIP_STORED:
+                with archive.open(info) as member:
+                    arrays[name] = np.lib.format.read_array(member)
+                continue
+            # Local file header: 30 fixed bytes, then the name and extra field
+            fh.seek(info.header_offset + 26)
+            name_len, extra_len = np.frombuffer(fh.read(4), dtype='<u2')
+            fh.seek(info.header_offset + 30 + int(name_len) + int(extra_len))
+            major, _minor = np.lib.format.read_magic(fh)
+            read_header = (
+                np.lib.format.read_array_header_1_0 if major == 1 else np.lib.format.read_array_header_2_0
+            )
+            shape, fortran_order, dtype = read_header(fh)
+            if shape == ():
+                arrays[name] = np.frombuffer(fh.read(dtype.itemsize), dtype=dtype)[0]
+            else:
+                arrays[name] = np.memmap(
+                    path, dtype=dtype, mode='r', offset=fh.tell(), shape=shape,
+                    order='F' if fortran_order else 'C',
+                )
+    return arrays
+
+
+class CompiledScaler:
+    def __init__(self, mean, scale):
+        self.mean_ = mean
+        self.scale_ = scale
+
+    def transform(self, X):
+        return (np.asarray(X, dtype=np.float64) - self.mean_) / self.scale_
+
+
+class CompiledForest:
+    # Rows evaluated per step; keeps the (rows x trees) working set in cache
+    CHUNK_ROWS = 128
+
+    def __init__(self, arrays):
+        # Plain ndarray views of the mapped pages: np.memmap's subclass hooks
+        # add overhead to every fancy-indexing step
+        self.feature = arrays['feature'].view(np.ndarray)
+        self.threshold = arrays['threshold'].view(np.ndarray)
+        # (nodes, 2) flattened so that children[2 * node + went_right] is the next node
+        self.children = arrays['children'].view(np.ndarray).ravel()
+        self.value = arrays['value'].view(np.ndarray)
+        self.roots = np.asarray(arrays['roots'])
+        self.max_depth = int(arrays['max_depth'])
+        self.denominator = float(arrays['denominator'])
+        self.offset_ = float(arrays['offset'])
+
+    @staticmethod
+    def _check_input(X):
+        """float32 copy of X as sklearn's trees see it; NaN, inf or overflow raise ValueError like sklearn."""
+        with np.errstate(over='ignore'):
+            X = np.asarray(X, dtype=np.float32)
+        if not np.isfinite(X).all():
+            raise ValueError("Input X contains NaN, infinity or a value too large for dtype('float32').")
+        return X
+
+    def _depths(self, X):
+        # sklearn's trees compare float32 inputs against float64 thresholds
+        X = X.astype(np.float64)
+        return np.concatenate([
+            self._chunk_depths(X[start:start + self.CHUNK_ROWS])
+            for start in range(0, len(X), self.CHUNK_ROWS)
+        ]) if len(X) else np.zeros(0)
+
+    def _chunk_depths(self, X):
+        n = len(X)
+        columns = X.T.ravel()  # columns[feature * n + row]
+        rows = np.arange(n)[:, None]
+        nodes = np.broadcast_to(self.roots, (n, len(self.roots)))
+        # All trees step down together; leaves map to themselves
+        for _ in range(self.max_depth):
+            went_right = columns[self.feature[nodes] * n + rows] > self.threshold[nodes]
+            nodes = self.children[2 * nodes + went_right]
+        return self.value[nodes].sum(axis=1)
+
+    def score_samples(self, X):
+        X = self._check_input(X)
+        if self.denominator == 0:
+            return -np.ones(len(X))
+        return -(2 ** (-self._depths(X) / self.denominator))
+
+    def decision_function(self, X):
+        return self.score_samples(X) - self.offset_
+
+    def predict(self, X):
+        return np.where(self.decision_function(X) < 0, -1, 1)
+
+
+def load_compiled(path):
+    """Return (forest, scaler) evaluators memory-mapped from an exported .npz."""
+    arrays = _mmap_npz(path)
+    if int(arrays['format_version']) != FORMAT_VERSION:
+        raise ValueError(f"Unsupported compiled model format {arrays['format_version']} in {path}.")
+    return CompiledForest(arrays), CompiledScaler(arrays['scaler_mean'], arrays['scaler_scale'])
@@ -0,0 +1,26 @@
+# ai_engine/management/commands/activate_model.py
+from django.core.management.base import BaseCommand, CommandError
+
+from ai_engine.models import ModelInfo
+
+
+class Command(BaseCommand):
+    help = "Switch every worker to a registered model version (picked up within AI_MODEL_VERSION_POLL_SECONDS)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('version', nargs='?')
+        parser.add_argument('--list', action='store_true', help="Show the registered versions.")
+
+    def handle(self, *args, **options):
+        if options['list'] or not options['version']:
+            for info in ModelInfo.objects.order_by('date_loaded'):
+                marker = '*' if info.is_active else ' '
+                self.stdout.write(f"{marker} {info.version:<12} {info.model_path}  {info.scaler_path}")
+            return
+
+        try:
+            info = ModelInfo.objects.get(version=options['version'])
+        except ModelInfo.DoesNotExist:
+            raise CommandError(f"Unknown model version {options['version']}.")
+        info.activate()
+        self.stdout.write(self.style.SUCCESS(f"Activated {info}."))
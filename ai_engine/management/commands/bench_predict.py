@@ -0,0 +1,108 @@
+# ai_engine/management/commands/bench_predict.py
+import os
+import time
+
+import joblib
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from ai_engine import utils
+from ai_engine.prediction_cache import prediction_cache
+from ai_engine.registry import model_registry
+
+
+def _legacy_predict(model, scaler, hr, spo2, br, temp, weight, height):
+    """The old per-reading sklearn path: one scaler call plus predict() and decision_function()."""
+    try:
+        bmi = float(weight) / ((float(height) / 100) ** 2)
+    except Exception:
+        bmi = utils.DEFAULT_BMI
+    features = np.array([[temp * 9/5 + 32, float(spo2), float(hr), float(bmi), utils.ATTENDANCE_PERCENTAGE]])
+    scaled = scaler.transform(features)
+    prediction = model.predict(scaled)[0]
+    score = model.decision_function(scaled)[0]
+    if prediction == 1:
+        label = "Healthy"
+    elif score > utils.MILD_THRESHOLD:
+        label = "Mild"
+    else:
+        label = "Critical"
+    return round((1 - abs(score)) * 100, 2), label
+
+
+def _random_readings(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return np.column_stack([
+        rng.normal(82, 12, n).round(),     # heart rate
+        rng.normal(97.5, 1.5, n),          # spo2
+        rng.normal(18, 3, n),              # breathing rate
+        rng.normal(36.8, 0.6, n),          # temperature (°C)
+        rng.normal(35, 8, n),              # weight (kg)
+        rng.normal(140, 15, n),            # height (cm)
+    ])
+
+
+class Command(BaseCommand):
+    help = "Benchmark per-reading vs batched health prediction."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', nargs='+', type=int, default=[1, 40, 10000])
+        parser.add_argument('--repeat', type=int, default=3)
+        parser.add_argument('--no-cache', action='store_true', help="Bypass the prediction cache.")
+
+    def handle(self, *args, **options):
+        model, scaler = model_registry.get()
+        if model is None or scaler is None:
+            raise CommandError("AI model is not loaded; nothing to benchmark.")
+        self.stdout.write(f"Model load stats: {model_registry.stats}")
+        if options['no_cache']:
+            prediction_cache.maxsize = 0
+        # The legacy column always measures the pickled sklearn objects, whatever the registry serves
+        _version, model_path, scaler_path = model_registry.artifacts
+        sk_model = joblib.load(os.path.join(settings.AI_MODEL_DIR, model_path))
+        sk_scaler = joblib.load(os.path.join(settings.AI_MODEL_DIR, scaler_path))
+
+        # The batch column always runs the forest: the prediction cache is emptied before each timed
+        # run and its shared backend bypassed. With the cache on, the warm column re-runs a cached batch.
+        warm_column = f" {'warm us/row':>13}" if prediction_cache.enabled else ''
+        self.stdout.write(f"{'N':>8} {'legacy us/row':>15} {'batch us/row':>14}{warm_column} {'speedup':>9}")
+        for n in options['sizes']:
+            readings = _random_readings(n)
+            rows = [tuple(r) for r in readings]
+
+            legacy = min(self._time(lambda: [_legacy_predict(sk_model, sk_scaler, *r) for r in rows]) for _ in range(options['repeat']))
+            batch = min(self._time_cold(lambda: utils.predict_health_batch(readings)) for _ in range(options['repeat']))
+            warm = ''
+            if prediction_cache.enabled:
+                utils.predict_health_batch(readings)
+                warm_seconds = min(self._time(lambda: utils.predict_health_batch(readings)) for _ in range(options['repeat']))
+                warm = f" {warm_seconds / n * 1e6:>13.1f}"
+
+            # Sanity check: both paths must agree
+            if [l for _, l in (_legacy_predict(sk_model, sk_scaler, *r) for r in rows[:100])] != \
+               [l for _, l in utils.predict_health_batch(readings[:100])]:
+                raise CommandError("Batch labels do not match the per-reading path.")
+
+            self.stdout.write(
+                f"{n:>8} {legacy / n * 1e6:>15.1f} {batch / n * 1e6:>14.1f}{warm} {legacy / batch:>8.1f}x"
+            )
+
+        if prediction_cache.enabled:
+            self.stdout.write(f"Prediction cache: {prediction_cache.stats()}")
+
+    @staticmethod
+    def _time(fn):
+        start = time.perf_counter()
+        fn()
+        return time.perf_counter() - start
+
+    @classmethod
+    def _time_cold(cls, fn):
+        """Time fn with an empty prediction cache and no shared backend, so every row hits the model."""
+        prediction_cache.clear()
+        backend, prediction_cache.backend = prediction_cache.backend, None
+        try:
+            return cls._time(fn)
+        finally:
+            prediction_cache.backend = backend
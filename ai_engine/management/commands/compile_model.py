@@ -0,0 +1,62 @@
+# ai_engine/management/commands/compile_model.py
+import os
+
+import joblib
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from ai_engine.compiled import export_compiled, load_compiled
+from ai_engine.models import ModelInfo
+from ai_engine.registry import DEFAULT_VERSION, compiled_path_for
+
+
+def compile_artifacts(model_path, scaler_path, n_check=2000):
+    """
+    Export the pickled model/scaler (paths relative to AI_MODEL_DIR) to the
+    .npz the registry serves from, and check it against sklearn.
+    Returns (npz path, max |decision_function| difference).
+    """
+    model = joblib.load(os.path.join(settings.AI_MODEL_DIR, model_path))
+    scaler = joblib.load(os.path.join(settings.AI_MODEL_DIR, scaler_path))
+    target = os.path.join(settings.AI_MODEL_DIR, compiled_path_for(model_path))
+
+    # Write beside the target and rename, so workers never map a half-written file
+    tmp = target + '.tmp.npz'
+    export_compiled(model, scaler, tmp)
+
+    # Probe around the scaler's training distribution
+    rng = np.random.default_rng(0)
+    features = rng.normal(scaler.mean_, scaler.scale_ * 2, size=(n_check, len(scaler.mean_)))
+    forest, compiled_scaler = load_compiled(tmp)
+    expected = model.decision_function(scaler.transform(features))
+    diff = float(np.max(np.abs(forest.decision_function(compiled_scaler.transform(features)) - expected)))
+    if diff > 1e-9 or not np.array_equal(forest.predict(compiled_scaler.transform(features)),
+                                        model.predict(scaler.transform(features))):
+        os.remove(tmp)
+        raise CommandError(f"Compiled forest disagrees with sklearn (max diff {diff:.3g}); not written.")
+
+    os.replace(tmp, target)
+    return target, diff
+
+
+class Command(BaseCommand):
+    help = "Export a model version to the pure-NumPy .npz format the registry memory-maps."
+
+    def add_arguments(self, parser):
+        parser.add_argument('version', nargs='?', help="ModelInfo version (default: the bundled model).")
+
+    def handle(self, *args, **options):
+        if options['version']:
+            try:
+                info = ModelInfo.objects.get(version=options['version'])
+            except ModelInfo.DoesNotExist:
+                raise CommandError(f"Unknown model version {options['version']}.")
+            version, model_path, scaler_path = info.version, info.model_path, info.scaler_path
+        else:
+            version, model_path, scaler_path = DEFAULT_VERSION, 'model.joblib', 'scaler.joblib'
+
+        path, diff = compile_artifacts(model_path, scaler_path)
+        self.stdout.write(self.style.SUCCESS(
+            f"Compiled model v{version} to {path} (max decision_function diff {diff:.2g})."
+        ))
@@ -0,0 +1,51 @@
+# ai_engine/management/commands/register_model.py
+import os
+import shutil
+
+import joblib
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from ai_engine.models import ModelInfo
+from .compile_model import compile_artifacts
+
+
+class Command(BaseCommand):
+    help = "Store a trained model/scaler pair as a new ModelInfo version (optionally activating it)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('version')
+        parser.add_argument('model', help="Path to the fitted IsolationForest (.joblib).")
+        parser.add_argument('scaler', help="Path to the fitted StandardScaler (.joblib).")
+        parser.add_argument('--name', default="Health AI Model")
+        parser.add_argument('--activate', action='store_true', help="Make it the active version right away.")
+
+    def handle(self, *args, **options):
+        version = options['version']
+        if ModelInfo.objects.filter(version=version).exists():
+            raise CommandError(f"Model version {version} is already registered.")
+
+        # Refuse artifacts that would fail in the workers after activation
+        for path in (options['model'], options['scaler']):
+            try:
+                joblib.load(path)
+            except Exception as e:
+                raise CommandError(f"Cannot load {path}: {e}")
+
+        target_dir = os.path.join(settings.AI_MODEL_DIR, version)
+        os.makedirs(target_dir, exist_ok=True)
+        shutil.copy2(options['model'], os.path.join(target_dir, 'model.joblib'))
+        shutil.copy2(options['scaler'], os.path.join(target_dir, 'scaler.joblib'))
+
+        model_path = os.path.join(version, 'model.joblib')
+        scaler_path = os.path.join(version, 'scaler.joblib')
+        compile_artifacts(model_path, scaler_path)
+
+        info = ModelInfo.objects.create(
+            name=options['name'], version=version, model_path=model_path, scaler_path=scaler_path,
+        )
+        if options['activate']:
+            info.activate()
+        self.stdout.write(self.style.SUCCESS(
+            f"Registered {info}{' (active)' if info.is_active else ''}."
+        ))
@@ -1,5 +1,16 @@
+import json
+import logging
+import random
+import time
+
+from django.conf import settings
 from django.utils import translation
 
+from .timing import recording_queries, start_request_timings, stop_request_timings
+
+timing_logger = logging.getLogger('rakshara.timing')
+
+
 class LanguageMiddleware:
     def __init__(self, get_response):
         self.get_response = get_response
@@ -10,3 +21,50 @@ class LanguageMiddleware:
         response = self.get_response(request)
         translation.deactivate()
         return response
+
+
+class RequestTimingMiddleware:
+    """
+    For a REQUEST_TIMING_SAMPLE_RATE fraction of requests, count queries and
+    time the database, model inference and template rendering, then report
+    them in a Server-Timing header and one JSON log line on 'rakshara.timing'.
+    The header carries the query count only when DEBUG is on.
+    Buckets can overlap (a lazy queryset evaluated in a template counts as
+    both db and render).
+    """
+    BUCKETS = ('db', 'inference', 'render')
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if random.random() >= settings.REQUEST_TIMING_SAMPLE_RATE:
+            return self.get_response(request)
+
+        timings, token = start_request_timings()
+        try:
+            with recording_queries(timings):
+                response = self.get_response(request)
+        finally:
+            stop_request_timings(token)
+        total = time.perf_counter() - timings.started
+
+        # Query counts describe the schema's access patterns: only shown while debugging
+        db_desc = f';desc="{timings.query_count} queries"' if settings.DEBUG else ''
+        metrics = [f'db;dur={timings.durations["db"] * 1000:.1f}{db_desc}']
+        metrics += [f'{name};dur={timings.durations[name] * 1000:.1f}' for name in self.BUCKETS[1:]]
+        metrics.append(f'total;dur={total * 1000:.1f}')
+        response['Server-Timing'] = ', '.join(metrics)
+
+        match = getattr(request, 'resolver_match', None)
+        timing_logger.info(json.dumps({
+            'view': match.view_name if match else None,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'queries': timings.query_count,
+            'duplicate_queries': timings.duplicate_queries,
+            **{f'{name}_ms': round(timings.durations[name] * 1000, 2) for name in self.BUCKETS},
+            'total_ms': round(total * 1000, 2),
+        }))
+        return response
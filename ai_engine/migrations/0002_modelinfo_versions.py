@@ -0,0 +1,42 @@
+# Generated by Django 4.2 on 2026-10-18 16:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_engine', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='modelinfo',
+            name='activated_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='modelinfo',
+            name='is_active',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='modelinfo',
+            name='model_path',
+            field=models.CharField(default='model.joblib', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='modelinfo',
+            name='scaler_path',
+            field=models.CharField(default='scaler.joblib', max_length=255),
+        ),
+        migrations.AlterField(
+            model_name='modelinfo',
+            name='version',
+            field=models.CharField(default='1.0', max_length=20, unique=True),
+        ),
+        migrations.AddConstraint(
+            model_name='modelinfo',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_active', True)), fields=('is_active',), name='single_active_model'),
+        ),
+    ]
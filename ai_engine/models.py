@@ -1,9 +1,40 @@
-from django.db import models
+from django.core.cache import cache
+from django.db import models, transaction
+from django.utils import timezone
+
+# Cache key holding the active (version, model_path, scaler_path); workers poll it (see ai_engine.registry)
+ACTIVE_MODEL_CACHE_KEY = 'ai_engine:active_model'
+
 
 class ModelInfo(models.Model):
+    """
+    One stored model/scaler artifact version. At most one row is active;
+    running workers pick up a newly activated version without a restart.
+    Paths are relative to AI_MODEL_DIR.
+    """
     name = models.CharField(max_length=100, default="Health AI Model")
-    version = models.CharField(max_length=20, default="1.0")
+    version = models.CharField(max_length=20, default="1.0", unique=True)
     date_loaded = models.DateTimeField(auto_now_add=True)
+    model_path = models.CharField(max_length=255, default='model.joblib')
+    scaler_path = models.CharField(max_length=255, default='scaler.joblib')
+    is_active = models.BooleanField(default=False)
+    activated_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['is_active'], condition=models.Q(is_active=True), name='single_active_model'
+            ),
+        ]
+
+    def activate(self):
+        """Make this the active version for every worker."""
+        with transaction.atomic():
+            ModelInfo.objects.filter(is_active=True).exclude(pk=self.pk).update(is_active=False)
+            self.is_active = True
+            self.activated_at = timezone.now()
+            self.save(update_fields=['is_active', 'activated_at'])
+        cache.delete(ACTIVE_MODEL_CACHE_KEY)
 
     def __str__(self):
         return f"{self.name} v{self.version}"
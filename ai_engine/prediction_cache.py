@@ -0,0 +1,114 @@
+# ai_engine/prediction_cache.py
+"""
+Bounded LRU cache of (score, label) results keyed on the model's input
+vector, i.e. after build_features() (°F temperature, BMI, attendance).
+
+Features are rounded to FEATURE_DECIMALS before both the lookup and the
+forest pass, so a key always maps to the same result no matter which
+reading filled it. Entries belong to one model version: the in-process
+LRU is emptied when the active version changes, and keys in Django's
+cache (AI_PREDICTION_CACHE_BACKEND, e.g. 'default' for Redis) carry the
+version so stale ones are never read.
+"""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from django.conf import settings
+
+FEATURE_DECIMALS = 2
+KEY_PREFIX = 'ai_engine:prediction'
+
+
+def quantize(features):
+    return np.round(features, FEATURE_DECIMALS) + 0.0  # + 0.0 folds -0.0 into 0.0
+
+
+class PredictionCache:
+    def __init__(self, maxsize=None, backend=None):
+        self.maxsize = settings.AI_PREDICTION_CACHE_SIZE if maxsize is None else maxsize
+        self.backend = settings.AI_PREDICTION_CACHE_BACKEND if backend is None else backend
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._version = None
+        self.hits = self.misses = self.shared_hits = 0
+
+    @property
+    def enabled(self):
+        return self.maxsize > 0
+
+    def _shared(self):
+        if not self.backend:
+            return None
+        from django.core.cache import caches
+
+        return caches[self.backend]
+
+    def _check_version(self, version):
+        # Caller holds the lock
+        if version != self._version:
+            self._entries.clear()
+            self._version = version
+
+    def get_many(self, version, keys):
+        """Return {key: (score, label)} for the keys cached under `version`."""
+        found = {}
+        with self._lock:
+            self._check_version(version)
+            for key in keys:
+                result = self._entries.get(key)
+                if result is not None:
+                    self._entries.move_to_end(key)
+                    found[key] = result
+
+        missing = [key for key in keys if key not in found]
+        shared = self._shared()
+        if missing and shared is not None:
+            remote = shared.get_many([f"{KEY_PREFIX}:{version}:{key.hex()}" for key in missing])
+            if remote:
+                by_name = {f"{KEY_PREFIX}:{version}:{key.hex()}": key for key in missing}
+                shared_found = {by_name[name]: tuple(value) for name, value in remote.items()}
+                self._store_local(version, shared_found)
+                found.update(shared_found)
+                self.shared_hits += len(shared_found)
+
+        with self._lock:
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def set_many(self, version, results):
+        """Cache {key: (score, label)} computed by model `version`."""
+        self._store_local(version, results)
+        shared = self._shared()
+        if shared is not None and results:
+            shared.set_many({f"{KEY_PREFIX}:{version}:{key.hex()}": value for key, value in results.items()})
+
+    def _store_local(self, version, results):
+        with self._lock:
+            self._check_version(version)
+            for key, value in results.items():
+                self._entries[key] = value
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.shared_hits = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'version': self._version,
+            'size': len(self._entries),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'shared_hits': self.shared_hits,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+        }
+
+
+prediction_cache = PredictionCache()
@@ -0,0 +1,195 @@
+# ai_engine/registry.py
+"""
+Lazy, thread-safe holder for the active IsolationForest model and its scaler.
+
+Nothing is loaded until the first prediction, so management commands like
+migrate/collectstatic start fast. When a compiled forest (<model>.npz, see
+ai_engine.compiled) sits next to the model it is memory-mapped instead of
+unpickling the sklearn objects, and sklearn is never imported.
+Under gunicorn, gunicorn.conf.py calls `model_registry.preload()` in the
+master before forking so workers share the loaded pages copy-on-write.
+
+The active artifact version lives in ai_engine.ModelInfo. Every
+AI_MODEL_VERSION_POLL_SECONDS a worker re-reads it (cache first, then the
+database) and hot-swaps to a newly activated version without a restart.
+Without any ModelInfo rows the bundled model.joblib/scaler.joblib are used
+as version DEFAULT_VERSION.
+"""
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError
+
+from .models import ModelInfo, ACTIVE_MODEL_CACHE_KEY
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger('rakshara.ai')
+
+DEFAULT_VERSION = '1.0'
+# Backoff between retries of a version that failed to load: doubles per failure, capped
+LOAD_RETRY_SECONDS = 30.0
+LOAD_MAX_RETRY_SECONDS = 15 * 60.0
+
+
+def _max_rss_kb():
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def compiled_path_for(model_path):
+    """Where the compiled (.npz) export of `model_path` lives."""
+    return os.path.splitext(model_path)[0] + '.npz'
+
+
+def _active_artifacts():
+    """(version, model_path, scaler_path) of the active ModelInfo, or the bundled default."""
+    info = ModelInfo.objects.filter(is_active=True).values_list(
+        'version', 'model_path', 'scaler_path'
+    ).first()
+    if info is None:
+        return DEFAULT_VERSION, 'model.joblib', 'scaler.joblib'
+    return info
+
+
+class ModelRegistry:
+    def __init__(self, model_dir=None):
+        self.model_dir = model_dir or settings.AI_MODEL_DIR
+        self._lock = threading.Lock()
+        # (version, model, scaler), swapped as one tuple so readers never see a mix
+        self._active = None
+        self._active_stamp = None
+        # (stamp, failures, retry_at) of the last version that failed to load
+        self._failed = None
+        self._checked_at = 0.0
+        self.stats = {}
+
+    @property
+    def is_loaded(self):
+        return self._active is not None
+
+    @property
+    def version(self):
+        return self._active[0] if self._active else None
+
+    @property
+    def artifacts(self):
+        """(version, model_path, scaler_path) currently served, or None before the first load."""
+        return self._active_stamp
+
+    def get(self):
+        """Return (model, scaler), loading them on first use. Both are None if loading failed."""
+        _, model, scaler = self.get_versioned()
+        return model, scaler
+
+    def get_versioned(self):
+        """Return (version, model, scaler) for the currently active version."""
+        if self._active is None or time.monotonic() - self._checked_at >= settings.AI_MODEL_VERSION_POLL_SECONDS:
+            self._refresh()
+        return self._active
+
+    def preload(self):
+        """Load now (e.g. in gunicorn's master before fork). Safe to call repeatedly."""
+        self.get()
+        return self.stats
+
+    def reset(self):
+        """Forget the loaded artifacts; the next get() loads them again."""
+        with self._lock:
+            self._active = None
+            self._active_stamp = None
+            self._failed = None
+            self._checked_at = 0.0
+            self.stats = {}
+
+    def _active_version_stamp(self):
+        artifacts = cache.get(ACTIVE_MODEL_CACHE_KEY)
+        if artifacts is None:
+            try:
+                artifacts = _active_artifacts()
+            except DatabaseError:
+                # No table yet (e.g. before migrate): keep what we have, or use the default
+                return self._active_stamp or (DEFAULT_VERSION, 'model.joblib', 'scaler.joblib')
+            cache.set(ACTIVE_MODEL_CACHE_KEY, artifacts, settings.AI_MODEL_VERSION_POLL_SECONDS)
+        return tuple(artifacts)
+
+    def _refresh(self):
+        with self._lock:
+            if self._active is not None and time.monotonic() - self._checked_at < settings.AI_MODEL_VERSION_POLL_SECONDS:
+                return  # another thread just refreshed
+            stamp = self._active_version_stamp()
+            if self._active is None or (stamp != self._active_stamp and not self._backing_off(stamp)):
+                self._load(*stamp)
+            self._checked_at = time.monotonic()
+
+    def _backing_off(self, stamp):
+        """True while `stamp` failed to load and its retry delay hasn't passed."""
+        return (
+            self._failed is not None
+            and self._failed[0] == stamp
+            and time.monotonic() < self._failed[2]
+        )
+
+    def _load_artifacts(self, model_path, scaler_path):
+        """(model, scaler, kind): the compiled forest when exported, else the pickles."""
+        compiled_path = os.path.join(self.model_dir, compiled_path_for(model_path))
+        if settings.AI_MODEL_COMPILED and os.path.exists(compiled_path):
+            from .compiled import load_compiled
+
+            model, scaler = load_compiled(compiled_path)
+            return model, scaler, 'compiled'
+
+        import joblib
+
+        model = joblib.load(os.path.join(self.model_dir, model_path))
+        scaler = joblib.load(os.path.join(self.model_dir, scaler_path))
+        return model, scaler, 'sklearn'
+
+    def _load(self, version, model_path, scaler_path):
+        rss_before = _max_rss_kb()
+        start = time.perf_counter()
+        kind = None
+        try:
+            model, scaler, kind = self._load_artifacts(model_path, scaler_path)
+            error = None
+            logger.info("AI model v%s and scaler loaded (%s)", version, kind)
+        except Exception as e:
+            stamp = (version, model_path, scaler_path)
+            failures = self._failed[1] + 1 if self._failed and self._failed[0] == stamp else 1
+            delay = min(LOAD_RETRY_SECONDS * 2 ** (failures - 1), LOAD_MAX_RETRY_SECONDS)
+            self._failed = (stamp, failures, time.monotonic() + delay)
+            error = str(e)
+            logger.error("Error loading AI model v%s (retrying in %ds): %s", version, delay, e)
+            if self._active is not None and self._active[1] is not None:
+                # Keep serving the previous version rather than dropping to the rule-based fallback
+                self.stats = {**self.stats, 'error': error}
+                return
+            # Nothing to fall back on: serve the rule-based fallback under this version until a retry loads it
+            self._active = (version, None, None)
+            self.stats = {'version': version, 'kind': None, 'pid': os.getpid(), 'error': error}
+            return
+
+        rss_after = _max_rss_kb()
+        self._active_stamp = (version, model_path, scaler_path)
+        self._active = (version, model, scaler)
+        self._failed = None
+        self.stats = {
+            'version': version,
+            'kind': kind,
+            'load_seconds': round(time.perf_counter() - start, 4),
+            # Growth of the process's peak RSS while loading (KB on Linux); an approximation
+            'max_rss_delta_kb': (rss_after - rss_before) if rss_before is not None else None,
+            'pid': os.getpid(),
+            'error': error,
+        }
+
+
+model_registry = ModelRegistry()
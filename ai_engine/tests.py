@@ -1,3 +1,347 @@
-from django.test import TestCase
+import json
+import os
+import tempfile
+import time
+import warnings
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+import joblib
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache as default_cache
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from . import utils
+from health.utils import RULES_VERSION, predict_health as predict_rules
+
+from .compiled import export_compiled, load_compiled
+from .models import ModelInfo
+from .prediction_cache import PredictionCache
+from .registry import DEFAULT_VERSION, ModelRegistry
+
+
+class CompiledForestTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.model = joblib.load(os.path.join(settings.AI_MODEL_DIR, 'model.joblib'))
+        cls.scaler = joblib.load(os.path.join(settings.AI_MODEL_DIR, 'scaler.joblib'))
+        cls.tmpdir = tempfile.TemporaryDirectory()
+        path = os.path.join(cls.tmpdir.name, 'model.npz')
+        export_compiled(cls.model, cls.scaler, path)
+        cls.forest, cls.compiled_scaler = load_compiled(path)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmpdir.cleanup()
+        super().tearDownClass()
+
+    def features(self, n, spread=3.0, seed=0):
+        rng = np.random.default_rng(seed)
+        return rng.normal(self.scaler.mean_, self.scaler.scale_ * spread, size=(n, len(self.scaler.mean_)))
+
+    def test_matches_sklearn(self):
+        features = self.features(3000)
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')  # scaler was fitted with feature names
+            scaled = self.scaler.transform(features)
+        compiled_scaled = self.compiled_scaler.transform(features)
+
+        np.testing.assert_allclose(compiled_scaled, scaled, rtol=0, atol=1e-12)
+        np.testing.assert_allclose(
+            self.forest.decision_function(compiled_scaled), self.model.decision_function(scaled), rtol=0, atol=1e-12
+        )
+        np.testing.assert_array_equal(self.forest.predict(compiled_scaled), self.model.predict(scaled))
+
+    def test_single_row_and_empty_input(self):
+        features = self.features(1)
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            expected = self.model.decision_function(self.scaler.transform(features))
+        self.assertAlmostEqual(
+            self.forest.decision_function(self.compiled_scaler.transform(features))[0], expected[0], places=12
+        )
+        self.assertEqual(len(self.forest.decision_function(np.empty((0, 5)))), 0)
+
+    def test_non_finite_input_is_rejected(self):
+        for bad in (np.nan, np.inf, -np.inf, 1e300):
+            features = self.compiled_scaler.transform(self.features(3))
+            features[1, 2] = bad
+            with self.subTest(value=bad):
+                with self.assertRaisesRegex(ValueError, "NaN, infinity"):
+                    self.forest.decision_function(features)
+                with self.assertRaises(ValueError):
+                    self.forest.predict(features)
+
+    def test_arrays_are_memory_mapped(self):
+        self.assertIsInstance(self.forest.threshold.base, np.memmap)
+
+
+class PredictionCacheTests(SimpleTestCase):
+    READINGS = [
+        (80, 98, 18, 36.6, 35, 140),
+        (80, 98, 18, 36.6, 35, 140),
+        (130, 88, 30, 39.5, 35, 140),
+        (80, 98, 18, 36.6, 35, 140),
+    ]
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.model = joblib.load(os.path.join(settings.AI_MODEL_DIR, 'model.joblib'))
+        cls.scaler = joblib.load(os.path.join(settings.AI_MODEL_DIR, 'scaler.joblib'))
+
+    def predict(self, cache, version='1.0'):
+        artifacts = (version, self.model, self.scaler)
+        with mock.patch.object(utils, 'prediction_cache', cache), \
+             mock.patch.object(utils.model_registry, 'get_versioned', return_value=artifacts), \
+             warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            return utils.predict_health_batch(self.READINGS)
+
+    def test_matches_uncached_results(self):
+        uncached = self.predict(PredictionCache(maxsize=0, backend=''))
+        cached = PredictionCache(maxsize=100, backend='')
+        self.assertEqual(self.predict(cached), uncached)
+        self.assertEqual(self.predict(cached), uncached)
+        # Two distinct inputs: missed once, then served from the cache
+        self.assertEqual((cached.misses, cached.hits), (2, 2))
+
+    def test_model_sees_quantized_features_with_or_without_the_cache(self):
+        readings = [(80, 98.004, 18, 36.6001, 35.01, 140)]
+        for size in (0, 100):
+            with self.subTest(cache_size=size), \
+                 mock.patch.object(utils, 'prediction_cache', PredictionCache(maxsize=size, backend='')), \
+                 mock.patch.object(utils.model_registry, 'get_versioned', return_value=('1.0', self.model, self.scaler)), \
+                 mock.patch.object(utils, '_run_model', return_value=[(90.0, 'Healthy')]) as run_model:
+                utils.predict_health_batch(readings)
+                features = run_model.call_args[0][0]
+                np.testing.assert_array_equal(features, np.round(features, 2))
+
+    def test_new_model_version_empties_the_cache(self):
+        cache = PredictionCache(maxsize=100, backend='')
+        self.predict(cache, version='1.0')
+        self.predict(cache, version='2.0')
+        self.assertEqual(cache.hits, 0)
+        self.assertEqual(cache.stats()['version'], '2.0')
+
+    def test_lru_is_bounded(self):
+        cache = PredictionCache(maxsize=1, backend='')
+        self.predict(cache)
+        self.assertEqual(cache.stats()['size'], 1)
+
+    def test_shared_backend(self):
+        default_cache.clear()
+        self.predict(PredictionCache(maxsize=100, backend='default'))
+        # A fresh worker (empty local LRU) finds the results in Django's cache
+        other = PredictionCache(maxsize=100, backend='default')
+        self.predict(other)
+        self.assertEqual((other.shared_hits, other.misses), (2, 0))
+
+    def test_benchmark_times_the_model_not_the_cache(self):
+        from ai_engine.management.commands import bench_predict
+
+        cache = PredictionCache(maxsize=100, backend='')
+        registry = mock.Mock(stats={}, artifacts=('1.0', 'model.joblib', 'scaler.joblib'))
+        registry.get.return_value = (self.model, self.scaler)
+        out = StringIO()
+        with mock.patch.object(utils, 'prediction_cache', cache), \
+             mock.patch.object(bench_predict, 'prediction_cache', cache), \
+             mock.patch.object(bench_predict, 'model_registry', registry), \
+             mock.patch.object(utils.model_registry, 'get_versioned', return_value=('1.0', self.model, self.scaler)), \
+             mock.patch.object(utils, '_run_model', wraps=utils._run_model) as run_model, \
+             warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            call_command('bench_predict', sizes=[5], repeat=3, stdout=out)
+        # Every timed batch run scored its rows with the model; the warm runs were cache hits
+        self.assertEqual(run_model.call_count, 3)
+        self.assertIn('warm us/row', out.getvalue())
+
+    def test_rules_fallback_when_model_is_missing(self):
+        cache = PredictionCache(maxsize=100, backend='')
+        with mock.patch.object(utils, 'prediction_cache', cache), \
+             mock.patch.object(utils.model_registry, 'get_versioned', return_value=('1.0', None, None)):
+            version, results = utils.predict_health_batch(self.READINGS, return_version=True)
+        self.assertEqual(version, RULES_VERSION)
+        for i in (0, 2):
+            risk, label = predict_rules(*self.READINGS[i])
+            self.assertEqual(results[i], (round(100 - risk, 1), label))
+        self.assertEqual(cache.stats()['size'], 0)
+
+    def test_rules_fallback_scores_use_the_model_scale(self):
+        with mock.patch.object(utils.model_registry, 'get_versioned', return_value=('1.0', None, None)):
+            fallback = utils.predict_health_batch(self.READINGS)
+        # Higher is healthier, as with the model: a normal reading scores near 100
+        self.assertEqual(fallback[0][1], "Normal")
+        self.assertGreater(fallback[0][0], 90.0)
+        self.assertLess(fallback[2][0], fallback[0][0])
+        self.assertGreaterEqual(fallback[2][0], 0.0)
+
+
+class BatchPredictionTests(SimpleTestCase):
+    """predict_health_batch must give each reading what predict_health gives it alone."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.model = joblib.load(os.path.join(settings.AI_MODEL_DIR, 'model.joblib'))
+        cls.scaler = joblib.load(os.path.join(settings.AI_MODEL_DIR, 'scaler.joblib'))
+        cls.tmpdir = tempfile.TemporaryDirectory()
+        path = os.path.join(cls.tmpdir.name, 'model.npz')
+        export_compiled(cls.model, cls.scaler, path)
+        cls.compiled = load_compiled(path)
+
+        rng = np.random.default_rng(1)
+        n = 300
+        cls.readings = list(zip(
+            rng.integers(40, 150, n).tolist(),
+            rng.uniform(80, 100, n).round(1).tolist(),
+            rng.integers(10, 35, n).tolist(),
+            rng.uniform(35, 41, n).round(1).tolist(),
+            # Missing or zero weight/height fall back to the default BMI
+            [None if i % 7 == 0 else w for i, w in enumerate(rng.uniform(20, 80, n).round(1).tolist())],
+            [0 if i % 11 == 0 else h for i, h in enumerate(rng.uniform(100, 180, n).round().tolist())],
+        ))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmpdir.cleanup()
+        super().tearDownClass()
+
+    def check(self, model, scaler, cache):
+        with mock.patch.object(utils, 'prediction_cache', cache), \
+             mock.patch.object(utils.model_registry, 'get_versioned', return_value=('1.0', model, scaler)), \
+             warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            batch = utils.predict_health_batch(self.readings)
+            single = [utils.predict_health(*reading) for reading in self.readings]
+        self.assertEqual(batch, single)
+        self.assertEqual({label for _, label in batch} - {'Healthy', 'Mild', 'Critical'}, set())
+
+    def test_sklearn_batch_matches_single_readings(self):
+        self.check(self.model, self.scaler, PredictionCache(maxsize=0, backend=''))
+
+    def test_compiled_batch_matches_single_readings(self):
+        self.check(*self.compiled, PredictionCache(maxsize=0, backend=''))
+
+    def test_cached_batch_matches_single_readings(self):
+        self.check(*self.compiled, PredictionCache(maxsize=1000, backend=''))
+
+    def test_vital_records_and_arrays_are_accepted(self):
+        class Reading:
+            def __init__(self, hr, spo2, br, temp, weight, height):
+                self.heart_rate, self.spo2, self.breathing_rate = hr, spo2, br
+                self.temperature_c, self.weight_kg, self.height_cm = temp, weight, height
+
+        rows = self.readings[:20]
+        with mock.patch.object(utils, 'prediction_cache', PredictionCache(maxsize=0, backend='')), \
+             mock.patch.object(utils.model_registry, 'get_versioned', return_value=('1.0', *self.compiled)):
+            expected = utils.predict_health_batch(rows)
+            self.assertEqual(utils.predict_health_batch([Reading(*r) for r in rows]), expected)
+            array = np.array([[np.nan if v is None else v for v in r] for r in rows], dtype=float)
+            self.assertEqual(utils.predict_health_batch(array), expected)
+            self.assertEqual(utils.predict_health_batch([]), [])
+
+
+@override_settings(AI_MODEL_VERSION_POLL_SECONDS=0)
+class ModelRegistryTests(TestCase):
+    def setUp(self):
+        default_cache.clear()
+        self.registry = ModelRegistry(settings.AI_MODEL_DIR)
+
+    def test_loads_lazily_on_first_use(self):
+        with mock.patch.object(self.registry, '_load_artifacts', wraps=self.registry._load_artifacts) as load:
+            self.assertFalse(self.registry.is_loaded)
+            load.assert_not_called()
+            with self.settings(AI_MODEL_VERSION_POLL_SECONDS=30):
+                version, model, scaler = self.registry.get_versioned()
+                self.registry.get_versioned()
+        self.assertEqual(load.call_count, 1)
+        self.assertEqual(version, DEFAULT_VERSION)
+        self.assertIsNotNone(model)
+        self.assertEqual(self.registry.stats['kind'], 'compiled')
+
+    def test_hot_swaps_to_a_newly_activated_version(self):
+        ModelInfo.objects.create(version='1.0').activate()
+        newer = ModelInfo.objects.create(version='2.0')
+        self.assertEqual(self.registry.get_versioned()[0], '1.0')
+
+        with self.assertLogs('rakshara.ai', 'INFO') as logs:
+            newer.activate()
+            self.assertEqual(self.registry.get_versioned()[0], '2.0')
+        self.assertIn("AI model v2.0", logs.output[0])
+        # Unchanged version: nothing is reloaded
+        with mock.patch.object(self.registry, '_load') as load:
+            self.registry.get_versioned()
+        load.assert_not_called()
+
+    @override_settings(AI_MODEL_COMPILED=False)
+    def test_failed_load_keeps_the_previous_version(self):
+        ModelInfo.objects.create(version='1.0').activate()
+        _, model, _ = self.registry.get_versioned()
+
+        with self.assertLogs('rakshara.ai', 'ERROR'):
+            ModelInfo.objects.create(version='2.0', model_path='missing.joblib').activate()
+            version, still_model, _ = self.registry.get_versioned()
+        self.assertEqual(version, '1.0')
+        self.assertIs(still_model, model)
+        self.assertIn('missing.joblib', self.registry.stats['error'])
+        self.assertEqual(self.registry.artifacts[0], '1.0')
+
+        # Within the backoff the broken version isn't retried on every poll...
+        with mock.patch.object(self.registry, '_load') as load:
+            self.registry.get_versioned()
+        load.assert_not_called()
+
+        # ...once it has passed it is, with a doubled delay if it fails again
+        with mock.patch('ai_engine.registry.time.monotonic', return_value=time.monotonic() + 31):
+            with self.assertLogs('rakshara.ai', 'ERROR') as logs:
+                self.assertEqual(self.registry.get_versioned()[0], '1.0')
+        self.assertIn('retrying in 60s', logs.output[0])
+
+        # A transient failure: the retry after the backoff swaps to the new version
+        with mock.patch('ai_engine.registry.time.monotonic', return_value=time.monotonic() + 91), \
+                mock.patch.object(self.registry, '_load_artifacts', return_value=(object(), object(), 'sklearn')):
+            self.assertEqual(self.registry.get_versioned()[0], '2.0')
+        self.assertEqual(self.registry.artifacts[0], '2.0')
+        self.assertIsNone(self.registry.stats['error'])
+
+    @override_settings(AI_MODEL_COMPILED=False)
+    def test_rules_fallback_when_nothing_loads(self):
+        ModelInfo.objects.create(version='2.0', model_path='missing.joblib').activate()
+        with self.assertLogs('rakshara.ai', 'ERROR'):
+            self.assertEqual(self.registry.get_versioned(), ('2.0', None, None))
+        with mock.patch.object(utils, 'model_registry', self.registry):
+            version, _ = utils.predict_health_batch([(80, 98, 18, 36.6, 35, 140)], return_version=True)
+        self.assertEqual(version, RULES_VERSION)
+
+
+class RequestTimingMiddlewareTests(TestCase):
+    @override_settings(REQUEST_TIMING_SAMPLE_RATE=1.0)
+    def test_reports_server_timing_and_logs(self):
+        with self.assertLogs('rakshara.timing', level='INFO') as logs:
+            response = self.client.get(reverse('student_register'))
+
+        header = response['Server-Timing']
+        for metric in ('db;dur=', 'inference;dur=', 'render;dur=', 'total;dur='):
+            self.assertIn(metric, header)
+        entry = json.loads(logs.records[0].getMessage())
+        self.assertEqual(entry['view'], 'student_register')
+        self.assertEqual(entry['status'], 200)
+        self.assertGreater(entry['render_ms'], 0)
+        self.assertNotIn('queries', header)
+
+    @override_settings(REQUEST_TIMING_SAMPLE_RATE=1.0, DEBUG=True)
+    def test_query_count_in_header_only_when_debugging(self):
+        with self.assertLogs('rakshara.timing', level='INFO') as logs:
+            response = self.client.get(reverse('student_register'))
+        entry = json.loads(logs.records[0].getMessage())
+        self.assertIn(f'desc="{entry["queries"]} queries"', response['Server-Timing'])
+
+    @override_settings(REQUEST_TIMING_SAMPLE_RATE=0.0)
+    def test_unsampled_requests_are_untouched(self):
+        response = self.client.get(reverse('student_register'))
+        self.assertNotIn('Server-Timing', response)
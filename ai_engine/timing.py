@@ -0,0 +1,111 @@
+# ai_engine/timing.py
+"""
+Per-request timing buckets filled in by RequestTimingMiddleware
+(ai_engine.middleware): database queries, model inference and template
+rendering. Code that wants its own bucket wraps the work in `timed(name)`;
+outside a sampled request that is a no-op.
+"""
+import contextvars
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import ExitStack, contextmanager
+
+from django.db import connections
+from django.template.backends.django import DjangoTemplates
+
+_current = contextvars.ContextVar('request_timings', default=None)
+
+
+class RequestTimings:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.durations = defaultdict(float)  # bucket -> seconds
+        self.query_count = 0
+        self.statements = Counter()  # SQL text (without params) -> executions
+        # Queries may come from several threads at once (health.async_db)
+        self._lock = threading.Lock()
+
+    def record_query(self, sql, seconds):
+        with self._lock:
+            self.query_count += 1
+            self.durations['db'] += seconds
+            self.statements[sql] += 1
+
+    @property
+    def duplicate_queries(self):
+        """Executions beyond the first of each repeated statement: the N+1 signal."""
+        return sum(count - 1 for count in self.statements.values())
+
+    def db_wrapper(self, execute, sql, params, many, context):
+        """connection.execute_wrapper() hook."""
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.record_query(sql, time.perf_counter() - start)
+
+
+def current_timings():
+    return _current.get()
+
+
+def start_request_timings():
+    timings = RequestTimings()
+    return timings, _current.set(timings)
+
+
+def stop_request_timings(token):
+    _current.reset(token)
+
+
+@contextmanager
+def recording_queries(timings=None):
+    """
+    Count the queries of this thread's connections into `timings` (default:
+    the current request's). Connections are per thread, so a thread that
+    queries for the request (e.g. health.async_db's pool) needs its own.
+    """
+    timings = timings or _current.get()
+    with ExitStack() as stack:
+        if timings is not None:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(timings.db_wrapper))
+        yield
+
+
+@contextmanager
+def timed(name):
+    """Add the wrapped block's wall time to bucket `name` of the current request."""
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.durations[name] += time.perf_counter() - start
+
+
+class TimedTemplate:
+    def __init__(self, template):
+        self.template = template
+
+    @property
+    def origin(self):
+        return self.template.origin
+
+    def render(self, context=None, request=None):
+        with timed('render'):
+            return self.template.render(context, request)
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """The stock Django template backend, with top-level renders timed as 'render'."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name))
@@ -1,61 +1,144 @@
-import joblib
 import numpy as np
-import os
-from django.conf import settings
 
-# Paths to model files
-MODEL_PATH = os.path.join(settings.BASE_DIR, 'ai_engine', 'model', 'model.joblib')
-SCALER_PATH = os.path.join(settings.BASE_DIR, 'ai_engine', 'model', 'scaler.joblib')
+from health.utils import RULES_VERSION, predict_health_vectorized as predict_rules_vectorized
 
-# Load model and scaler once at startup
-try:
-    model = joblib.load(MODEL_PATH)
-    scaler = joblib.load(SCALER_PATH)
-    print("✅ AI model and scaler loaded successfully!")
-except Exception as e:
-    print(f"⚠️ Error loading AI model: {e}")
-    model, scaler = None, None
+from .prediction_cache import prediction_cache, quantize
+from .registry import model_registry
+from .timing import timed
 
+# Dummy attendance % (the model was trained with it as a feature)
+ATTENDANCE_PERCENTAGE = 95.0
+DEFAULT_BMI = 18.5
 
-def predict_health(hr, spo2, br, temp, weight, height):
+# Decision-function cut-off between "Mild" and "Critical" anomalies
+MILD_THRESHOLD = -0.1
+
+
+def _to_float_array(values):
+    """Convert a sequence to floats, turning None/blank/invalid entries into NaN."""
+    out = np.empty(len(values), dtype=float)
+    for i, v in enumerate(values):
+        try:
+            out[i] = float(v)
+        except (TypeError, ValueError):
+            out[i] = np.nan
+    return out
+
+
+def _readings_to_columns(readings):
     """
-    Predict health status using Isolation Forest.
-    Returns: (score, label)
+    Accepts either a list of VitalRecord-like objects or an (N, 6) array-like
+    of (hr, spo2, br, temp, weight, height) rows.
+    Returns the six columns as float arrays.
+    """
+    if len(readings) and hasattr(readings[0], 'heart_rate'):
+        rows = [
+            (v.heart_rate, v.spo2, v.breathing_rate, v.temperature_c, v.weight_kg, v.height_cm)
+            for v in readings
+        ]
+    else:
+        rows = readings
+
+    if isinstance(rows, np.ndarray) and rows.dtype.kind == 'f':
+        data = rows.reshape(-1, 6)
+        return [data[:, i] for i in range(6)]
+
+    rows = list(rows)
+    return [_to_float_array([r[i] for r in rows]) for i in range(6)]
+
+
+def build_features(hr, spo2, temp, weight, height):
+    """
+    Build the (N, 5) model input from column arrays:
+    temperature (°F), spo2, pulse, bmi, attendance_percentage.
+    Invalid or missing height/weight fall back to a BMI of 18.5.
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        height_m = height / 100
+        bmi = weight / (height_m ** 2)
+    bmi = np.where(np.isfinite(bmi), bmi, DEFAULT_BMI)
+
+    return np.column_stack([
+        temp * 9 / 5 + 32,  # °C → °F
+        spo2,
+        hr,
+        bmi,
+        np.full(len(hr), ATTENDANCE_PERCENTAGE),
+    ])
+
+
+def labels_from_scores(raw_scores):
+    """
+    Map raw IsolationForest decision_function values to labels.
+    predict() is just decision_function() >= 0, so one pass gives both.
     """
+    return np.where(
+        raw_scores >= 0, "Healthy",
+        np.where(raw_scores > MILD_THRESHOLD, "Mild", "Critical")
+    )
+
+
+def predict_health_batch(readings, return_version=False):
+    """
+    Score many readings with a single scaler and a single forest pass.
+    `readings` is a list of VitalRecords or an (N, 6) array-like of
+    (hr, spo2, br, temp, weight, height).
+    Returns: list of (score, label) in input order, or
+    (model_version, results) when return_version is True.
+    """
+    version, model, scaler = model_registry.get_versioned()
+    if model is None or scaler is None:
+        # Model failed to load: fall back to the rule-based scorer, recorded as
+        # its own version so `rescore_vitals --model-version rules` can redo them
+        version = RULES_VERSION
+    with timed('inference'):
+        results = _score(readings, version, model, scaler)
+    return (version or '', results) if return_version else results
+
+
+def _score(readings, version, model, scaler):
+    if len(readings) == 0:
+        return []
+
+    hr, spo2, br, temp, weight, height = _readings_to_columns(readings)
     if model is None or scaler is None:
-        return 0.0, "Model Not Loaded"
-
-    # Calculate BMI safely
-    try:
-        height_m = float(height) / 100
-        bmi = float(weight) / (height_m ** 2)
-    except Exception:
-        bmi = 18.5
-
-    # Dummy attendance %
-    attendance_percentage = 95.0
-
-    # Convert input to match model format
-    features = np.array([[temp * 9/5 + 32,  # °C → °F
-                          float(spo2),
-                          float(hr),
-                          float(bmi),
-                          attendance_percentage]])
-
-    # Scale
+        risks, labels = predict_rules_vectorized(hr, spo2, br, temp, weight, height)
+        # The rules score risk (0 = fine); stored scores use the model's scale,
+        # where higher is healthier, so class averages can mix the two
+        return [(round(100.0 - float(r), 1), str(l)) for r, l in zip(risks, labels)]
+
+    # Quantized with or without the cache, so a reading scores the same either way
+    features = quantize(build_features(hr, spo2, temp, weight, height))
+    if not prediction_cache.enabled:
+        return _run_model(features, model, scaler)
+
+    # Screening readings repeat a lot: score each distinct input once, and
+    # only the ones the cache has not seen under this model version
+    unique, inverse = np.unique(features, axis=0, return_inverse=True)
+    keys = [row.tobytes() for row in unique]
+    known = prediction_cache.get_many(version, keys)
+    missing = [i for i, key in enumerate(keys) if key not in known]
+    if missing:
+        fresh = dict(zip((keys[i] for i in missing), _run_model(unique[missing], model, scaler)))
+        prediction_cache.set_many(version, fresh)
+        known.update(fresh)
+    return [known[keys[i]] for i in inverse.ravel()]
+
+
+def _run_model(features, model, scaler):
     scaled_features = scaler.transform(features)
+    raw_scores = model.decision_function(scaled_features)
+    labels = labels_from_scores(raw_scores)
 
-    # Predict with IsolationForest
-    prediction = model.predict(scaled_features)[0]  # -1 = anomaly, 1 = normal
-    score = model.decision_function(scaled_features)[0]
+    norm_scores = np.round((1 - np.abs(raw_scores)) * 100, 2)
+    return [(float(s), str(l)) for s, l in zip(norm_scores, labels)]
 
-    # Label conversion
-    if prediction == 1:
-        label = "Healthy"
-    elif score > -0.1:
-        label = "Mild"
-    else:
-        label = "Critical"
 
-    norm_score = round((1 - abs(score)) * 100, 2)
-    return norm_score, label
+def predict_health(hr, spo2, br, temp, weight, height, return_version=False):
+    """
+    Predict health status using Isolation Forest.
+    Returns: (score, label), or (score, label, model_version) when return_version is True.
+    """
+    version, results = predict_health_batch([(hr, spo2, br, temp, weight, height)], return_version=True)
+    score, label = results[0]
+    return (score, label, version) if return_version else (score, label)
@@ -0,0 +1,137 @@
+# classroom/asgi.py
+"""
+ASGI endpoint for the live classroom board (Server-Sent Events).
+
+It sits in front of Django's ASGI app (rakshara_proj.asgi) rather than
+being a Django view: a request that goes through a sync-only middleware
+such as WhiteNoise keeps a thread of its own until the response ends,
+which for an SSE stream is minutes. Here the session and classroom are
+checked in one short call on the shared thread pool, after which an idle
+subscriber is only a coroutine waiting on its queue. Because no middleware
+runs for it, the Host header is checked against ALLOWED_HOSTS here.
+"""
+import asyncio
+from http.cookies import SimpleCookie
+from importlib import import_module
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user
+from django.db import close_old_connections
+from django.http import HttpRequest
+from django.http.request import split_domain_port, validate_host
+from django.urls import Resolver404, resolve
+
+from .live import get_broker, sse_message
+from .models import VirtualClassroom
+
+# Reconnect delay for the browser and keep-alive interval
+LIVE_BOARD_RETRY_MS = 3000
+LIVE_BOARD_HEARTBEAT_SECONDS = 15
+LIVE_BOARD_URL_NAME = 'classroom_live'
+
+
+def _cookies(scope):
+    cookie = SimpleCookie()
+    for name, value in scope.get('headers', []):
+        if name == b'cookie':
+            cookie.load(value.decode('latin-1'))
+    return {key: morsel.value for key, morsel in cookie.items()}
+
+
+def _allowed_host(scope):
+    """True if the request's Host is in ALLOWED_HOSTS, as HttpRequest.get_host() checks it."""
+    host = next((value.decode('latin-1') for name, value in scope.get('headers', []) if name == b'host'), '')
+    if not host and scope.get('server'):
+        host = '%s:%s' % tuple(scope['server'])
+    allowed_hosts = settings.ALLOWED_HOSTS
+    if settings.DEBUG and not allowed_hosts:
+        allowed_hosts = ['.localhost', '127.0.0.1', '[::1]']
+    domain, _port = split_domain_port(host)
+    return bool(domain) and validate_host(domain, allowed_hosts)
+
+
+def _teacher_classroom(session_key, pk):
+    """The classroom `pk` if the session belongs to its teacher, else None."""
+    # Runs on a default-executor thread outside Django's request cycle: close its connection here
+    close_old_connections()
+    try:
+        if not session_key:
+            return None
+        request = HttpRequest()
+        request.session = import_module(settings.SESSION_ENGINE).SessionStore(session_key)
+        user = get_user(request)
+        if not getattr(user, 'is_teacher', False):
+            return None
+        return VirtualClassroom.objects.filter(id=pk, teacher=user).first()
+    finally:
+        close_old_connections()
+
+
+async def _send_json(send, status, body):
+    await send({'type': 'http.response.start', 'status': status,
+                'headers': [(b'content-type', b'application/json')]})
+    await send({'type': 'http.response.body', 'body': body.encode()})
+
+
+async def live_board(scope, receive, send, pk):
+    if not _allowed_host(scope):
+        await _send_json(send, 400, '{"error": "Invalid host."}')
+        return
+    vc = await sync_to_async(_teacher_classroom, thread_sensitive=False)(
+        _cookies(scope).get(settings.SESSION_COOKIE_NAME), pk
+    )
+    if vc is None:
+        await _send_json(send, 404, '{"error": "Classroom not found."}')
+        return
+
+    subscription = get_broker().subscribe(vc.id)
+    disconnected = asyncio.Event()
+
+    async def watch_disconnect():
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+        disconnected.set()
+        subscription.put(None)  # wake the stream loop now rather than at the next keep-alive
+
+    watcher = asyncio.create_task(watch_disconnect())
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + settings.LIVE_BOARD_MAX_SECONDS
+    try:
+        await send({'type': 'http.response.start', 'status': 200, 'headers': [
+            (b'content-type', b'text/event-stream'),
+            (b'cache-control', b'no-cache'),
+            (b'x-accel-buffering', b'no'),  # don't let nginx buffer the stream
+        ]})
+        await send({'type': 'http.response.body', 'body': f"retry: {LIVE_BOARD_RETRY_MS}\n\n".encode(),
+                    'more_body': True})
+        while not disconnected.is_set() and (remaining := deadline - loop.time()) > 0:
+            event = await subscription.get(min(LIVE_BOARD_HEARTBEAT_SECONDS, remaining))
+            if disconnected.is_set():
+                break
+            message = ": keep-alive\n\n" if event is None else \
+                sse_message(event, event='vital', event_id=event['vital_id'])
+            await send({'type': 'http.response.body', 'body': message.encode(), 'more_body': True})
+        if not disconnected.is_set():
+            # Ends this stream; the browser reconnects after `retry`
+            await send({'type': 'http.response.body', 'body': b''})
+    finally:
+        subscription.close()
+        watcher.cancel()
+
+
+class LiveBoardRouter:
+    """Serves the live board URL itself and passes everything else to `app` (Django)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'http' and scope.get('method') == 'GET' and scope['path'].endswith('/live/'):
+            try:
+                match = resolve(scope['path'])
+            except Resolver404:
+                match = None
+            if match is not None and match.url_name == LIVE_BOARD_URL_NAME:
+                return await live_board(scope, receive, send, match.kwargs['pk'])
+        return await self.app(scope, receive, send)
@@ -0,0 +1,252 @@
+# classroom/live.py
+"""
+Live classroom board: new VitalRecords pushed to Server-Sent Events
+subscribers (classroom.asgi.LiveBoardRouter).
+
+Subscribers are asyncio queues on the ASGI event loop, so an idle
+connection costs a queue, not a thread. Publishing is thread-safe and is
+done from the (sync) request that saved the readings, after commit.
+
+With LIVE_BOARD_REDIS_URL set, events go through Redis pub/sub so the
+subscribers of every worker process see them; each process then runs one
+listener thread, however many subscribers it has. Otherwise only the
+subscribers of the publishing process are reached.
+"""
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+
+logger = logging.getLogger('rakshara.live')
+
+CHANNEL_PREFIX = 'rakshara:classroom'
+# Events a slow subscriber may fall behind by before new ones are dropped for it
+SUBSCRIBER_QUEUE_SIZE = 100
+# Redis listener reconnect backoff: first wait, doubled up to the cap
+LISTENER_RETRY_SECONDS = 1.0
+LISTENER_MAX_RETRY_SECONDS = 30.0
+
+
+class Subscription:
+    def __init__(self, broker, classroom_id):
+        self.broker = broker
+        self.classroom_id = classroom_id
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.dropped = 0
+
+    def put(self, event):
+        # Runs on the subscriber's loop
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    async def get(self, timeout):
+        """The next event, or None after `timeout` seconds without one."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class LocalBroker:
+    """Fans events out to the subscribers of this process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = defaultdict(set)  # classroom id -> {Subscription}
+
+    def subscribe(self, classroom_id):
+        """Call from the event loop that will read the subscription."""
+        subscription = Subscription(self, classroom_id)
+        with self._lock:
+            self._subscriptions[classroom_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscriptions.get(subscription.classroom_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscriptions[subscription.classroom_id]
+
+    def subscriber_count(self, classroom_id=None):
+        with self._lock:
+            if classroom_id is not None:
+                return len(self._subscriptions.get(classroom_id, ()))
+            return sum(len(subs) for subs in self._subscriptions.values())
+
+    @property
+    def has_subscribers(self):
+        with self._lock:
+            return bool(self._subscriptions)
+
+    def publish(self, classroom_id, event):
+        self.deliver(classroom_id, event)
+
+    def deliver(self, classroom_id, event):
+        """Hand `event` to this process's subscribers of the classroom; safe from any thread."""
+        with self._lock:
+            subscribers = list(self._subscriptions.get(classroom_id, ()))
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.put, event)
+            except RuntimeError:
+                # Its event loop has shut down
+                self.unsubscribe(subscription)
+
+
+class RedisBroker(LocalBroker):
+    """
+    Publishes to Redis; one listener thread per process relays every
+    classroom channel to the local subscribers. `client` is anything with
+    redis-py's publish() and pubsub() (psubscribe/listen), so tests and
+    local setups can pass a stand-in.
+    """
+
+    def __init__(self, url=None, client=None):
+        super().__init__()
+        if client is None:
+            import redis  # optional dependency
+
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self._listener = None
+
+    @property
+    def has_subscribers(self):
+        # Subscribers may be in other processes
+        return True
+
+    def subscribe(self, classroom_id):
+        self._ensure_listener()
+        return super().subscribe(classroom_id)
+
+    def publish(self, classroom_id, event):
+        # Runs in an on_commit hook: the readings are saved, so a Redis outage only costs the live update
+        try:
+            self.client.publish(f"{CHANNEL_PREFIX}:{classroom_id}", json.dumps(event))
+        except Exception as e:
+            logger.warning("Live board publish to classroom %s failed: %s", classroom_id, e)
+
+    def _ensure_listener(self):
+        with self._lock:
+            if self._listener is None:
+                self._listener = threading.Thread(target=self._listen, name='live-board-redis', daemon=True)
+                self._listener.start()
+
+    def _listen(self):
+        """Relay messages until the process exits, reconnecting with backoff when Redis drops."""
+        delay = LISTENER_RETRY_SECONDS
+        while True:
+            pubsub = None
+            try:
+                pubsub = self.client.pubsub()
+                pubsub.psubscribe(f"{CHANNEL_PREFIX}:*")
+                delay = LISTENER_RETRY_SECONDS
+                for message in pubsub.listen():
+                    self._relay(message)
+                logger.warning("Live board Redis subscription ended; reconnecting in %.0fs", delay)
+            except Exception as e:
+                logger.warning("Live board Redis listener failed (%s); reconnecting in %.0fs", e, delay)
+            finally:
+                if pubsub is not None:
+                    try:
+                        pubsub.close()
+                    except Exception:
+                        pass
+            time.sleep(delay)
+            delay = min(delay * 2, LISTENER_MAX_RETRY_SECONDS)
+
+    def _relay(self, message):
+        if message.get('type') != 'pmessage':
+            return
+        channel = message['channel']
+        if isinstance(channel, bytes):
+            channel = channel.decode()
+        try:
+            classroom_id = int(channel.rsplit(':', 1)[1])
+            event = json.loads(message['data'])
+        except (ValueError, IndexError):
+            return
+        self.deliver(classroom_id, event)
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    with _broker_lock:
+        if _broker is None:
+            url = settings.LIVE_BOARD_REDIS_URL
+            _broker = RedisBroker(url) if url else LocalBroker()
+        return _broker
+
+
+def set_broker(broker):
+    """Swap the process's broker (tests, or a custom backend); returns the previous one."""
+    global _broker
+    with _broker_lock:
+        previous, _broker = _broker, broker
+    return previous
+
+
+def vital_event(record, student_code):
+    return {
+        'vital_id': record.pk,
+        'student_id': record.student_id,
+        'student_code': student_code,
+        'recorded_at': record.recorded_at.isoformat(),
+        'heart_rate': record.heart_rate,
+        'spo2': record.spo2,
+        'breathing_rate': record.breathing_rate,
+        'temperature_c': record.temperature_c,
+        'prediction_score': record.prediction_score,
+        'prediction_label': record.prediction_label,
+    }
+
+
+def publish_vitals(records):
+    """Push new VitalRecords to the live boards of their students' classrooms (one query)."""
+    from .models import VirtualClassroom
+
+    broker = get_broker()
+    records = [r for r in records if r.pk]
+    if not records or not broker.has_subscribers:
+        return 0
+
+    memberships = VirtualClassroom.students.through.objects.filter(
+        studentprofile_id__in={r.student_id for r in records}
+    ).values_list('studentprofile_id', 'virtualclassroom_id', 'studentprofile__student_code')
+    classes = defaultdict(list)  # student id -> [(classroom id, student code)]
+    for student_id, classroom_id, student_code in memberships:
+        classes[student_id].append((classroom_id, student_code))
+
+    published = 0
+    for record in records:
+        for classroom_id, student_code in classes[record.student_id]:
+            broker.publish(classroom_id, vital_event(record, student_code))
+            published += 1
+    return published
+
+
+def sse_message(data, event=None, event_id=None):
+    """One Server-Sent Events message (JSON data)."""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    if event:
+        lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data)}")
+    return "\n".join(lines) + "\n\n"
@@ -0,0 +1,125 @@
+# classroom/management/commands/bench_live_board.py
+import asyncio
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import School, User
+from classroom.asgi import LiveBoardRouter
+from classroom.live import get_broker
+from classroom.models import VirtualClassroom
+
+
+class _Subscriber:
+    """One SSE client driving the ASGI app directly (no sockets)."""
+
+    def __init__(self, app, path, cookie, host):
+        self.app = app
+        self.scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+            'method': 'GET', 'scheme': 'http', 'path': path, 'raw_path': path.encode(),
+            'query_string': b'', 'root_path': '',
+            'headers': [(b'host', host.encode()), (b'cookie', cookie.encode()), (b'accept', b'text/event-stream')],
+            'client': ('127.0.0.1', 0), 'server': (host, 80),
+        }
+        self.status = None
+        self.connected = asyncio.Event()
+        self.received = {}  # vital id -> perf_counter() at arrival
+        self._requested = False
+
+    async def receive(self):
+        if not self._requested:
+            self._requested = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        await asyncio.Event().wait()  # never disconnects; the task is cancelled instead
+
+    async def send(self, message):
+        if message['type'] == 'http.response.start':
+            self.status = message['status']
+        elif message['type'] == 'http.response.body':
+            self.connected.set()
+            for line in message.get('body', b'').decode().splitlines():
+                if line.startswith('id: '):
+                    self.received[int(line[4:])] = time.perf_counter()
+
+    async def run(self):
+        await self.app(self.scope, self.receive, self.send)
+
+
+class Command(BaseCommand):
+    help = ("Load-test the live classroom board: connect many idle SSE subscribers to the ASGI app "
+            "in-process, then time the fan-out of published readings. Uses (and removes) a throwaway class.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--subscribers', type=int, default=500)
+        parser.add_argument('--events', type=int, default=20)
+        parser.add_argument('--idle', type=float, default=2.0, help="Seconds to hold the subscribers idle.")
+
+    def handle(self, *args, **options):
+        school = School.objects.create(name="Live Board Benchmark", school_code="lbb")
+        try:
+            teacher = User.objects.create_user("lbb-teacher", is_teacher=True, school=school)
+            vc = VirtualClassroom.objects.create(school=school, teacher=teacher, class_name="1", section="a")
+            client = Client()
+            client.force_login(teacher)
+            cookie = f"{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}"
+            asyncio.run(self._bench(vc, cookie, options))
+        finally:
+            User.objects.filter(school=school).delete()
+            school.delete()
+
+    async def _bench(self, vc, cookie, options):
+        app = LiveBoardRouter(None)  # the live board URL never reaches Django
+        path = await sync_to_async(reverse)('classroom_live', args=[vc.id])
+        host = settings.ALLOWED_HOSTS[-1]
+        broker = get_broker()
+
+        # One subscriber first, so Django's sync-to-async executor thread already exists
+        subscribers = [_Subscriber(app, path, cookie, host)]
+        tasks = [asyncio.create_task(subscribers[0].run())]
+        await subscribers[0].connected.wait()
+        if subscribers[0].status != 200:
+            raise SystemExit(f"Live board answered {subscribers[0].status}.")
+        threads_before = threading.active_count()
+
+        start = time.perf_counter()
+        for _ in range(options['subscribers'] - 1):
+            subscriber = _Subscriber(app, path, cookie, host)
+            subscribers.append(subscriber)
+            tasks.append(asyncio.create_task(subscriber.run()))
+        await asyncio.gather(*(s.connected.wait() for s in subscribers))
+        connect_time = time.perf_counter() - start
+
+        await asyncio.sleep(options['idle'])
+        threads_idle = threading.active_count()
+        self.stdout.write(
+            f"{len(subscribers)} subscribers connected in {connect_time:.2f}s "
+            f"({broker.subscriber_count(vc.id)} registered); threads {threads_before} -> {threads_idle} while idle"
+        )
+
+        latencies = []
+        for vital_id in range(1, options['events'] + 1):
+            event = {'vital_id': vital_id, 'student_id': 0, 'student_code': 'bench',
+                     'recorded_at': timezone.now().isoformat(), 'prediction_label': 'Healthy'}
+            sent = time.perf_counter()
+            # Publish from another thread, as a sync request would
+            await asyncio.to_thread(broker.publish, vc.id, event)
+            while not all(vital_id in s.received for s in subscribers):
+                await asyncio.sleep(0.001)
+            latencies.append(max(s.received[vital_id] for s in subscribers) - sent)
+
+        latencies.sort()
+        self.stdout.write(self.style.SUCCESS(
+            f"Fan-out of {len(latencies)} events to {len(subscribers)} subscribers: "
+            f"median {latencies[len(latencies) // 2] * 1000:.1f} ms, max {latencies[-1] * 1000:.1f} ms"
+        ))
+
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
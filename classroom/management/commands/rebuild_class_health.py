@@ -0,0 +1,32 @@
+# classroom/management/commands/rebuild_class_health.py
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from classroom.signals import rebuild_daily_health
+
+
+def _parse_date(value):
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise CommandError(f"Invalid date '{value}', expected YYYY-MM-DD.")
+
+
+class Command(BaseCommand):
+    help = "Rebuild the ClassDailyHealth rollup from raw vitals over a date range."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='start', help="First day to rebuild (YYYY-MM-DD). Default: all history.")
+        parser.add_argument('--to', dest='end', help="Last day to rebuild (YYYY-MM-DD). Default: today.")
+        parser.add_argument('--classroom', type=int, action='append', dest='classrooms',
+                            help="Only rebuild this classroom id (repeatable).")
+
+    def handle(self, *args, **options):
+        start = _parse_date(options['start']) if options['start'] else None
+        end = _parse_date(options['end']) if options['end'] else None
+        if start and end and start > end:
+            raise CommandError("--from must not be after --to.")
+
+        written = rebuild_daily_health(start=start, end=end, classroom_ids=options['classrooms'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {written} class-day rollup rows."))
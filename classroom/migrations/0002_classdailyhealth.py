@@ -0,0 +1,34 @@
+# Generated by Django 4.2 on 2026-10-18 16:31
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('classroom', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClassDailyHealth',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('reading_count', models.PositiveIntegerField(default=0)),
+                ('scored_count', models.PositiveIntegerField(default=0)),
+                ('score_sum', models.FloatField(default=0.0)),
+                ('min_score', models.FloatField(blank=True, null=True)),
+                ('max_score', models.FloatField(blank=True, null=True)),
+                ('healthy_count', models.PositiveIntegerField(default=0)),
+                ('watch_count', models.PositiveIntegerField(default=0)),
+                ('risk_count', models.PositiveIntegerField(default=0)),
+                ('classroom', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_health', to='classroom.virtualclassroom')),
+            ],
+            options={
+                'ordering': ['day'],
+                'unique_together': {('classroom', 'day')},
+            },
+        ),
+    ]
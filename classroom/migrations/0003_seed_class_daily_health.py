@@ -0,0 +1,59 @@
+# Seeds ClassDailyHealth from the vitals recorded before the rollup existed
+
+from django.db import migrations
+from django.db.models import Count, F, FloatField, Max, Min, Q, Sum, Value
+from django.db.models.functions import Coalesce, TruncDate
+
+# Frozen copy of classroom.models.HEALTH_BUCKETS at the time of this migration
+HEALTH_BUCKETS = {
+    'healthy': ('healthy', 'normal'),
+    'watch': ('watch', 'mild', 'moderate'),
+    'risk': ('high risk', 'critical'),
+}
+
+
+def _bucket_q(bucket):
+    q = Q()
+    for word in HEALTH_BUCKETS[bucket]:
+        q |= Q(prediction_label__icontains=word)
+    for earlier in HEALTH_BUCKETS:
+        if earlier == bucket:
+            break
+        for word in HEALTH_BUCKETS[earlier]:
+            q &= ~Q(prediction_label__icontains=word)
+    return q
+
+
+def seed_class_daily_health(apps, schema_editor):
+    VitalRecord = apps.get_model('health', 'VitalRecord')
+    ClassDailyHealth = apps.get_model('classroom', 'ClassDailyHealth')
+
+    aggregated = VitalRecord.objects.filter(student__virtual_classes__isnull=False).annotate(
+        classroom_id=F('student__virtual_classes'),
+        day=TruncDate('recorded_at'),
+    ).values('classroom_id', 'day').annotate(
+        reading_count=Count('id'),
+        scored_count=Count('prediction_score'),
+        score_sum=Coalesce(Sum('prediction_score'), Value(0.0), output_field=FloatField()),
+        min_score=Min('prediction_score'),
+        max_score=Max('prediction_score'),
+        healthy_count=Count('id', filter=_bucket_q('healthy')),
+        watch_count=Count('id', filter=_bucket_q('watch')),
+        risk_count=Count('id', filter=_bucket_q('risk')),
+    ).order_by()
+
+    # Rows written since 0002 only counted new vitals: replace them all
+    ClassDailyHealth.objects.all().delete()
+    ClassDailyHealth.objects.bulk_create([ClassDailyHealth(**values) for values in aggregated], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('classroom', '0002_classdailyhealth'),
+        ('health', '0003_vitalrecord_model_version'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_class_daily_health, migrations.RunPython.noop),
+    ]
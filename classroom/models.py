@@ -15,3 +15,53 @@ class VirtualClassroom(models.Model):
 
     def __str__(self):
         return f"{self.school.name} - {self.class_name}{self.section}"
+
+
+# Dashboard buckets for the two label sets in use ("Normal/Watch/High Risk"
+# from health.utils and "Healthy/Mild/Critical" from ai_engine.utils)
+HEALTH_BUCKETS = {
+    'healthy': ('healthy', 'normal'),
+    'watch': ('watch', 'mild', 'moderate'),
+    'risk': ('high risk', 'critical'),
+}
+
+
+def health_bucket(label):
+    """Return 'healthy', 'watch', 'risk' or None for a prediction label."""
+    label = (label or '').lower()
+    for bucket, words in HEALTH_BUCKETS.items():
+        if any(word in label for word in words):
+            return bucket
+    return None
+
+
+class ClassDailyHealth(models.Model):
+    """
+    Per-class, per-day rollup of VitalRecord scores and labels.
+    Updated incrementally as vitals are inserted; edits, deletes and class
+    membership changes rebuild the affected days (see classroom.signals).
+    `manage.py rebuild_class_health` rebuilds any range.
+    """
+    classroom = models.ForeignKey(VirtualClassroom, on_delete=models.CASCADE, related_name='daily_health')
+    day = models.DateField()
+    reading_count = models.PositiveIntegerField(default=0)
+    scored_count = models.PositiveIntegerField(default=0)
+    score_sum = models.FloatField(default=0.0)
+    min_score = models.FloatField(null=True, blank=True)
+    max_score = models.FloatField(null=True, blank=True)
+    healthy_count = models.PositiveIntegerField(default=0)
+    watch_count = models.PositiveIntegerField(default=0)
+    risk_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('classroom', 'day')
+        ordering = ['day']
+
+    @property
+    def avg_score(self):
+        if not self.scored_count:
+            return None
+        return self.score_sum / self.scored_count
+
+    def __str__(self):
+        return f"{self.classroom} @ {self.day}"
@@ -0,0 +1,217 @@
+# classroom/signals.py
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import Count, F, FloatField, Max, Min, Q, Sum, Value
+from django.db.models.functions import Coalesce, Greatest, Least, TruncDate
+from django.db.models.signals import pre_save, post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+from django.utils import timezone
+
+from health.leaderboard import mark_leaderboard_dirty
+from health.models import VitalRecord
+from .live import publish_vitals
+from .models import VirtualClassroom, ClassDailyHealth, HEALTH_BUCKETS, health_bucket
+
+
+def add_to_daily_health(records):
+    """
+    Fold newly inserted VitalRecords into the ClassDailyHealth rollup of every
+    class their student belongs to. Call this after bulk_create, which skips signals.
+    """
+    records = list(records)
+    if not records:
+        return
+
+    Membership = VirtualClassroom.students.through
+    classes_by_student = defaultdict(list)
+    for student_id, classroom_id in Membership.objects.filter(
+        studentprofile_id__in={r.student_id for r in records}
+    ).values_list('studentprofile_id', 'virtualclassroom_id'):
+        classes_by_student[student_id].append(classroom_id)
+
+    # Accumulate one delta per (classroom, day) so a whole class costs a few queries
+    deltas = {}
+    for r in records:
+        day = timezone.localdate(r.recorded_at)
+        for classroom_id in classes_by_student.get(r.student_id, ()):
+            d = deltas.setdefault((classroom_id, day), {
+                'reading_count': 0, 'scored_count': 0, 'score_sum': 0.0,
+                'min_score': None, 'max_score': None,
+                'healthy_count': 0, 'watch_count': 0, 'risk_count': 0,
+            })
+            d['reading_count'] += 1
+            if r.prediction_score is not None:
+                score = float(r.prediction_score)
+                d['scored_count'] += 1
+                d['score_sum'] += score
+                d['min_score'] = score if d['min_score'] is None else min(d['min_score'], score)
+                d['max_score'] = score if d['max_score'] is None else max(d['max_score'], score)
+            bucket = health_bucket(r.prediction_label)
+            if bucket:
+                d[f'{bucket}_count'] += 1
+
+    with transaction.atomic():
+        for (classroom_id, day), d in deltas.items():
+            row, _ = ClassDailyHealth.objects.get_or_create(classroom_id=classroom_id, day=day)
+            changes = {
+                field: F(field) + d[field]
+                for field in ('reading_count', 'scored_count', 'score_sum',
+                              'healthy_count', 'watch_count', 'risk_count')
+            }
+            if d['min_score'] is not None:
+                changes['min_score'] = Least(Coalesce('min_score', Value(d['min_score'])), Value(d['min_score']))
+                changes['max_score'] = Greatest(Coalesce('max_score', Value(d['max_score'])), Value(d['max_score']))
+            ClassDailyHealth.objects.filter(pk=row.pk).update(**changes)
+
+
+def _bucket_q(bucket):
+    """Q matching labels in `bucket`, respecting the precedence of health_bucket()."""
+    q = Q()
+    for word in HEALTH_BUCKETS[bucket]:
+        q |= Q(prediction_label__icontains=word)
+    for earlier in HEALTH_BUCKETS:
+        if earlier == bucket:
+            break
+        for word in HEALTH_BUCKETS[earlier]:
+            q &= ~Q(prediction_label__icontains=word)
+    return q
+
+
+def _start_of_day(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def rebuild_daily_health(start=None, end=None, classroom_ids=None):
+    """
+    Recompute ClassDailyHealth rows from raw vitals for days in [start, end]
+    (dates, inclusive; None means unbounded), using current class membership.
+    Returns the number of rows written.
+    """
+    # All class conditions go in one filter() so they share a single membership join
+    vital_filters = {'student__virtual_classes__isnull': False}
+    rollups = ClassDailyHealth.objects.all()
+    # Compare against datetime bounds (not __date) so the recorded_at index is usable
+    if start:
+        vital_filters['recorded_at__gte'] = _start_of_day(start)
+        rollups = rollups.filter(day__gte=start)
+    if end:
+        vital_filters['recorded_at__lt'] = _start_of_day(end + timedelta(days=1))
+        rollups = rollups.filter(day__lte=end)
+    if classroom_ids is not None:
+        vital_filters['student__virtual_classes__in'] = classroom_ids
+        rollups = rollups.filter(classroom_id__in=classroom_ids)
+    vitals = VitalRecord.objects.filter(**vital_filters)
+
+    aggregated = vitals.annotate(
+        classroom_id=F('student__virtual_classes'),
+        day=TruncDate('recorded_at'),
+    ).values('classroom_id', 'day').annotate(
+        reading_count=Count('id'),
+        scored_count=Count('prediction_score'),
+        score_sum=Coalesce(Sum('prediction_score'), Value(0.0), output_field=FloatField()),
+        min_score=Min('prediction_score'),
+        max_score=Max('prediction_score'),
+        healthy_count=Count('id', filter=_bucket_q('healthy')),
+        watch_count=Count('id', filter=_bucket_q('watch')),
+        risk_count=Count('id', filter=_bucket_q('risk')),
+    ).order_by()
+
+    rows = [ClassDailyHealth(**values) for values in aggregated]
+    with transaction.atomic():
+        rollups.delete()
+        ClassDailyHealth.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def _rebuild_days_for_students(student_ids, days, classroom_ids=None):
+    """Rebuild the rollup for `days` of the classes of `student_ids` (or of `classroom_ids`)."""
+    if classroom_ids is None:
+        classroom_ids = list(VirtualClassroom.students.through.objects.filter(
+            studentprofile_id__in=student_ids
+        ).values_list('virtualclassroom_id', flat=True).distinct())
+    for day in sorted(set(days)):
+        if classroom_ids:
+            rebuild_daily_health(day, day, classroom_ids)
+
+
+def _rebuild_span_of_students(student_ids, classroom_ids):
+    """Rebuild `classroom_ids` over the days the students have readings (after a membership change)."""
+    span = VitalRecord.objects.filter(student_id__in=student_ids).aggregate(
+        first=Min('recorded_at'), last=Max('recorded_at')
+    )
+    if span['first'] is not None and classroom_ids:
+        rebuild_daily_health(timezone.localdate(span['first']), timezone.localdate(span['last']), list(classroom_ids))
+
+
+@receiver(pre_save, sender=VitalRecord)
+def remember_rollup_day(sender, instance, raw=False, **kwargs):
+    # An edit may move a reading to another day; the old day needs correcting too
+    if raw or instance._state.adding:
+        return
+    previous = VitalRecord.objects.filter(pk=instance.pk).values_list('recorded_at', flat=True).first()
+    instance._previous_rollup_day = timezone.localdate(previous) if previous else None
+
+
+@receiver(post_save, sender=VitalRecord)
+def update_daily_health_on_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        add_to_daily_health([instance])
+        return
+    # Edits are rare: recompute the affected days instead of undoing the old values
+    days = {timezone.localdate(instance.recorded_at), getattr(instance, '_previous_rollup_day', None)}
+    _rebuild_days_for_students([instance.student_id], days - {None})
+
+
+@receiver(post_delete, sender=VitalRecord)
+def update_daily_health_on_delete(sender, instance, **kwargs):
+    _rebuild_days_for_students([instance.student_id], [timezone.localdate(instance.recorded_at)])
+
+
+@receiver(m2m_changed, sender=VirtualClassroom.students.through)
+def update_daily_health_on_membership_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear' and reverse:
+        # instance is a StudentProfile; post_clear no longer knows its classes
+        instance._cleared_classroom_ids = list(instance.virtual_classes.values_list('id', flat=True))
+    elif action in ('post_add', 'post_remove') and pk_set:
+        if reverse:
+            _rebuild_span_of_students([instance.pk], pk_set)
+        else:
+            _rebuild_span_of_students(pk_set, [instance.pk])
+    elif action == 'post_clear':
+        if reverse:
+            _rebuild_span_of_students([instance.pk], getattr(instance, '_cleared_classroom_ids', ()))
+        else:
+            # The class has no students left
+            ClassDailyHealth.objects.filter(classroom=instance).delete()
+
+
+@receiver(post_save, sender=VitalRecord)
+def publish_live_vital_on_save(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        transaction.on_commit(lambda: publish_vitals([instance]))
+
+
+@receiver(post_save, sender=VirtualClassroom)
+@receiver(post_delete, sender=VirtualClassroom)
+def update_leaderboard_on_class_change(sender, instance, **kwargs):
+    mark_leaderboard_dirty(instance.school_id)
+
+
+@receiver(m2m_changed, sender=VirtualClassroom.students.through)
+def update_leaderboard_on_membership_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        mark_leaderboard_dirty(instance.school_id)
+    elif pk_set:
+        # instance is a StudentProfile added to / removed from these classes
+        school_ids = VirtualClassroom.objects.filter(pk__in=pk_set).values_list('school_id', flat=True)
+        for school_id in set(school_ids):
+            mark_leaderboard_dirty(school_id)
+    else:
+        # reverse clear(): the classes are already gone, fall back to the student's school
+        mark_leaderboard_dirty(instance.user.school_id)
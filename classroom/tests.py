@@ -1,3 +1,455 @@
-from django.test import TestCase
+import asyncio
+import importlib
+import json
+import queue
+import threading
+from datetime import timedelta
+from unittest.mock import patch
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.apps import apps
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import School, User
+from health.models import VitalRecord
+from health.series import MAX_POINTS, MIN_POINTS, lttb_indices, point_budget
+from health.tests import make_class, record_vital
+from . import live, views
+from .asgi import LiveBoardRouter, _teacher_classroom
+from .models import ClassDailyHealth, VirtualClassroom
+from .signals import rebuild_daily_health
+
+
+class StubRedis:
+    """Just enough of redis-py's publish()/pubsub() for RedisBroker, in memory."""
+
+    def __init__(self):
+        self.messages = queue.Queue()
+        self.patterns = []
+
+    def publish(self, channel, data):
+        self.messages.put({'type': 'pmessage', 'channel': channel.encode(), 'data': data.encode()})
+
+    def pubsub(self):
+        return self
+
+    def psubscribe(self, pattern):
+        self.patterns.append(pattern)
+
+    def listen(self):
+        while True:
+            yield self.messages.get()
+
+
+class LiveBrokerTests(SimpleTestCase):
+    def _fan_out(self, broker):
+        async def run():
+            subscriptions = [broker.subscribe(7) for _ in range(3)]
+            other = broker.subscribe(8)
+            # Published from another thread, as a sync request would
+            await asyncio.to_thread(broker.publish, 7, {'vital_id': 1})
+            events = [await s.get(2) for s in subscriptions]
+            stray = await other.get(0.05)
+            for s in subscriptions + [other]:
+                s.close()
+            return events, stray
+
+        return asyncio.run(run())
+
+    def test_local_broker_fans_out_to_the_classroom_only(self):
+        broker = live.LocalBroker()
+        events, stray = self._fan_out(broker)
+        self.assertEqual(events, [{'vital_id': 1}] * 3)
+        self.assertIsNone(stray)
+        self.assertEqual(broker.subscriber_count(), 0)
+        self.assertFalse(broker.has_subscribers)
+
+    def test_redis_broker_relays_through_the_client(self):
+        client = StubRedis()
+        broker = live.RedisBroker(client=client)
+        events, stray = self._fan_out(broker)
+        self.assertEqual(events, [{'vital_id': 1}] * 3)
+        self.assertIsNone(stray)
+        self.assertEqual(client.patterns, [f"{live.CHANNEL_PREFIX}:*"])
+
+    def test_slow_subscriber_drops_instead_of_growing(self):
+        async def run():
+            subscription = live.LocalBroker().subscribe(1)
+            for i in range(live.SUBSCRIBER_QUEUE_SIZE + 5):
+                subscription.put({'vital_id': i})
+            return subscription
+
+        subscription = asyncio.run(run())
+        self.assertEqual(subscription.queue.qsize(), live.SUBSCRIBER_QUEUE_SIZE)
+        self.assertEqual(subscription.dropped, 5)
+
+    def test_sse_message(self):
+        self.assertEqual(
+            live.sse_message({'a': 1}, event='vital', event_id=3),
+            'id: 3\nevent: vital\ndata: {"a": 1}\n\n',
+        )
+
+
+    def test_listener_reconnects_after_redis_drops(self):
+        class FlakyRedis(StubRedis):
+            """Drops the connection on the first listen(), as a Redis restart would."""
+            failures = 1
+
+            def listen(self):
+                if self.failures:
+                    self.failures -= 1
+                    raise ConnectionError("Connection closed by server.")
+                return super().listen()
+
+        client = FlakyRedis()
+        with patch.object(live, 'LISTENER_RETRY_SECONDS', 0.01), self.assertLogs('rakshara.live', 'WARNING') as logs:
+            events, _ = self._fan_out(live.RedisBroker(client=client))
+        self.assertEqual(events, [{'vital_id': 1}] * 3)
+        self.assertEqual(client.patterns, [f"{live.CHANNEL_PREFIX}:*"] * 2)
+        self.assertIn("Connection closed by server", logs.output[0])
+
+    def test_redis_publish_errors_are_logged(self):
+        class DownRedis(StubRedis):
+            def publish(self, channel, data):
+                raise ConnectionError("Error 111 connecting to redis")
+
+        with self.assertLogs('rakshara.live', 'WARNING') as logs:
+            live.RedisBroker(client=DownRedis()).publish(7, {'vital_id': 1})
+        self.assertIn("classroom 7", logs.output[0])
+
+
+def make_live_class():
+    school = School.objects.create(name="Live School", school_code="lvs")
+    teacher = User.objects.create_user("live_teacher", password='pw', is_teacher=True, school=school)
+    vc = VirtualClassroom.objects.create(school=school, teacher=teacher, class_name='5', section='a')
+    student = User.objects.create_user("live_student", password='pw', is_student=True, school=school)
+    vc.students.add(student.student_profile)
+    return teacher, vc, student.student_profile
+
+
+class LiveBoardStreamTests(TransactionTestCase):
+    # The router checks the session on a worker thread, so the fixtures must be committed
+
+    def setUp(self):
+        self.previous_broker = live.set_broker(live.LocalBroker())
+        self.teacher, self.vc, self.student = make_live_class()
+        self.path = reverse('classroom_live', args=[self.vc.id])
+
+    def tearDown(self):
+        live.set_broker(self.previous_broker)
+
+    def _cookie_for(self, user):
+        self.client.force_login(user)
+        return f"{settings.SESSION_COOKIE_NAME}={self.client.cookies[settings.SESSION_COOKIE_NAME].value}"
+
+    def _stream(self, cookie, during=None, host='testserver'):
+        """Run the live board until the client disconnects; returns (status, body)."""
+        scope = {
+            'type': 'http', 'method': 'GET', 'path': self.path, 'query_string': b'',
+            'headers': [(b'host', host.encode()), (b'cookie', cookie.encode())],
+        }
+        sent = []
+        disconnect = threading.Event()
+
+        async def receive():
+            if not sent:
+                return {'type': 'http.request', 'body': b''}
+            await asyncio.to_thread(disconnect.wait)
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            sent.append(message)
+
+        async def run():
+            async def django_app(scope, receive, send):
+                raise AssertionError("The live board must not reach Django")
+
+            stream = asyncio.create_task(LiveBoardRouter(django_app)(scope, receive, send))
+            while len(sent) < 2 and not stream.done():
+                await asyncio.sleep(0.01)
+            if during is not None and not stream.done():
+                await asyncio.to_thread(during)
+                while len(sent) < 3:
+                    await asyncio.sleep(0.01)
+            disconnect.set()
+            await asyncio.wait_for(stream, 2)
+
+        asyncio.run(run())
+        body = b''.join(m.get('body', b'') for m in sent if m['type'] == 'http.response.body')
+        return sent[0]['status'], body.decode()
+
+    def test_teacher_receives_new_vitals(self):
+        def record_vital():
+            VitalRecord.objects.create(
+                student=self.student, heart_rate=80, spo2=98, breathing_rate=18, temperature_c=36.6,
+                prediction_score=90.0, prediction_label="Healthy",
+            )
+
+        status, body = self._stream(self._cookie_for(self.teacher), during=record_vital)
+        self.assertEqual(status, 200)
+        self.assertTrue(body.startswith('retry: '))
+        vital = VitalRecord.objects.get()
+        self.assertIn(f"id: {vital.id}\nevent: vital\n", body)
+        data = json.loads(body.split('data: ', 1)[1].split('\n', 1)[0])
+        self.assertEqual(data['student_code'], self.student.student_code)
+        self.assertEqual(live.get_broker().subscriber_count(), 0)
+
+    def test_other_users_get_404(self):
+        status, body = self._stream(self._cookie_for(self.student.user))
+        self.assertEqual(status, 404)
+        status, _ = self._stream(f"{settings.SESSION_COOKIE_NAME}=nope")
+        self.assertEqual(status, 404)
+
+    def test_hosts_outside_allowed_hosts_are_refused(self):
+        cookie = self._cookie_for(self.teacher)
+        with patch('classroom.asgi._teacher_classroom') as lookup:
+            status, body = self._stream(cookie, host='evil.example.com')
+        self.assertEqual(status, 400)
+        self.assertIn("Invalid host", body)
+        lookup.assert_not_called()
+
+    def test_classroom_lookup_closes_its_connection(self):
+        with patch('classroom.asgi.close_old_connections') as close:
+            self.assertIsNone(_teacher_classroom('nope', self.vc.id))
+        self.assertEqual(close.call_count, 2)
+
+
+class LiveBoardPublishTests(TestCase):
+    def test_no_membership_query_without_subscribers(self):
+        previous = live.set_broker(live.LocalBroker())
+        try:
+            teacher, vc, student = make_live_class()
+            record = VitalRecord.objects.create(
+                student=student, heart_rate=80, spo2=98, breathing_rate=18, temperature_c=36.6,
+                prediction_score=90.0, prediction_label="Healthy",
+            )
+            with self.assertNumQueries(0):
+                self.assertEqual(live.publish_vitals([record]), 0)
+        finally:
+            live.set_broker(previous)
+
+    def test_wsgi_view_explains_it_needs_asgi(self):
+        teacher, vc, student = make_live_class()
+        self.client.force_login(teacher)
+        self.assertEqual(self.client.get(reverse('classroom_live', args=[vc.id])).status_code, 501)
+
+    def test_live_board_script_only_under_asgi(self):
+        teacher, vc, student = make_live_class()
+        url = reverse('classroom_detail', args=[vc.id])
+        self.client.force_login(teacher)
+        self.assertNotContains(self.client.get(url), 'new EventSource')
+
+        self.async_client.force_login(teacher)
+        response = async_to_sync(self.async_client.get)(url)
+        self.assertContains(response, 'new EventSource')
+
+
+class BulkVitalsUploadTests(TestCase):
+    def setUp(self):
+        self.school, self.teacher, self.vc, self.students = make_class(3)
+        self.url = reverse('bulk_vitals_upload', args=[self.vc.id])
+        self.client.force_login(self.teacher)
+
+    def row(self, student, **overrides):
+        return {'student_code': student.student_code, 'heart_rate': 80, 'spo2': 98,
+                'breathing_rate': 18, 'temperature': 36.6, **overrides}
+
+    def post(self, rows):
+        return self.client.post(self.url, json.dumps({'readings': rows}), content_type='application/json')
+
+    def test_json_upload_saves_valid_rows_and_reports_the_rest(self):
+        first, second, third = self.students
+        response = self.post([
+            self.row(first, weight_kg=40),
+            self.row(second),
+            {'student_code': 'nope'},
+            self.row(third, heart_rate='x'),
+            self.row(third, spo2='nan'),
+            self.row(third, temperature='inf'),
+            self.row(third, heart_rate='inf'),
+            {'student_code': third.student_code},
+            self.row(third),
+        ])
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(body['created'], 3)
+        self.assertEqual([r['row'] for r in body['rejected']], [3, 4, 5, 6, 7, 8])
+        self.assertEqual(body['rejected'][2]['error'], "Vitals must be finite numbers.")
+        self.assertEqual(VitalRecord.objects.count(), 3)
+        self.assertTrue(all(r['label'] for r in body['results']))
+
+        # Profile weight, latest-vital snapshot and the class rollup all follow the upload
+        first.refresh_from_db()
+        self.assertEqual(first.weight_kg, 40)
+        self.assertEqual(first.latest_vital_id, VitalRecord.objects.get(student=first).id)
+        self.assertEqual(ClassDailyHealth.objects.get(classroom=self.vc).reading_count, 3)
+
+    def test_csv_upload(self):
+        student = self.students[1]
+        csv_bytes = (
+            "student_code,heart_rate,spo2,breathing_rate,temperature\n"
+            f"{student.student_code},90,97,20,37.2\n"
+        ).encode()
+        response = self.client.post(self.url, {'file': SimpleUploadedFile('vitals.csv', csv_bytes)})
+        self.assertEqual(response.json()['created'], 1)
+        self.assertEqual(VitalRecord.objects.get().temperature_c, 37.2)
+
+    def test_only_the_class_teacher_may_upload(self):
+        self.client.force_login(self.students[0].user)
+        self.assertEqual(self.post([self.row(self.students[0])]).status_code, 403)
+        other = User.objects.create_user('other_teacher', is_teacher=True, school=self.school)
+        self.client.force_login(other)
+        self.assertEqual(self.post([self.row(self.students[0])]).status_code, 404)
+        self.client.force_login(self.teacher)
+        self.assertEqual(self.client.post(self.url, 'not json', content_type='application/json').status_code, 400)
+        self.assertFalse(VitalRecord.objects.exists())
+
+
+class DailyHealthRollupTests(TestCase):
+    """The incrementally maintained rollup must always equal a rebuild from raw vitals."""
+
+    def setUp(self):
+        self.school, self.teacher, self.vc, self.students = make_class(3)
+        self.other_class = VirtualClassroom.objects.create(school=self.school, teacher=self.teacher,
+                                                           class_name='6', section='b')
+        self.other_class.students.add(self.students[0])
+        now = timezone.now()
+        self.vitals = [
+            record_vital(student, now - timedelta(days=day), score=50.0 + 10 * i + day, label=label)
+            for i, student in enumerate(self.students)
+            for day, label in ((0, "Healthy"), (1, "Mild"), (3, "Critical"))
+        ]
+
+    def rows(self):
+        return sorted(
+            (r.classroom_id, r.day, r.reading_count, r.scored_count, round(r.score_sum, 6), r.min_score,
+             r.max_score, r.healthy_count, r.watch_count, r.risk_count)
+            for r in ClassDailyHealth.objects.all()
+        )
+
+    def assertMatchesRebuild(self):
+        incremental = self.rows()
+        rebuild_daily_health()
+        self.assertEqual(incremental, self.rows())
+
+    def test_inserts(self):
+        self.assertEqual(len(self.rows()), 6)
+        self.assertMatchesRebuild()
+
+    def test_edits_of_score_label_and_day(self):
+        vital = self.vitals[0]
+        vital.prediction_score, vital.prediction_label = 5.0, "Critical"
+        vital.save()
+        self.assertMatchesRebuild()
+        vital.recorded_at -= timedelta(days=2)
+        vital.save()
+        self.assertMatchesRebuild()
+
+    def test_deletes(self):
+        self.vitals[1].delete()
+        self.assertMatchesRebuild()
+        # The last reading of a class-day removes its row
+        for vital in self.vitals:
+            if vital.student_id == self.students[0].id and vital.id != self.vitals[1].id:
+                vital.delete()
+        self.assertFalse(ClassDailyHealth.objects.filter(classroom=self.other_class).exists())
+        self.assertMatchesRebuild()
+
+    def test_membership_changes(self):
+        first, second, third = self.students
+        self.other_class.students.add(second)
+        self.assertMatchesRebuild()
+        self.vc.students.remove(first)
+        self.assertMatchesRebuild()
+        second.virtual_classes.add(self.vc)  # already a member: no change
+        third.virtual_classes.clear()
+        self.assertMatchesRebuild()
+        self.other_class.students.clear()
+        self.assertFalse(ClassDailyHealth.objects.filter(classroom=self.other_class).exists())
+        self.assertMatchesRebuild()
+
+    def test_seed_migration_matches_rebuild(self):
+        migration = importlib.import_module('classroom.migrations.0003_seed_class_daily_health')
+        rebuild_daily_health()
+        expected = self.rows()
+        ClassDailyHealth.objects.all().delete()
+        migration.seed_class_daily_health(apps, None)
+        self.assertEqual(self.rows(), expected)
+
+
+class StudentHistoryTests(TestCase):
+    def setUp(self):
+        self.school, self.teacher, self.vc, (self.student,) = make_class(1)
+        self.url = reverse('view_student_history', args=[self.student.id])
+        self.client.force_login(self.teacher)
+
+    def test_cursor_pages_visit_every_reading_once_newest_first(self):
+        now = timezone.now()
+        # Pairs of readings share a timestamp, so the id tiebreak matters at page boundaries
+        VitalRecord.objects.bulk_create([
+            VitalRecord(student=self.student, recorded_at=now - timedelta(hours=i // 2),
+                        heart_rate=80, spo2=98, breathing_rate=18, temperature_c=36.6)
+            for i in range(2 * views.HISTORY_PAGE_SIZE + 7)
+        ])
+        expected = list(self.student.vitals.order_by('-recorded_at', '-id').values_list('id', flat=True))
+
+        seen, cursor, pages = [], None, 0
+        while True:
+            response = self.client.get(self.url, {'cursor': cursor} if cursor else {})
+            pages += 1
+            self.assertEqual(response.context['is_first_page'], cursor is None)
+            seen += [v.id for v in response.context['vitals']]
+            cursor = response.context['next_cursor']
+            if cursor is None:
+                break
+        self.assertEqual(pages, 3)
+        self.assertEqual(seen, expected)
+
+    def test_invalid_cursor_shows_the_first_page(self):
+        record_vital(self.student)
+        response = self.client.get(self.url, {'cursor': 'garbage'})
+        self.assertTrue(response.context['is_first_page'])
+        self.assertEqual(len(response.context['vitals']), 1)
+        self.assertIsNone(response.context['next_cursor'])
+
+    def test_chart_point_budget_is_clamped(self):
+        for requested, expected in [(None, 200), ('5', MIN_POINTS), ('500', 500), ('99999', MAX_POINTS), ('x', 200)]:
+            with self.subTest(points=requested):
+                response = self.client.get(self.url, {'points': requested} if requested else {})
+                self.assertEqual(response.context['chart_points'], expected)
+                self.assertEqual(point_budget(requested), expected)
+
+    def test_students_of_other_schools_are_not_found(self):
+        _, _, _, (outsider,) = make_class(1, school_code='other')
+        response = self.client.get(reverse('view_student_history', args=[outsider.id]))
+        self.assertEqual(response.status_code, 404)
+
+
+class LttbDownsamplingTests(SimpleTestCase):
+    def test_bounds(self):
+        ys = [float(i % 7) for i in range(1000)]
+        for threshold in (3, 10, 200, 999):
+            with self.subTest(threshold=threshold):
+                keep = lttb_indices([ys], threshold)
+                self.assertEqual(len(keep), threshold)
+                self.assertEqual(keep, sorted(set(keep)))
+                self.assertEqual((keep[0], keep[-1]), (0, 999))
+
+    def test_short_series_and_tiny_budgets(self):
+        self.assertEqual(lttb_indices([[1, 2, 3]], 10), [0, 1, 2])
+        self.assertEqual(lttb_indices([[]], 10), [])
+        self.assertEqual(lttb_indices([list(range(50))], 2), [0, 49])
+        self.assertEqual(lttb_indices([list(range(50))], 1), [0])
+
+    def test_spike_in_any_series_survives(self):
+        flat = [80.0] * 500
+        spiky = [98.0] * 500
+        spiky[321] = 70.0
+        self.assertIn(321, lttb_indices([flat, spiky], 20))
+
+    def test_missing_values_are_treated_as_zero(self):
+        self.assertLessEqual(len(lttb_indices([[None, 1.0] * 300], MIN_POINTS)), MIN_POINTS)
@@ -1,14 +1,23 @@
 # classroom/urls.py
+from django.conf import settings
 from django.urls import path
 from . import views
 
+# Under ASGI the roster and chart queries run concurrently
+classroom_detail = views.classroom_detail_async if settings.ASYNC_DASHBOARDS else views.classroom_detail
+
 urlpatterns = [
     # --- THIS CONFLICTING LINE IS DELETED ---
     # path('', views.teacher_dashboard, name='teacher_dashboard'),
 
     # Classroom views
-    path('classroom/<int:pk>/', views.classroom_detail, name='classroom_detail'),
+    path('classroom/<int:pk>/', classroom_detail, name='classroom_detail'),
     path('classroom/<int:pk>/quick-check/', views.quick_checkup, name='quick_checkup'),
+    path('classroom/<int:pk>/bulk-vitals/', views.bulk_vitals_upload, name='bulk_vitals_upload'),
+    path('classroom/<int:pk>/roster-import/', views.roster_import, name='roster_import'),
+    path('classroom/<int:pk>/series/', views.classroom_health_series, name='classroom_series'),
+    path('classroom/<int:pk>/chart.svg', views.classroom_chart, name='classroom_chart'),
+    path('classroom/<int:pk>/live/', views.classroom_live_stream, name='classroom_live'),
     
     # Request handling
     path('approve/<int:req_id>/', views.approve_request, name='approve_request'),
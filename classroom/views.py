@@ -1,19 +1,40 @@
 # classroom/views.py
+from asgiref.sync import sync_to_async
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.conf import settings
-from django.core.mail import send_mail, BadHeaderError
-from smtplib import SMTPRecipientsRefused
-
-from .models import VirtualClassroom
+from django.core.exceptions import ValidationError
+from django.core.handlers.asgi import ASGIRequest
+from django.core.validators import validate_email
+from django.db import transaction
+from django.http import Http404, JsonResponse
+from django.urls import reverse
+from django.utils import timezone
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_GET, require_POST
+
+from .models import VirtualClassroom, ClassDailyHealth, health_bucket
+from .live import publish_vitals
+from .signals import add_to_daily_health
 from health.models import VitalRecord
+from health import charts
+from health.async_db import gather_queries, request_user
+from health.series import parse_time_range, point_budget, series_etag
+from health.leaderboard import mark_leaderboard_dirty
+from health.signals import refresh_latest_vitals
 from accounts.models import StudentProfile, Notification, User, JoinRequest
-from ai_engine.utils import predict_health
+from accounts.utils import enqueue_email
+from ai_engine.utils import predict_health, predict_health_batch
 
-from django.db.models import Avg, Count, Case, When, Prefetch
+from django.db.models import Avg, Count, Case, When, Max, Prefetch, Q, Sum
 from django.db.models.functions import TruncDay
+import csv
+import io
 import json
+import math
+from urllib.parse import urlencode
+from datetime import datetime, timedelta, timezone as dt_timezone
 
 
 # Redirect to the main dashboard in the 'health' app
@@ -74,74 +95,231 @@ def classroom_detail(request, pk):
     if not request.user.is_teacher:
         return redirect('home')
     
-    vc = get_object_or_404(VirtualClassroom, id=pk, teacher=request.user)
-    students = vc.students.all().select_related('user')
-    student_ids = students.values_list('id', flat=True)
-
-    # --- 1. GET ALL DATA IN ONE GO (FOR BOTH CHARTS) ---
-    all_vitals = VitalRecord.objects.filter(student_id__in=student_ids).order_by('student_id', '-recorded_at')
-
-    # --- 2. PIE CHART DATA (Python processing) ---
+    vc = get_object_or_404(VirtualClassroom.objects.select_related('school'), id=pk, teacher=request.user)
+    students = _roster(vc.students.all())
+    # --- 2. LINE GRAPH DATA is fetched from classroom_health_series (or drawn as SVG) ---
+    chart_version = _classroom_chart_version(vc) if charts.use_server_charts(request) else None
+    return _render_classroom_detail(request, vc, students, chart_version)
+
+
+async def classroom_detail_async(request, pk):
+    """classroom_detail, with the class, its roster and the chart version queried together (ASGI)."""
+    user = await request_user(request)
+    if not (user.is_authenticated and user.is_teacher):
+        return await sync_to_async(classroom_detail)(request, pk)
+
+    queries = [
+        lambda: VirtualClassroom.objects.select_related('school').filter(id=pk, teacher=user).first(),
+        # Filtered by teacher too, so nothing is read for someone else's class
+        lambda: _roster(StudentProfile.objects.filter(virtual_classes__id=pk, virtual_classes__teacher=user)),
+    ]
+    server_charts = await sync_to_async(charts.use_server_charts)(request)
+    if server_charts:
+        queries += [
+            lambda: _class_latest_recorded_at(pk), lambda: _class_rollup_totals(pk), lambda: _class_last_vital_id(pk),
+        ]
+    vc, students, *version_parts = await gather_queries(*queries)
+    if vc is None:
+        raise Http404("No VirtualClassroom matches the given query.")
+    chart_version = charts.classroom_chart_version(vc, *version_parts) if server_charts else None
+    return await sync_to_async(_render_classroom_detail)(request, vc, students, chart_version)
+
+
+def _roster(students):
+    return list(students.select_related('user'))
+
+
+def _render_classroom_detail(request, vc, students, chart_version):
+    # --- 1. PIE CHART DATA (latest snapshot on each StudentProfile) ---
     status_counts = {
-        "Healthy": 0,
-        "Watch": 0,
-        "Risk": 0,
+        "healthy": 0,
+        "watch": 0,
+        "risk": 0,
     }
-    
-    # Find the latest vital for each student in Python
-    latest_vitals_map = {}
-    for vital in all_vitals:
-        if vital.student_id not in latest_vitals_map:
-            # Since query is ordered by -recorded_at, the first one we see IS the latest
-            latest_vitals_map[vital.student_id] = vital
+    checked_count = 0
 
     # Count the statuses
     for student in students:
-        latest_vital = latest_vitals_map.get(student.id)
-        if latest_vital:
-            label = latest_vital.prediction_label.lower()
-            if "healthy" in label or "normal" in label:
-                status_counts["Healthy"] += 1
-            elif "watch" in label or "mild" in label or "moderate" in label:
-                status_counts["Watch"] += 1
-            elif "high risk" in label or "critical" in label:
-                status_counts["Risk"] += 1
+        if student.latest_recorded_at:
+            checked_count += 1
+            bucket = health_bucket(student.latest_label)
+            if bucket:
+                status_counts[bucket] += 1
     
     # Calculate "Not Yet Checked"
-    not_checked_count = len(students) - len(latest_vitals_map)
+    not_checked_count = len(students) - checked_count
 
     pie_chart_data = {
         "labels": ["Healthy/Normal", "Watch/Mild", "High Risk/Critical", "Not Yet Checked"],
         "data": [
-            status_counts["Healthy"],
-            status_counts["Watch"],
-            status_counts["Risk"],
+            status_counts["healthy"],
+            status_counts["watch"],
+            status_counts["risk"],
             not_checked_count
         ],
     }
 
-    # --- 3. LINE GRAPH DATA (Class Average) ---
-    # We use all_vitals, which we already know is working
-    avg_health_over_time = all_vitals.annotate(
-        day=TruncDay('recorded_at')
-    ).values('day').annotate(
-        avg_score=Avg('prediction_score')
-    ).order_by('day')
-
-    line_chart_data = {
-        "labels": [entry['day'].strftime('%b %d, %Y') for entry in avg_health_over_time],
-        "data": [round(entry['avg_score'], 1) for entry in avg_health_over_time],
-    }
+    chart_svg_url = None
+    if chart_version is not None:
+        query = urlencode({'size': charts.DEFAULT_CHART_SIZE, 'v': chart_version})
+        chart_svg_url = f"{reverse('classroom_chart', args=[vc.id])}?{query}"
 
     context = {
         'vc': vc,
         'students': students,
         'pie_chart_data_json': json.dumps(pie_chart_data),
-        'line_chart_data_json': json.dumps(line_chart_data),
+        'chart_svg_url': chart_svg_url,
+        # The live board's stream is served by classroom.asgi; a WSGI worker answers it with 501
+        'live_board': isinstance(request, ASGIRequest),
     }
     return render(request, 'classroom/classroom_detail.html', context)
 
 
+# Most recent days served by the class average series when no range is given
+LINE_CHART_MAX_DAYS = 365
+
+
+def _series_classroom(request, pk):
+    """The teacher's class, or None; looked up once per request like health.views._series_student."""
+    found = request.__dict__.setdefault('_series_classrooms', {})
+    if pk not in found:
+        is_teacher = getattr(request.user, 'is_teacher', False)
+        found[pk] = VirtualClassroom.objects.filter(id=pk, teacher=request.user).first() if is_teacher else None
+    return found[pk]
+
+
+def _classroom_series_last_modified(request, pk):
+    vc = _series_classroom(request, pk)
+    if vc is None:
+        return None
+    return vc.students.aggregate(latest=Max('latest_recorded_at'))['latest']
+
+
+def _classroom_series_etag(request, pk):
+    vc = _series_classroom(request, pk)
+    if vc is None:
+        return None
+    latest = vc.students.aggregate(latest=Max('latest_recorded_at'))['latest']
+    return series_etag('classroom', vc.id, latest, *_class_rollup_totals(vc.id), _class_last_vital_id(vc.id))
+
+
+def _class_average_buckets(vc, start=None, end=None, resolution='day'):
+    """[(bucket start, score_sum, scored_count, reading_count)] from the ClassDailyHealth rollup."""
+    days = ClassDailyHealth.objects.filter(classroom=vc, scored_count__gt=0)
+    if start:
+        days = days.filter(day__gte=timezone.localdate(start))
+    if end:
+        days = days.filter(day__lt=timezone.localdate(end))
+    if start or end:
+        days = list(days.order_by('day'))
+    else:
+        days = list(days.order_by('-day')[:LINE_CHART_MAX_DAYS])
+        days.reverse()
+
+    buckets = []
+    for entry in days:
+        bucket = entry.day - timedelta(days=entry.day.weekday()) if resolution == 'week' else entry.day
+        if buckets and buckets[-1][0] == bucket:
+            _, score_sum, scored, readings = buckets[-1]
+            buckets[-1] = (bucket, score_sum + entry.score_sum, scored + entry.scored_count,
+                           readings + entry.reading_count)
+        else:
+            buckets.append((bucket, entry.score_sum, entry.scored_count, entry.reading_count))
+    return buckets
+
+
+@login_required
+@require_GET
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=_classroom_series_etag, last_modified_func=_classroom_series_last_modified)
+def classroom_health_series(request, pk):
+    """
+    The class average risk score over time, read from the ClassDailyHealth rollup.
+      ?from=&to=      date range (default: the last LINE_CHART_MAX_DAYS days with data)
+      ?resolution=    day (default) or week
+    """
+    vc = _series_classroom(request, pk)
+    if vc is None:
+        return JsonResponse({'error': 'Classroom not found.'}, status=404)
+
+    try:
+        start, end = parse_time_range(request.GET)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    resolution = request.GET.get('resolution', 'day')
+    if resolution not in ('day', 'week'):
+        return JsonResponse({'error': f"Unknown resolution '{resolution}'."}, status=400)
+
+    buckets = _class_average_buckets(vc, start, end, resolution)
+
+    return JsonResponse({
+        'classroom_id': vc.id,
+        'resolution': resolution,
+        'days': [bucket.isoformat() for bucket, *_ in buckets],
+        'labels': [bucket.strftime('%b %d, %Y') for bucket, *_ in buckets],
+        'data': [round(score_sum / scored, 1) for _, score_sum, scored, _ in buckets],
+        'counts': [readings for *_, readings in buckets],
+    })
+
+
+def _class_latest_recorded_at(pk):
+    return StudentProfile.objects.filter(virtual_classes__id=pk).aggregate(latest=Max('latest_recorded_at'))['latest']
+
+
+def _class_rollup_totals(pk):
+    # The score total moves when readings are rescored without any being added or deleted
+    totals = ClassDailyHealth.objects.filter(classroom_id=pk).aggregate(
+        readings=Sum('reading_count'), scores=Sum('score_sum'),
+    )
+    return totals['readings'], totals['scores']
+
+
+def _class_last_vital_id(pk):
+    # With the rollup's reading count, catches backdated inserts the latest timestamp doesn't move for
+    return VitalRecord.objects.filter(student__virtual_classes__id=pk).aggregate(last_id=Max('id'))['last_id']
+
+
+def _classroom_chart_version(vc):
+    return charts.classroom_chart_version(
+        vc, _class_latest_recorded_at(vc.id), _class_rollup_totals(vc.id), _class_last_vital_id(vc.id),
+    )
+
+
+@login_required
+@require_GET
+def classroom_chart(request, pk):
+    """The class average risk score (default range, by day) drawn as SVG, ?size=sm|md|lg."""
+    vc = _series_classroom(request, pk)
+    if vc is None:
+        return JsonResponse({'error': 'Classroom not found.'}, status=404)
+    size = request.GET.get('size', charts.DEFAULT_CHART_SIZE)
+    if size not in charts.CHART_SIZES:
+        return JsonResponse({'error': f"Unknown size '{size}'."}, status=400)
+
+    def render_chart():
+        buckets = _class_average_buckets(vc)
+        return charts.line_chart_svg(
+            [bucket.strftime('%b %d') for bucket, *_ in buckets],
+            [('Class Average Risk Score', [round(score_sum / scored, 1) for _, score_sum, scored, _ in buckets],
+              charts.COLOR_PRIMARY)],
+            size, y_min=0, y_max=100,
+        )
+
+    version = _classroom_chart_version(vc)
+    return charts.chart_response(request, version, lambda: charts.cached_chart(
+        'classroom-average', vc.id, version, size, render_chart,
+    ))
+
+
+def classroom_live_stream(request, pk):
+    """
+    The live board's URL. Under ASGI, classroom.asgi.LiveBoardRouter answers
+    it before Django does; a WSGI server can't hold the stream open.
+    """
+    return JsonResponse({'error': 'The live board needs the ASGI server.'}, status=501)
+
+
 @login_required
 def quick_checkup(request, pk):
     if not request.user.is_teacher:
@@ -161,29 +339,24 @@ def quick_checkup(request, pk):
     if request.method == 'POST':
         if 'alert' in request.POST:
             parent_email = student_profile.parent_contact
-            if parent_email:
-                try:
-                    subject = f"Health Alert for {student_profile.user.get_full_name()}"
-                    message = (
-                        f"Dear Parent/Guardian,\n\n"
-                        f"This is an alert from {vc.school.name}. "
-                        f"A recent health check for {student_profile.user.get_full_name()} (Class: {vc.class_name}-{vc.section}) showed a potential health concern. "
-                        f"Please contact the school for more details.\n\n"
-                        f"- Rakshara System"
-                    )
-                    send_mail(subject, message, settings.EMAIL_HOST_USER, [parent_email])
-                    messages.success(request, f"Alert sent to {parent_email} for {student_profile.user.get_full_name()}.")
-                
-                except (SMTPRecipientsRefused, BadHeaderError):
-                    return render(request, 'classroom/quick_check.html', {
-                        'vc': vc, 'student': student_profile, 'idx': idx, 'total': total_students, 'invalid_email': True
-                    })
-                except Exception as e:
-                    messages.error(request, f"Could not send email. Error: {e}")
-            else:
+            try:
+                validate_email(parent_email)
+            except ValidationError:
                 return render(request, 'classroom/quick_check.html', {
                     'vc': vc, 'student': student_profile, 'idx': idx, 'total': total_students, 'invalid_email': True
                 })
+
+            subject = f"Health Alert for {student_profile.user.get_full_name()}"
+            message = (
+                f"Dear Parent/Guardian,\n\n"
+                f"This is an alert from {vc.school.name}. "
+                f"A recent health check for {student_profile.user.get_full_name()} (Class: {vc.class_name}-{vc.section}) showed a potential health concern. "
+                f"Please contact the school for more details.\n\n"
+                f"- Rakshara System"
+            )
+            # Delivered by the send_queued_mail worker, so a slow mail provider never blocks the checkup
+            enqueue_email(subject, message, [parent_email], settings.EMAIL_HOST_USER)
+            messages.success(request, f"Alert queued for {parent_email} for {student_profile.user.get_full_name()}.")
             
             return redirect(f"{request.path_info}?idx={idx + 1}")
 
@@ -202,7 +375,7 @@ def quick_checkup(request, pk):
                 student_profile.height_cm = height
             student_profile.save()
 
-            score, label = predict_health(hr, spo2, br, temp, weight, height)
+            score, label, model_version = predict_health(hr, spo2, br, temp, weight, height, return_version=True)
 
             VitalRecord.objects.create(
                 student=student_profile,
@@ -213,7 +386,8 @@ def quick_checkup(request, pk):
                 weight_kg=weight,
                 height_cm=height,
                 prediction_score=score,
-                prediction_label=label
+                prediction_label=label,
+                model_version=model_version
             )
 
             return render(request, 'classroom/quick_check.html', {
@@ -233,26 +407,218 @@ def quick_checkup(request, pk):
     })
 
 
+def _parse_bulk_rows(request, key='readings'):
+    """Read rows from an uploaded CSV ('file') or a JSON body ({"<key>": [...]})."""
+    upload = request.FILES.get('file')
+    if upload:
+        text = io.TextIOWrapper(upload.file, encoding='utf-8-sig')
+        return list(csv.DictReader(text))
+
+    payload = json.loads(request.body or b'{}')
+    if isinstance(payload, dict):
+        payload = payload.get(key, [])
+    if not isinstance(payload, list):
+        raise ValueError(f"Expected a list of {key}.")
+    return payload
+
+
+def _bulk_option(request, name):
+    """A setting sent with the rows: a form field next to a CSV upload, or a key of the JSON body."""
+    if request.FILES.get('file') or request.content_type != 'application/json':
+        return request.POST.get(name)
+    payload = json.loads(request.body or b'{}')
+    value = payload.get(name) if isinstance(payload, dict) else None
+    return value if isinstance(value, str) else None
+
+
+def _optional_float(value):
+    if value in (None, ''):
+        return None
+    return float(value)
+
+
+@login_required
+@require_POST
+def bulk_vitals_upload(request, pk):
+    """
+    Ingest a whole class's readings in one request (JSON or CSV upload).
+    Each row needs student_code, heart_rate, spo2, breathing_rate and temperature;
+    weight_kg/height_cm are optional and fall back to the student's profile.
+    All rows are scored in one model pass and saved in one transaction.
+    """
+    if not request.user.is_teacher:
+        return JsonResponse({'error': 'Only teachers can upload vitals.'}, status=403)
+
+    vc = get_object_or_404(VirtualClassroom, id=pk, teacher=request.user)
+
+    try:
+        rows = _parse_bulk_rows(request)
+    except (ValueError, UnicodeDecodeError, csv.Error) as e:
+        return JsonResponse({'error': f"Could not read upload: {e}"}, status=400)
+
+    students_by_code = {s.student_code: s for s in vc.students.all()}
+
+    accepted = []   # (student_profile, reading tuple)
+    rejected = []
+    changed_profiles = {}
+    for row_no, row in enumerate(rows, 1):
+        if not isinstance(row, dict):
+            rejected.append({'row': row_no, 'error': "Row must be an object."})
+            continue
+
+        student_profile = students_by_code.get((row.get('student_code') or '').strip())
+        if student_profile is None:
+            rejected.append({'row': row_no, 'error': "Unknown student_code for this class."})
+            continue
+
+        try:
+            hr = int(float(row['heart_rate']))
+            spo2 = float(row['spo2'])
+            br = float(row['breathing_rate'])
+            temp = float(row['temperature'])
+            weight = _optional_float(row.get('weight_kg'))
+            height = _optional_float(row.get('height_cm'))
+        except KeyError as e:
+            rejected.append({'row': row_no, 'error': f"Missing field {e}."})
+            continue
+        except (TypeError, ValueError, OverflowError):
+            rejected.append({'row': row_no, 'error': "Vitals must be numbers."})
+            continue
+        # float() accepts "nan" and "inf", which the model can't score
+        if not all(math.isfinite(v) for v in (spo2, br, temp, weight, height) if v is not None):
+            rejected.append({'row': row_no, 'error': "Vitals must be finite numbers."})
+            continue
+
+        if weight and weight != student_profile.weight_kg:
+            student_profile.weight_kg = weight
+            changed_profiles[student_profile.pk] = student_profile
+        if height and height != student_profile.height_cm:
+            student_profile.height_cm = height
+            changed_profiles[student_profile.pk] = student_profile
+
+        weight = weight or student_profile.weight_kg
+        height = height or student_profile.height_cm
+        accepted.append((student_profile, (hr, spo2, br, temp, weight, height)))
+
+    model_version, predictions = predict_health_batch([reading for _, reading in accepted], return_version=True)
+
+    records = [
+        VitalRecord(
+            student=student_profile,
+            heart_rate=hr,
+            spo2=spo2,
+            breathing_rate=br,
+            temperature_c=temp,
+            weight_kg=weight,
+            height_cm=height,
+            prediction_score=score,
+            prediction_label=label,
+            model_version=model_version,
+        )
+        for (student_profile, (hr, spo2, br, temp, weight, height)), (score, label)
+        in zip(accepted, predictions)
+    ]
+
+    with transaction.atomic():
+        VitalRecord.objects.bulk_create(records)
+        if changed_profiles:
+            StudentProfile.objects.bulk_update(changed_profiles.values(), ['weight_kg', 'height_cm'])
+        # bulk_create skips signals, so update the snapshots and rollups here
+        refresh_latest_vitals({r.student_id for r in records})
+        add_to_daily_health(records)
+        transaction.on_commit(lambda: publish_vitals(records))
+    mark_leaderboard_dirty(vc.school_id)
+
+    return JsonResponse({
+        'created': len(records),
+        'rejected': rejected,
+        'results': [
+            {'student_code': r.student.student_code, 'score': r.prediction_score, 'label': r.prediction_label}
+            for r in records
+        ],
+    })
+
+
+@login_required
+@require_POST
+def roster_import(request, pk):
+    """
+    Onboard a class's students in one request (JSON {"students": [...]} or CSV upload).
+    Each row needs roll_no; username, names, email, password, dob, height_cm,
+    weight_kg and parent_email are optional. Rows whose class_name/section are
+    given must match this class. Rows without a password get 'default_password'
+    (a JSON key or form field), or no usable password (they can use password reset).
+    """
+    from accounts.roster import import_roster
+
+    if not request.user.is_teacher:
+        return JsonResponse({'error': 'Only teachers can import students.'}, status=403)
+
+    vc = get_object_or_404(VirtualClassroom.objects.select_related('school'), id=pk, teacher=request.user)
+
+    try:
+        rows = _parse_bulk_rows(request, key='students')
+    except (ValueError, UnicodeDecodeError, csv.Error) as e:
+        return JsonResponse({'error': f"Could not read upload: {e}"}, status=400)
+
+    default_password = _bulk_option(request, 'default_password') or None
+    result = import_roster(vc.school, rows, classroom=vc, default_password=default_password)
+    return JsonResponse({
+        'created': len(result['created']),
+        'rejected': result['rejected'],
+        'students': [
+            {'username': p.user.username, 'student_code': p.student_code, 'roll_no': p.roll_no}
+            for p in result['created']
+        ],
+    })
+
+
+# Student history: rows per table page
+HISTORY_PAGE_SIZE = 50
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def encode_history_cursor(vital):
+    """Opaque keyset cursor for the (recorded_at, id) position of a reading."""
+    micros = (vital.recorded_at - _EPOCH) // timedelta(microseconds=1)
+    return f"{micros}.{vital.id}"
+
+
+def decode_history_cursor(cursor):
+    """Return (recorded_at, id) or None for a missing/invalid cursor."""
+    try:
+        micros, pk = cursor.split('.')
+        return _EPOCH + timedelta(microseconds=int(micros)), int(pk)
+    except (AttributeError, ValueError):
+        return None
+
+
 @login_required
 def view_student_history(request, student_id):
     if not request.user.is_teacher:
         return redirect('home')
 
     student = get_object_or_404(StudentProfile, id=student_id, user__school=request.user.school)
-    
-    vitals_qs = student.vitals.all().order_by('recorded_at')
-    
-    line_chart_data = {
-        "labels": [v.recorded_at.strftime("%d %b %H:%M") for v in vitals_qs],
-        "hr_data": [v.heart_rate for v in vitals_qs],
-        "spo2_data": [v.spo2 for v in vitals_qs],
-        "temp_data": [v.temperature_c for v in vitals_qs],
-    }
-    
+
+    # --- Table: newest first, keyset-paginated on (recorded_at, id) ---
+    page_qs = student.vitals.order_by('-recorded_at', '-id')
+    position = decode_history_cursor(request.GET.get('cursor'))
+    if position:
+        recorded_at, pk = position
+        page_qs = page_qs.filter(Q(recorded_at__lt=recorded_at) | Q(recorded_at=recorded_at, id__lt=pk))
+    page = list(page_qs[:HISTORY_PAGE_SIZE + 1])
+    next_cursor = encode_history_cursor(page[HISTORY_PAGE_SIZE - 1]) if len(page) > HISTORY_PAGE_SIZE else None
+    page = page[:HISTORY_PAGE_SIZE]
+
+    # The chart is fetched from the series API, downsampled to ?points=, or drawn as SVG
     context = {
         'profile': student,
-        'vitals': vitals_qs.reverse(),
-        'line_chart_data_json': json.dumps(line_chart_data)
+        'vitals': page,
+        'next_cursor': next_cursor,
+        'is_first_page': position is None,
+        'chart_points': point_budget(request.GET.get('points')),
+        'chart_svg_url': charts.student_chart_url(student, 'history') if charts.use_server_charts(request) else None,
     }
     return render(request, 'classroom/student_history.html', context)
 
@@ -0,0 +1,18 @@
+# gunicorn.conf.py
+# Picked up automatically when gunicorn is started from the project root.
+
+# Import Django (and the app) once in the master so workers are forked from it
+preload_app = True
+
+
+def pre_fork(server, worker):
+    # Load the AI model before forking: workers share its pages copy-on-write
+    # instead of each unpickling its own copy on the first prediction.
+    from django.db import connections
+
+    from ai_engine.registry import model_registry
+    stats = model_registry.preload()
+    # preload() reads the active version from the database; workers must not
+    # inherit (and share) the master's connection
+    connections.close_all()
+    server.log.info("AI model preloaded: %s", stats)
@@ -0,0 +1,108 @@
+# health/async_db.py
+"""
+Helpers for the async dashboard views (served under ASGI, see
+settings.ASYNC_DASHBOARDS).
+
+Django's async ORM (aget, acount, ...) hands every query to the one
+thread-sensitive worker, so `asyncio.gather` over them still waits for one
+round-trip after another. gather_queries instead runs each independent
+block of ordinary ORM code on a thread of a small dedicated pool; each
+thread has a database connection of its own, so the round-trips overlap.
+"""
+import asyncio
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, connection
+
+from ai_engine.timing import recording_queries
+
+
+def _in_transaction():
+    return connection.in_atomic_block
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _query_executor():
+    """
+    The pool gather_queries runs on, ASYNC_DB_POOL_SIZE threads per process:
+    each holds a database connection, so this bounds what one worker can
+    open (asyncio's default executor would allow dozens).
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=settings.ASYNC_DB_POOL_SIZE, thread_name_prefix='async-db')
+        return _executor
+
+
+def _on_own_connection(func):
+    def run():
+        # Bracketed as Django brackets a request: a broken or expired connection is
+        # dropped first, and with CONN_MAX_AGE=0 the connection is closed afterwards
+        close_old_connections()
+        try:
+            # The request's query timings (ai_engine.timing) only see its own thread's connections
+            with recording_queries():
+                return func()
+        finally:
+            close_old_connections()
+    return run
+
+
+async def gather_queries(*funcs):
+    """
+    Call the sync callables `funcs` concurrently; their results in order.
+
+    Inside a transaction (the test runner, ATOMIC_REQUESTS) they run one
+    after another on the request's own connection instead, so they see its
+    uncommitted rows.
+    """
+    if await sync_to_async(_in_transaction)():
+        return [await sync_to_async(func)() for func in funcs]
+    executor = _query_executor()
+    return await asyncio.gather(*(
+        sync_to_async(_on_own_connection(func), thread_sensitive=False, executor=executor)() for func in funcs
+    ))
+
+
+def _next_chunks(chunks, count):
+    return list(itertools.islice(chunks, count))
+
+
+async def iterate_in_thread(chunks, per_hop=200):
+    """
+    Async iterator over the sync iterator `chunks`, for StreamingHttpResponse
+    under ASGI (Django otherwise reads a sync iterator to the end before
+    sending anything). `per_hop` chunks are fetched per trip to the
+    thread-sensitive worker, which holds the request's database cursor.
+    """
+    chunks = iter(chunks)
+    try:
+        while True:
+            batch = await sync_to_async(_next_chunks)(chunks, per_hop)
+            if not batch:
+                return
+            for chunk in batch:
+                yield chunk
+    finally:
+        # Client went away: release the generator's cursor on its own thread
+        close = getattr(chunks, 'close', None)
+        if close is not None:
+            await sync_to_async(close)()
+
+
+def _load_user(request):
+    request.user.is_authenticated  # resolves the lazy user: session and user queries
+    return request.user
+
+
+async def request_user(request):
+    """`request.user`, loaded without blocking the event loop."""
+    return await sync_to_async(_load_user)(request)
@@ -0,0 +1,195 @@
+# health/charts.py
+"""
+Server-side SVG charts for low-end devices that struggle with Chart.js.
+
+Charts are cached by (owner, data version, size) in Django's cache. The
+version changes only when vitals are added or deleted, so a chart is drawn
+once per change and size. The pages link to `?v=<version>` URLs, which can be
+served with a long-lived Cache-Control: a new reading means a new URL.
+"""
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.html import escape
+
+from .models import VitalRecord
+from .series import lttb_indices, series_etag
+
+# name -> (width, height) in px; a fixed set keeps the number of cached variants small
+CHART_SIZES = {
+    'sm': (320, 120),
+    'md': (640, 240),
+    'lg': (960, 360),
+}
+DEFAULT_CHART_SIZE = 'md'
+CACHE_KEY_PREFIX = 'health:chart'
+# Browser cache lifetime of a versioned (?v=) chart URL
+CHART_MAX_AGE = 365 * 24 * 60 * 60
+
+# Light-theme colours from base.html
+COLOR_PRIMARY = '#4A69E1'
+COLOR_SUCCESS = '#1AAE70'
+COLOR_DANGER = '#E63946'
+COLOR_MUTED = '#7f8c8d'
+COLOR_GRID = '#e0e6ed'
+
+
+def student_chart_version(student):
+    """Changes whenever one of the student's readings is added, moved, deleted or rescored."""
+    stamp = VitalRecord.objects.filter(student=student).version_stamp()
+    return series_etag('student', student.id, student.latest_vital_id, student.latest_recorded_at, *stamp)[:16]
+
+
+def classroom_chart_version(vc, latest, rollup_totals, last_vital_id):
+    """Changes whenever a reading of the class is added, moved, deleted or rescored (or the rollup is rebuilt)."""
+    return series_etag('classroom', vc.id, latest, *rollup_totals, last_vital_id)[:16]
+
+
+def student_chart_url(student, chart, size=DEFAULT_CHART_SIZE):
+    url = reverse('health:student_chart', args=[student.id, chart])
+    return f"{url}?{urlencode({'size': size, 'v': student_chart_version(student)})}"
+
+
+def cached_chart(kind, owner_id, version, size, render):
+    """The SVG for (kind, owner, version, size), drawn by `render()` on a miss."""
+    cache = caches[settings.CHART_CACHE_BACKEND]
+    key = f"{CACHE_KEY_PREFIX}:{kind}:{owner_id}:{version}:{size}"
+    svg = cache.get(key)
+    if svg is None:
+        svg = render()
+        cache.set(key, svg, settings.CHART_CACHE_SECONDS)
+    return svg
+
+
+def _fmt(value):
+    return f"{value:.1f}".rstrip('0').rstrip('.')
+
+
+def _path(points):
+    """SVG path data through (x, y) points; None values break the line."""
+    parts, pen_down = [], False
+    for x, y in points:
+        if y is None:
+            pen_down = False
+            continue
+        parts.append(f"{'L' if pen_down else 'M'}{_fmt(x)} {_fmt(y)}")
+        pen_down = True
+    return ''.join(parts)
+
+
+def _bounds(series, y_min, y_max):
+    values = [v for _, values, _ in series for v in values if v is not None]
+    lo = y_min if y_min is not None else min(values)
+    hi = y_max if y_max is not None else max(values)
+    if hi == lo:
+        lo, hi = lo - 1, hi + 1
+    elif y_min is None and y_max is None:
+        margin = (hi - lo) * 0.05
+        lo, hi = lo - margin, hi + margin
+    return lo, hi
+
+
+def _svg(width, height, body):
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+        f'viewBox="0 0 {width} {height}" font-family="sans-serif" font-size="11">{body}</svg>'
+    )
+
+
+def line_chart_svg(labels, series, size=DEFAULT_CHART_SIZE, y_min=None, y_max=None,
+                   empty_text="No health data yet to show a trend."):
+    """
+    A line chart of `series` ([(name, values, colour)], values aligned with
+    `labels`). Points beyond ~1 per 3px are dropped with LTTB first.
+    """
+    width, height = CHART_SIZES[size]
+    if not labels or not any(v is not None for _, values, _ in series for v in values):
+        return _svg(width, height, (
+            f'<text x="{width / 2}" y="{height / 2}" text-anchor="middle" fill="{COLOR_MUTED}">'
+            f'{escape(empty_text)}</text>'
+        ))
+
+    keep = lttb_indices([[v if v is not None else 0 for v in values] for _, values, _ in series],
+                        max(width // 3, 10))
+    labels = [labels[i] for i in keep]
+    series = [(name, [values[i] for i in keep], colour) for name, values, colour in series]
+
+    left, right, top, bottom = 36, 8, 20, 18
+    plot_w, plot_h = width - left - right, height - top - bottom
+    lo, hi = _bounds(series, y_min, y_max)
+
+    def x_at(i):
+        return left + (i * plot_w / (len(labels) - 1) if len(labels) > 1 else plot_w / 2)
+
+    def y_at(value):
+        return None if value is None else top + (hi - value) * plot_h / (hi - lo)
+
+    body = []
+    for step in range(3):
+        value = lo + (hi - lo) * step / 2
+        y = y_at(value)
+        body.append(
+            f'<line x1="{left}" y1="{_fmt(y)}" x2="{width - right}" y2="{_fmt(y)}" stroke="{COLOR_GRID}"/>'
+            f'<text x="{left - 4}" y="{_fmt(y + 4)}" text-anchor="end" fill="{COLOR_MUTED}">{_fmt(value)}</text>'
+        )
+    body.append(
+        f'<text x="{left}" y="{height - 4}" fill="{COLOR_MUTED}">{escape(labels[0])}</text>'
+        f'<text x="{width - right}" y="{height - 4}" text-anchor="end" fill="{COLOR_MUTED}">{escape(labels[-1])}</text>'
+    )
+    legend_x = left
+    for name, values, colour in series:
+        body.append(
+            f'<path d="{_path((x_at(i), y_at(v)) for i, v in enumerate(values))}" fill="none" '
+            f'stroke="{colour}" stroke-width="2" stroke-linejoin="round"/>'
+        )
+        if len(series) > 1:
+            body.append(f'<text x="{legend_x}" y="12" fill="{colour}">● {escape(name)}</text>')
+            legend_x += 12 + 7 * len(name)
+    return _svg(width, height, ''.join(body))
+
+
+def sparkline_svg(values, size='sm', colour=COLOR_PRIMARY):
+    """A bare line (no axes or labels) through `values`."""
+    width, height = CHART_SIZES[size]
+    if not any(v is not None for v in values):
+        return _svg(width, height, '')
+    keep = lttb_indices([[v if v is not None else 0 for v in values]], max(width // 3, 10))
+    values = [values[i] for i in keep]
+    lo, hi = _bounds([('', values, colour)], None, None)
+    pad = 2
+    step = (width - 2 * pad) / (len(values) - 1) if len(values) > 1 else 0
+    points = (
+        (pad + i * step, None if v is None else pad + (hi - v) * (height - 2 * pad) / (hi - lo))
+        for i, v in enumerate(values)
+    )
+    return _svg(width, height, f'<path d="{_path(points)}" fill="none" stroke="{colour}" stroke-width="2"/>')
+
+
+def use_server_charts(request):
+    """SERVER_SIDE_CHARTS, unless the device picked ?charts=svg or ?charts=js (remembered in the session)."""
+    choice = request.GET.get('charts')
+    if choice in ('svg', 'js'):
+        request.session['charts'] = choice
+    return request.session.get('charts', 'svg' if settings.SERVER_SIDE_CHARTS else 'js') == 'svg'
+
+
+def chart_response(request, version, render_svg):
+    """
+    SVG response for a chart at data `version`. A request for the current
+    `?v=` is immutable and cached by the browser for a year; anything else
+    must revalidate against the version ETag (304 without drawing).
+    """
+    etag = f'"{version}"'
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(render_svg(), content_type='image/svg+xml')
+    response['ETag'] = etag
+    if request.GET.get('v') == version:
+        patch_cache_control(response, private=True, max_age=CHART_MAX_AGE, immutable=True)
+    else:
+        patch_cache_control(response, private=True, no_cache=True)
+    return response
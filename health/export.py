@@ -0,0 +1,153 @@
+# health/export.py
+"""
+School-level vitals export, streamed row by row.
+
+Rows come from a single values_list() query read with iterator(), which
+uses a server-side cursor on PostgreSQL (and fetchmany() elsewhere), so
+only `chunk_size` rows are in memory at a time whatever the date range.
+CSV is written line by line; Parquet (needs the optional pyarrow package)
+is written one row group per chunk.
+
+A student in several classes appears once per class; a student in none
+has empty class columns.
+"""
+import csv
+
+EXPORT_FORMATS = ('csv', 'parquet')
+DEFAULT_CHUNK_SIZE = 2000
+
+# (column name, VitalRecord lookup)
+EXPORT_COLUMNS = [
+    ('vital_id', 'id'),
+    ('recorded_at', 'recorded_at'),
+    ('student_code', 'student__student_code'),
+    ('username', 'student__user__username'),
+    ('roll_no', 'student__roll_no'),
+    ('classroom_id', 'student__virtual_classes__id'),
+    ('class_name', 'student__virtual_classes__class_name'),
+    ('section', 'student__virtual_classes__section'),
+    ('heart_rate', 'heart_rate'),
+    ('spo2', 'spo2'),
+    ('breathing_rate', 'breathing_rate'),
+    ('temperature_c', 'temperature_c'),
+    ('weight_kg', 'weight_kg'),
+    ('height_cm', 'height_cm'),
+    ('prediction_score', 'prediction_score'),
+    ('prediction_label', 'prediction_label'),
+    ('model_version', 'model_version'),
+]
+
+
+def export_rows(school, start=None, end=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield one tuple per (vital, class) for `school`, in recorded_at order, within [start, end)."""
+    from .models import VitalRecord
+
+    vitals = VitalRecord.objects.filter(student__user__school=school)
+    if start:
+        vitals = vitals.filter(recorded_at__gte=start)
+    if end:
+        vitals = vitals.filter(recorded_at__lt=end)
+    return vitals.order_by('recorded_at', 'id').values_list(
+        *(lookup for _, lookup in EXPORT_COLUMNS)
+    ).iterator(chunk_size=chunk_size)
+
+
+class _Echo:
+    """File-like object whose write() hands the line straight back (for csv.writer)."""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow([name for name, _ in EXPORT_COLUMNS])
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def parquet_available():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class _ChunkSink:
+    """Write-only file that keeps what was written until drain() takes it."""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data, self.chunks = b''.join(self.chunks), []
+        return data
+
+
+def _parquet_schema():
+    import pyarrow as pa
+
+    types = {
+        'vital_id': pa.int64(), 'recorded_at': pa.timestamp('us', tz='UTC'),
+        'classroom_id': pa.int64(), 'heart_rate': pa.int64(),
+    }
+    floats = {'spo2', 'breathing_rate', 'temperature_c', 'weight_kg', 'height_cm', 'prediction_score'}
+    return pa.schema([
+        (name, types.get(name, pa.float64() if name in floats else pa.string()))
+        for name, _ in EXPORT_COLUMNS
+    ])
+
+
+def iter_parquet(rows, rows_per_group=DEFAULT_CHUNK_SIZE):
+    """Yield Parquet file bytes, one row group per `rows_per_group` rows."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = _parquet_schema()
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(pa.PythonFile(sink, mode='w'), schema, compression='snappy')
+
+    def write_group(batch):
+        columns = list(zip(*batch))
+        writer.write_batch(pa.record_batch(
+            [pa.array(column, type=field.type) for column, field in zip(columns, schema)], schema=schema
+        ))
+
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= rows_per_group:
+            write_group(batch)
+            batch = []
+            data = sink.drain()
+            if data:
+                yield data
+    if batch:
+        write_group(batch)
+    writer.close()
+    yield sink.drain()
+
+
+def iter_export(fmt, rows, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Byte/str chunks of `rows` in `fmt` ('csv' or 'parquet')."""
+    if fmt == 'parquet':
+        return iter_parquet(rows, chunk_size)
+    return iter_csv(rows)
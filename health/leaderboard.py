@@ -0,0 +1,75 @@
+# health/leaderboard.py
+"""
+School-wide "Top 3 Classes" podium, computed once per school and shared
+through Django's cache framework.
+
+Writes (new vitals, class membership changes) only mark a school's entry as
+dirty. Readers keep serving the cached podium until it is older than
+LEADERBOARD_STALENESS_SECONDS, so a screening session doesn't force a
+recompute for every reading.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Avg
+
+from classroom.models import VirtualClassroom
+
+PODIUM_SIZE = 3
+
+
+def _cache_key(school_id):
+    return f"leaderboard:school:{school_id}"
+
+
+def _dirty_key(school_id):
+    return f"leaderboard:school:{school_id}:dirty"
+
+
+def compute_school_leaderboard(school_id):
+    """Rank the school's classes by the average latest risk score of their students."""
+    ranked = VirtualClassroom.objects.filter(
+        school_id=school_id
+    ).annotate(
+        avg_risk_score=Avg('students__latest_score')
+    ).filter(
+        avg_risk_score__isnull=False
+    ).select_related('teacher').order_by('avg_risk_score', 'id')[:PODIUM_SIZE]
+
+    top_classes = []
+    for rank, vc in enumerate(ranked, 1):
+        teacher = vc.teacher
+        top_classes.append({
+            'rank': rank,
+            'name': f"{vc.class_name}-{vc.section}",
+            'teacher': (teacher.get_full_name() or teacher.username) if teacher else "",
+            'score': round(vc.avg_risk_score, 1),
+        })
+    return top_classes
+
+
+def get_school_leaderboard(school_id):
+    """Return the cached podium for a school, recomputing it only when needed."""
+    key, dirty_key = _cache_key(school_id), _dirty_key(school_id)
+    cached = cache.get_many([key, dirty_key])
+    entry = cached.get(key)
+
+    if entry is not None:
+        age = time.time() - entry['computed_at']
+        if not cached.get(dirty_key) or age < settings.LEADERBOARD_STALENESS_SECONDS:
+            return entry['top_classes']
+
+    # Clear the flag before computing: a write that lands mid-compute sets it
+    # again, so the podium isn't left stale until the cache entry expires
+    cache.delete(dirty_key)
+    top_classes = compute_school_leaderboard(school_id)
+    cache.set(key, {'top_classes': top_classes, 'computed_at': time.time()},
+              settings.LEADERBOARD_CACHE_TIMEOUT)
+    return top_classes
+
+
+def mark_leaderboard_dirty(school_id):
+    """Flag a school's podium for recomputation once its staleness window has passed."""
+    if school_id is not None:
+        cache.set(_dirty_key(school_id), True, settings.LEADERBOARD_CACHE_TIMEOUT)
@@ -0,0 +1,26 @@
+# health/management/commands/backfill_latest_vitals.py
+from django.core.management.base import BaseCommand
+
+from accounts.models import StudentProfile
+from health.signals import refresh_latest_vitals
+
+
+class Command(BaseCommand):
+    help = "Populate the latest-vital snapshot on every StudentProfile from existing VitalRecords."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--school', help="Only backfill students of this school_code.")
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        profiles = StudentProfile.objects.order_by('pk')
+        if options['school']:
+            profiles = profiles.filter(user__school__school_code=options['school'])
+
+        ids = list(profiles.values_list('pk', flat=True))
+        chunk_size = options['chunk_size']
+        updated = 0
+        for start in range(0, len(ids), chunk_size):
+            updated += refresh_latest_vitals(ids[start:start + chunk_size])
+
+        self.stdout.write(self.style.SUCCESS(f"Backfilled latest vitals for {updated} students."))
@@ -0,0 +1,129 @@
+# health/management/commands/bench_dashboards.py
+import asyncio
+import statistics
+import time
+from datetime import timedelta
+
+from django.contrib.messages.storage.fallback import FallbackStorage
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.test import RequestFactory
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.functional import SimpleLazyObject
+
+from accounts.models import JoinRequest, Notification, School, User
+from classroom import views as classroom_views
+from classroom.models import VirtualClassroom
+from classroom.signals import add_to_daily_health
+from health import views as health_views
+from health.models import VitalRecord
+from health.signals import refresh_latest_vitals
+
+
+class Command(BaseCommand):
+    help = ("Compare the sync and async dashboard views with a simulated database round-trip "
+            "added to every query. Uses (and removes) a throwaway school.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--delay-ms', type=float, default=5.0, help="Simulated round-trip per query.")
+        parser.add_argument('--runs', type=int, default=20, help="Requests timed per view.")
+        parser.add_argument('--classes', type=int, default=6)
+        parser.add_argument('--students', type=int, default=30)
+
+    def handle(self, *args, **options):
+        school = School.objects.create(name="Dashboard Benchmark", school_code="dbb")
+        try:
+            teacher, vc, student = self._make_school(school, options['classes'], options['students'])
+            delay = options['delay_ms'] / 1000
+
+            def slow_execute(execute, sql, params, many, context):
+                time.sleep(delay)
+                return execute(sql, params, many, context)
+
+            def add_delay(sender, connection, **kwargs):
+                if slow_execute not in connection.execute_wrappers:
+                    connection.execute_wrappers.append(slow_execute)
+
+            # Every thread has its own connection; the async views use several
+            add_delay(None, connection)
+            connection_created.connect(add_delay)
+            try:
+                self.stdout.write(f"{'view':>18} {'sync ms':>9} {'async ms':>9} {'speed-up':>9}"
+                                  f"   ({options['delay_ms']:g} ms per query, median of {options['runs']})")
+                for name, path, user_id, sync_view, async_view, kwargs in [
+                    ('student dashboard', reverse('health:student_dashboard'), student.user_id,
+                     health_views.student_dashboard, health_views.student_dashboard_async, {}),
+                    ('teacher dashboard', reverse('health:teacher_dashboard'), teacher.id,
+                     health_views.teacher_dashboard, health_views.teacher_dashboard_async, {}),
+                    ('classroom detail', reverse('classroom_detail', args=[vc.id]), teacher.id,
+                     classroom_views.classroom_detail, classroom_views.classroom_detail_async, {'pk': vc.id}),
+                ]:
+                    sync_ms = self._time_sync(sync_view, path, user_id, kwargs, options['runs'])
+                    async_ms = asyncio.run(self._time_async(async_view, path, user_id, kwargs, options['runs']))
+                    self.stdout.write(f"{name:>18} {sync_ms:>9.1f} {async_ms:>9.1f} {sync_ms / async_ms:>8.2f}x")
+            finally:
+                connection_created.disconnect(add_delay)
+                connection.execute_wrappers.remove(slow_execute)
+        finally:
+            User.objects.filter(school=school).delete()
+            school.delete()
+
+    @staticmethod
+    def _make_school(school, n_classes, n_students):
+        teacher = User.objects.create_user("dbb-teacher", is_teacher=True, school=school)
+        students = []
+        for i in range(n_students):
+            profile = User.objects.create_user(f"dbb-student-{i}", is_student=True, school=school).student_profile
+            students.append(profile)
+        classes = [
+            VirtualClassroom.objects.create(school=school, teacher=teacher, class_name=str(i + 1), section='a')
+            for i in range(n_classes)
+        ]
+        for vc in classes:
+            vc.students.add(*students)
+
+        now = timezone.now()
+        records = VitalRecord.objects.bulk_create([
+            VitalRecord(student=s, recorded_at=now - timedelta(days=d), heart_rate=80, spo2=98,
+                        breathing_rate=18, temperature_c=36.6, prediction_score=90.0, prediction_label="Healthy")
+            for s in students for d in range(30)
+        ])
+        refresh_latest_vitals([s.id for s in students])
+        add_to_daily_health(records)
+        Notification.objects.bulk_create([Notification(teacher=teacher, message=f"Alert {i}") for i in range(40)])
+        JoinRequest.objects.bulk_create([
+            JoinRequest(student=s, teacher=teacher, class_name='1', section='a') for s in students[:5]
+        ])
+        return teacher, classes[0], students[0]
+
+    @staticmethod
+    def _request(path, user_id):
+        """A GET as the middleware would leave it: lazy user, session and messages."""
+        request = RequestFactory().get(path)
+        request.user = SimpleLazyObject(lambda: User.objects.get(pk=user_id))
+        request.session = SessionStore()
+        request._messages = FallbackStorage(request)
+        return request
+
+    def _time_sync(self, view, path, user_id, kwargs, runs):
+        timings = []
+        for _ in range(runs):
+            request = self._request(path, user_id)
+            start = time.perf_counter()
+            response = view(request, **kwargs)
+            timings.append(time.perf_counter() - start)
+            assert response.status_code == 200, response.status_code
+        return statistics.median(timings) * 1000
+
+    async def _time_async(self, view, path, user_id, kwargs, runs):
+        timings = []
+        for _ in range(runs):
+            request = self._request(path, user_id)
+            start = time.perf_counter()
+            response = await view(request, **kwargs)
+            timings.append(time.perf_counter() - start)
+            assert response.status_code == 200, response.status_code
+        return statistics.median(timings) * 1000
@@ -0,0 +1,47 @@
+# health/management/commands/export_vitals.py
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.models import School
+from health.export import DEFAULT_CHUNK_SIZE, EXPORT_FORMATS, export_rows, iter_export, parquet_available
+from health.series import parse_time_range
+
+
+class Command(BaseCommand):
+    help = "Dump a school's vitals to CSV or Parquet, streaming (constant memory)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('school', help="school_code of the school to export.")
+        parser.add_argument('--from', dest='start', help="First day (YYYY-MM-DD) or ISO datetime.")
+        parser.add_argument('--to', dest='end', help="Last day (YYYY-MM-DD, inclusive) or ISO datetime.")
+        parser.add_argument('--format', choices=EXPORT_FORMATS, default='csv')
+        parser.add_argument('--output', '-o', help="File to write (default: stdout, CSV only).")
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        school = School.objects.filter(school_code=options['school']).first()
+        if school is None:
+            raise CommandError(f"Unknown school '{options['school']}'.")
+        try:
+            start, end = parse_time_range({'from': options['start'], 'to': options['end']})
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        fmt = options['format']
+        if fmt == 'parquet':
+            if not parquet_available():
+                raise CommandError("Parquet export needs the pyarrow package.")
+            if not options['output']:
+                raise CommandError("Parquet export needs --output.")
+
+        rows = export_rows(school, start, end, chunk_size=options['chunk_size'])
+        chunks = iter_export(fmt, rows, options['chunk_size'])
+        if not options['output']:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
+            return
+
+        mode, encoding = ('wb', None) if fmt == 'parquet' else ('w', 'utf-8')
+        with open(options['output'], mode, encoding=encoding, newline=None if encoding is None else '') as fh:
+            for chunk in chunks:
+                fh.write(chunk)
+        self.stderr.write(self.style.SUCCESS(f"Exported {school.name} vitals to {options['output']}."))
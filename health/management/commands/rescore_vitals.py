@@ -0,0 +1,159 @@
+# health/management/commands/rescore_vitals.py
+import json
+import os
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from accounts.models import School
+from ai_engine.registry import model_registry
+from ai_engine.utils import predict_health_batch
+from classroom.models import VirtualClassroom
+from classroom.signals import rebuild_daily_health
+from health.leaderboard import mark_leaderboard_dirty
+from health.models import VitalRecord
+from health.series import parse_time_range
+from health.signals import refresh_latest_vitals
+
+SCORED_FIELDS = ['prediction_score', 'prediction_label', 'model_version']
+
+
+class Command(BaseCommand):
+    help = "Re-score stored VitalRecords with the active AI model, in primary-key order."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--school', help="Only vitals of students in this school_code.")
+        parser.add_argument('--from', dest='start', help="First day to re-score (YYYY-MM-DD).")
+        parser.add_argument('--to', dest='end', help="Last day to re-score (YYYY-MM-DD).")
+        parser.add_argument('--model-version', action='append', dest='versions',
+                            help="Only vitals scored by this model version (repeatable; '' for unversioned).")
+        parser.add_argument('--stale', action='store_true',
+                            help="Only vitals not scored by the active model version.")
+        parser.add_argument('--chunk-size', type=int, default=2000)
+        parser.add_argument('--checkpoint', help="JSON file recording progress after every chunk.")
+        parser.add_argument('--resume', action='store_true', help="Continue after the checkpoint's last id.")
+        parser.add_argument('--dry-run', action='store_true', help="Score and report, but write nothing.")
+
+    def handle(self, *args, **options):
+        try:
+            # A bare --to date includes that whole day
+            start, end = parse_time_range({'from': options['start'], 'to': options['end']})
+        except ValueError as e:
+            raise CommandError(str(e))
+        if options['resume'] and not options['checkpoint']:
+            raise CommandError("--resume needs --checkpoint.")
+        chunk_size = options['chunk_size']
+
+        school = None
+        if options['school']:
+            school = School.objects.filter(school_code=options['school']).first()
+            if school is None:
+                raise CommandError(f"Unknown school '{options['school']}'.")
+
+        active_version = model_registry.get_versioned()[0]
+        if model_registry.get()[0] is None:
+            raise CommandError("AI model is not loaded; refusing to overwrite scores.")
+
+        vitals = VitalRecord.objects.order_by('pk')
+        if school:
+            vitals = vitals.filter(student__user__school=school)
+        if start:
+            vitals = vitals.filter(recorded_at__gte=start)
+        if end:
+            vitals = vitals.filter(recorded_at__lt=end)
+        if options['versions'] is not None:
+            vitals = vitals.filter(model_version__in=options['versions'])
+        if options['stale']:
+            vitals = vitals.exclude(model_version=active_version)
+
+        filters = {key: options[key] for key in ('school', 'start', 'end', 'versions', 'stale')}
+        # first_day/last_day span every changed vital, across resumed runs, for the rollup rebuild
+        state = {'last_pk': 0, 'processed': 0, 'changed': 0, 'first_day': None, 'last_day': None,
+                 'filters': filters}
+        if options['resume'] and os.path.exists(options['checkpoint']):
+            with open(options['checkpoint']) as fh:
+                state = json.load(fh)
+            if state.get('filters') != filters:
+                raise CommandError("Checkpoint was written with different filters; drop --resume to start over.")
+            vitals = vitals.filter(pk__gt=state['last_pk'])
+            self.stdout.write(f"Resuming after id {state['last_pk']} ({state['processed']} already processed).")
+
+        total = vitals.count()
+        self.stdout.write(
+            f"{'Would re-score' if options['dry_run'] else 'Re-scoring'} {total} vitals with model v{active_version}."
+        )
+
+        self.started = time.perf_counter()
+        self.processed_this_run = 0
+        batch = []
+        rows = vitals.only(
+            'pk', 'student_id', 'recorded_at', 'heart_rate', 'spo2', 'breathing_rate',
+            'temperature_c', 'weight_kg', 'height_cm', *SCORED_FIELDS,
+        ).iterator(chunk_size=chunk_size)
+        for record in rows:
+            batch.append(record)
+            if len(batch) >= chunk_size:
+                self._rescore(batch, state, options)
+                batch = []
+        if batch:
+            self._rescore(batch, state, options)
+
+        if not options['dry_run'] and state['first_day']:
+            self._rebuild_rollups(school, state)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{'Dry run: ' if options['dry_run'] else ''}{state['processed']} vitals processed, "
+            f"{state['changed']} {'would change' if options['dry_run'] else 'changed'} "
+            f"({self._rate():.0f} rows/s)."
+        ))
+
+    def _rescore(self, batch, state, options):
+        version, predictions = predict_health_batch(batch, return_version=True)
+        changed = []
+        for record, (score, label) in zip(batch, predictions):
+            if (record.prediction_score, record.prediction_label, record.model_version) != (score, label, version):
+                record.prediction_score, record.prediction_label, record.model_version = score, label, version
+                changed.append(record)
+
+        if changed and not options['dry_run']:
+            with transaction.atomic():
+                VitalRecord.objects.bulk_update(changed, SCORED_FIELDS)
+                # bulk_update skips signals
+                refresh_latest_vitals({r.student_id for r in changed})
+            days = sorted(timezone.localdate(r.recorded_at).isoformat() for r in changed)
+            state['first_day'] = min(filter(None, [state['first_day'], days[0]]))
+            state['last_day'] = max(filter(None, [state['last_day'], days[-1]]))
+
+        state['last_pk'] = batch[-1].pk
+        state['processed'] += len(batch)
+        state['changed'] += len(changed)
+        self.processed_this_run += len(batch)
+        if options['checkpoint'] and not options['dry_run']:
+            tmp = options['checkpoint'] + '.tmp'
+            with open(tmp, 'w') as fh:
+                json.dump(state, fh)
+            os.replace(tmp, options['checkpoint'])
+
+        self.stdout.write(
+            f"  up to id {state['last_pk']}: {state['processed']} processed, "
+            f"{state['changed']} changed, {self._rate():.0f} rows/s"
+        )
+
+    def _rate(self):
+        elapsed = time.perf_counter() - self.started
+        return self.processed_this_run / elapsed if elapsed else 0.0
+
+    def _rebuild_rollups(self, school, state):
+        """Rebuild the class-day rollups and podiums over the days whose scores changed."""
+        classrooms = VirtualClassroom.objects.all()
+        if school:
+            classrooms = classrooms.filter(school=school)
+        rebuild_daily_health(
+            date.fromisoformat(state['first_day']), date.fromisoformat(state['last_day']),
+            list(classrooms.values_list('pk', flat=True)) if school else None,
+        )
+        for school_id in set(classrooms.values_list('school_id', flat=True)):
+            mark_leaderboard_dirty(school_id)
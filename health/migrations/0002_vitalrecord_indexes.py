@@ -0,0 +1,21 @@
+# Generated by Django 4.2 on 2026-10-18 16:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('health', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='vitalrecord',
+            index=models.Index(fields=['student', '-recorded_at'], name='vital_student_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vitalrecord',
+            index=models.Index(fields=['recorded_at'], name='vital_recorded_at_idx'),
+        ),
+    ]
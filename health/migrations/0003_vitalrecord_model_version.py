@@ -0,0 +1,18 @@
+# Generated by Django 4.2 on 2026-10-18 16:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('health', '0002_vitalrecord_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vitalrecord',
+            name='model_version',
+            field=models.CharField(blank=True, max_length=20),
+        ),
+    ]
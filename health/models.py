@@ -1,7 +1,43 @@
-from django.db import models
+from django.db import models, connections
+from django.db.models import Count, F, Max, Sum, Window
+from django.db.models.functions import RowNumber
 from accounts.models import StudentProfile
 from django.utils import timezone
 
+
+class VitalRecordQuerySet(models.QuerySet):
+    def latest_per_student(self, student_ids=None):
+        """
+        The most recent VitalRecord of each student (ties broken by id), ordered
+        by student_id. Uses DISTINCT ON where the backend supports it
+        (PostgreSQL) and a ROW_NUMBER() window everywhere else, so only one
+        row per student leaves the database.
+        """
+        qs = self
+        if student_ids is not None:
+            qs = qs.filter(student_id__in=student_ids)
+
+        if connections[self.db].features.can_distinct_on_fields:
+            return qs.order_by('student_id', '-recorded_at', '-id').distinct('student_id')
+
+        return qs.annotate(
+            row_number=Window(
+                expression=RowNumber(),
+                partition_by=[F('student_id')],
+                order_by=[F('recorded_at').desc(), F('id').desc()],
+            )
+        ).filter(row_number=1).order_by('student_id')
+
+    def version_stamp(self):
+        """
+        (row count, highest id, score total) of these vitals: changes on every
+        insert, backdated ones included, on every delete and when readings are
+        rescored in bulk (e.g. by `manage.py rescore_vitals`).
+        """
+        state = self.aggregate(count=Count('id'), last_id=Max('id'), scores=Sum('prediction_score'))
+        return state['count'], state['last_id'], state['scores']
+
+
 class VitalRecord(models.Model):
     student = models.ForeignKey(StudentProfile, on_delete=models.CASCADE, related_name='vitals')
     recorded_at = models.DateTimeField(default=timezone.now)
@@ -14,9 +50,19 @@ class VitalRecord(models.Model):
     # computed prediction score and label
     prediction_score = models.FloatField(null=True, blank=True)  # 0-100
     prediction_label = models.CharField(max_length=50, blank=True)
+    model_version = models.CharField(max_length=20, blank=True)  # ai_engine.ModelInfo.version that scored it
+
+    objects = VitalRecordQuerySet.as_manager()
 
     class Meta:
         ordering = ['-recorded_at']
+        indexes = [
+            # Per-student history, "latest vital" lookups and the per-class daily
+            # average (filtered by student, grouped by day of recorded_at)
+            models.Index(fields=['student', '-recorded_at'], name='vital_student_recent_idx'),
+            # School-wide / date-range scans (exports, rollups, rescoring by date)
+            models.Index(fields=['recorded_at'], name='vital_recorded_at_idx'),
+        ]
 
     def __str__(self):
         return f"{self.student} @ {self.recorded_at.strftime('%Y-%m-%d %H:%M')}"
@@ -0,0 +1,116 @@
+# health/series.py
+"""
+Helpers for turning long vital histories into chart-sized series.
+"""
+import hashlib
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+# Chart point budget (?points=) for downsampled series
+DEFAULT_POINTS = 200
+MIN_POINTS = 10
+MAX_POINTS = 2000
+
+
+def point_budget(value, default=DEFAULT_POINTS):
+    """Parse a requested point budget, clamped to [MIN_POINTS, MAX_POINTS]."""
+    try:
+        points = int(value) if value not in (None, '') else default
+    except (TypeError, ValueError):
+        points = default
+    return max(MIN_POINTS, min(points, MAX_POINTS))
+
+
+def lttb_indices(ys_list, threshold):
+    """
+    Largest-Triangle-Three-Buckets downsampling for several series that share
+    one x-axis (the reading order). Returns the sorted indices to keep, at most
+    `threshold` of them, always including the first and last point.
+
+    Each bucket keeps the point whose triangle area, summed over all series
+    (each normalized by its own range), is largest, so a spike in any vital
+    survives downsampling and every series keeps the same labels.
+    """
+    n = len(ys_list[0]) if ys_list else 0
+    if threshold >= n or n <= 2:
+        return list(range(n))
+    if threshold < 3:
+        return [0, n - 1][:max(threshold, 1)]
+
+    normalized = []
+    for ys in ys_list:
+        values = [float(y) if y is not None else 0.0 for y in ys]
+        lo, hi = min(values), max(values)
+        span = (hi - lo) or 1.0
+        normalized.append([(y - lo) / span for y in values])
+
+    keep = [0]
+    bucket_size = (n - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        start = int(i * bucket_size) + 1
+        end = int((i + 1) * bucket_size) + 1
+
+        # Average of the next bucket is the third triangle vertex
+        next_start, next_end = end, min(int((i + 2) * bucket_size) + 1, n)
+        avg_x = (next_start + next_end - 1) / 2
+        avg_ys = [sum(ys[next_start:next_end]) / (next_end - next_start) for ys in normalized]
+
+        best, best_area = start, -1.0
+        for j in range(start, end):
+            area = 0.0
+            for ys, avg_y in zip(normalized, avg_ys):
+                area += abs((a - avg_x) * (ys[j] - ys[a]) - (a - j) * (avg_y - ys[a]))
+            if area > best_area:
+                best, best_area = j, area
+        keep.append(best)
+        a = best
+
+    keep.append(n - 1)
+    return keep
+
+
+def downsample(rows, fields, max_points):
+    """Keep at most `max_points` of `rows` (dicts), chosen by LTTB over `fields`."""
+    indices = lttb_indices([[row[f] for row in rows] for f in fields], max_points)
+    return [rows[i] for i in indices]
+
+
+def _parse_bound(value, end=False):
+    """Parse a YYYY-MM-DD date or ISO datetime; a bare `to` date includes that whole day."""
+    if not value:
+        return None
+    # A bare date first: parse_datetime() also accepts one, as midnight
+    try:
+        day = parse_date(value)
+    except ValueError:
+        day = None
+    if day is not None:
+        dt = datetime.combine(day + timedelta(days=1) if end else day, time.min)
+    else:
+        dt = parse_datetime(value)
+        if dt is None:
+            raise ValueError(f"Invalid date '{value}'.")
+    if timezone.is_naive(dt):
+        dt = timezone.make_aware(dt)
+    return dt
+
+
+def parse_time_range(params):
+    """
+    Read ?from=&to= into aware datetimes (start inclusive, end exclusive; a
+    bare `to` date covers that whole day). Raises ValueError for unparseable
+    or reversed ranges.
+    """
+    start = _parse_bound(params.get('from'))
+    end = _parse_bound(params.get('to'), end=True)
+    if start and end and start > end:
+        raise ValueError("'from' must not be after 'to'.")
+    return start, end
+
+
+def series_etag(*parts):
+    """ETag value built from whatever identifies the series' current state."""
+    return hashlib.md5("|".join(str(p) for p in parts).encode()).hexdigest()
@@ -0,0 +1,89 @@
+# health/signals.py
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from accounts.models import StudentProfile
+from .leaderboard import mark_leaderboard_dirty
+from .models import VitalRecord
+
+
+SNAPSHOT_FIELDS = ['latest_vital', 'latest_score', 'latest_label', 'latest_recorded_at']
+
+
+def refresh_latest_vitals(student_ids=None):
+    """
+    Recompute the latest-vital snapshot on StudentProfile from VitalRecord:
+    one latest_per_student() pass, a bulk_update of the snapshots and one
+    UPDATE clearing students left without vitals. Pass None to refresh
+    every student. Use this after bulk_create/bulk_update/queryset deletes,
+    which skip signals. Returns the number of profiles written.
+    """
+    profiles = StudentProfile.objects.all()
+    if student_ids is not None:
+        student_ids = list(student_ids)
+        profiles = profiles.filter(pk__in=student_ids)
+
+    with transaction.atomic():
+        # Lock the profiles first: a reading saved meanwhile waits, then applies its newer snapshot on top
+        list(profiles.select_for_update().values_list('pk', flat=True))
+        latest = VitalRecord.objects.latest_per_student(student_ids).values_list(
+            'student_id', 'pk', 'prediction_score', 'prediction_label', 'recorded_at'
+        )
+        snapshots = [
+            StudentProfile(pk=student_id, latest_vital_id=pk, latest_score=score,
+                           latest_label=label or '', latest_recorded_at=recorded_at)
+            for student_id, pk, score, label, recorded_at in latest
+        ]
+        StudentProfile.objects.bulk_update(snapshots, SNAPSHOT_FIELDS, batch_size=500)
+        cleared = profiles.filter(latest_recorded_at__isnull=False).exclude(
+            Exists(VitalRecord.objects.filter(student=OuterRef('pk')))
+        ).update(latest_vital=None, latest_score=None, latest_label='', latest_recorded_at=None)
+    return len(snapshots) + cleared
+
+
+def _school_id_for_vital(vital):
+    """The reading's school, from its already-loaded student and user when the caller has them."""
+    if VitalRecord.student.field.is_cached(vital):
+        student = vital.student
+        if StudentProfile.user.field.is_cached(student):
+            return student.user.school_id
+    return StudentProfile.objects.filter(pk=vital.student_id).values_list('user__school_id', flat=True).first()
+
+
+@receiver(post_save, sender=VitalRecord)
+def update_latest_vital_on_save(sender, instance, created, raw=False, **kwargs):
+    """
+    A new reading only replaces the snapshot if it is not older than it;
+    an edited reading may have moved in time, so recompute for that student.
+    """
+    if raw:
+        return
+
+    mark_leaderboard_dirty(_school_id_for_vital(instance))
+
+    if not created:
+        refresh_latest_vitals([instance.student_id])
+        return
+
+    snapshot = {
+        'latest_vital': instance,
+        'latest_score': instance.prediction_score,
+        'latest_label': instance.prediction_label,
+        'latest_recorded_at': instance.recorded_at,
+    }
+    updated = StudentProfile.objects.filter(pk=instance.student_id).filter(
+        Q(latest_recorded_at__isnull=True) | Q(latest_recorded_at__lte=instance.recorded_at)
+    ).update(**snapshot)
+
+    # Keep an already-loaded profile consistent so a later profile.save() doesn't undo this
+    if updated and VitalRecord.student.field.is_cached(instance):
+        for field, value in snapshot.items():
+            setattr(instance.student, field, value)
+
+
+@receiver(post_delete, sender=VitalRecord)
+def update_latest_vital_on_delete(sender, instance, **kwargs):
+    refresh_latest_vitals([instance.student_id])
+    mark_leaderboard_dirty(_school_id_for_vital(instance))
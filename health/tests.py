@@ -1,3 +1,803 @@
-from django.test import TestCase
+import asyncio
+import json
+import os
+from datetime import timedelta
+from io import StringIO
+import random
+import re
+import tempfile
+import threading
+import time
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.messages.storage.fallback import FallbackStorage
+from django.contrib.sessions.backends.db import SessionStore
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.models import Avg
+from django.db.models.functions import TruncDay
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.http import Http404
+from django.urls import reverse
+from django.utils import timezone
+from unittest import skipUnless
+from unittest.mock import patch
+
+from accounts.models import JoinRequest, Notification, School, User
+from ai_engine.timing import start_request_timings, stop_request_timings
+from ai_engine.utils import predict_health_batch
+from classroom import views as classroom_views
+from classroom.models import VirtualClassroom
+from classroom.signals import add_to_daily_health
+from . import async_db, charts, leaderboard, views
+from .async_db import gather_queries, iterate_in_thread
+from .export import parquet_available
+from .management.commands import rescore_vitals
+from .models import VitalRecord
+from .series import parse_time_range
+from .signals import _school_id_for_vital, refresh_latest_vitals
+from .utils import predict_health, predict_health_vectorized
+
+
+def make_class(n_students=3, school_code='pps'):
+    """A school with one teacher and one class of n_students."""
+    school = School.objects.create(name=f"School {school_code}", school_code=school_code)
+    teacher = User.objects.create_user(f"teacher_{school_code}", password='pw', is_teacher=True, school=school)
+    vc = VirtualClassroom.objects.create(school=school, teacher=teacher, class_name='5', section='a')
+
+    students = []
+    for i in range(n_students):
+        user = User.objects.create_user(f"student{i}_{school_code}", password='pw', is_student=True, school=school)
+        profile = user.student_profile
+        profile.roll_no = str(i + 1)
+        profile.class_name = '5'
+        profile.section = 'a'
+        profile.height_cm = 140
+        profile.weight_kg = 35
+        profile.save()
+        students.append(profile)
+    vc.students.add(*students)
+    return school, teacher, vc, students
+
+
+def add_history(students, days, per_day=1):
+    """bulk_create `days` days of readings for every student."""
+    now = timezone.now()
+    VitalRecord.objects.bulk_create([
+        VitalRecord(
+            student=s,
+            recorded_at=now - timedelta(days=d, hours=h),
+            heart_rate=80, spo2=98, breathing_rate=18, temperature_c=36.6,
+            prediction_score=90.0, prediction_label="Healthy",
+        )
+        for s in students for d in range(days) for h in range(per_day)
+    ])
+
+
+class VitalQueryPlanTests(TestCase):
+    """
+    The vitals table grows without bound, so the dashboard queries must stay
+    index-driven. These tests fail if any of them falls back to a full scan.
+    """
+
+    TABLE = VitalRecord._meta.db_table
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.school, cls.teacher, cls.vc, cls.students = make_class(5)
+        add_history(cls.students, days=20)
+        cls.student_ids = [s.id for s in cls.students]
+
+    # Queries whose ORDER BY must come straight from the index, without a sort step
+    PRESORTED = ('student_recent', 'student_history')
+
+    def dashboard_querysets(self):
+        student = self.students[0]
+        return {
+            'student_recent': VitalRecord.objects.filter(student=student).order_by('-recorded_at')[:30],
+            'student_history': VitalRecord.objects.filter(student=student).order_by('recorded_at'),
+            'class_daily_average': VitalRecord.objects.filter(
+                student_id__in=self.student_ids
+            ).annotate(day=TruncDay('recorded_at')).values('day').annotate(
+                avg_score=Avg('prediction_score')
+            ).order_by('day'),
+        }
+
+    def assertPlanLacks(self, plan, pattern, what):
+        self.assertIsNone(re.search(pattern, plan), f"{what} in plan:\n{plan}")
+
+    @skipUnless(connection.vendor == 'sqlite', "SQLite query plan")
+    def test_sqlite_plans_use_indexes(self):
+        # "SCAN <table>" without an index is a full scan; "SEARCH ... USING INDEX" is fine
+        pattern = rf"SCAN {self.TABLE}(?! USING (COVERING )?INDEX)"
+        for name, qs in self.dashboard_querysets().items():
+            with self.subTest(query=name):
+                plan = qs.explain()
+                self.assertPlanLacks(plan, pattern, "Full table scan")
+                if name in self.PRESORTED:
+                    self.assertPlanLacks(plan, r"TEMP B-TREE FOR ORDER BY", "Sort step")
+
+    @skipUnless(connection.vendor == 'postgresql', "PostgreSQL query plan")
+    def test_postgresql_plans_use_indexes(self):
+        # The test table is tiny, so make the planner show whether an index path exists at all
+        with connection.cursor() as cursor:
+            cursor.execute("SET enable_seqscan = off")
+        try:
+            for name, qs in self.dashboard_querysets().items():
+                with self.subTest(query=name):
+                    plan = qs.explain()
+                    self.assertPlanLacks(plan, rf"Seq Scan on {self.TABLE}", "Full table scan")
+                    if name in self.PRESORTED:
+                        self.assertPlanLacks(plan, r"\bSort\b", "Sort step")
+        finally:
+            with connection.cursor() as cursor:
+                cursor.execute("RESET enable_seqscan")
+
+
+class LatestPerStudentTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.school, cls.teacher, cls.vc, cls.students = make_class(4)
+        cls.student_ids = [s.id for s in cls.students]
+
+    def python_latest(self):
+        """The original classroom_detail logic: first row per student in (student, -recorded_at) order."""
+        latest = {}
+        for vital in VitalRecord.objects.filter(student_id__in=self.student_ids).order_by('student_id', '-recorded_at'):
+            latest.setdefault(vital.student_id, vital)
+        return latest
+
+    def test_matches_python_logic(self):
+        add_history(self.students[:3], days=10, per_day=3)
+        # A newer reading inserted out of order for one student
+        VitalRecord.objects.create(
+            student=self.students[1], recorded_at=timezone.now() + timedelta(minutes=5),
+            heart_rate=120, spo2=91, breathing_rate=25, temperature_c=38.5,
+            prediction_score=40.0, prediction_label="Critical",
+        )
+
+        expected = self.python_latest()
+        result = {v.student_id: v for v in VitalRecord.objects.latest_per_student(self.student_ids)}
+
+        self.assertEqual({k: v.pk for k, v in result.items()}, {k: v.pk for k, v in expected.items()})
+        self.assertEqual(result[self.students[1].id].prediction_label, "Critical")
+        # The fourth student has no vitals and is simply absent
+        self.assertNotIn(self.students[3].id, result)
+
+    def test_query_and_row_count_constant_as_history_grows(self):
+        for days in (1, 30):
+            add_history(self.students, days=days)
+            with self.subTest(days=days), self.assertNumQueries(1):
+                rows = list(VitalRecord.objects.latest_per_student(self.student_ids))
+            self.assertEqual(len(rows), len(self.students))
+
+
+def record_vital(student, recorded_at=None, score=90.0, label="Healthy"):
+    return VitalRecord.objects.create(
+        student=student, recorded_at=recorded_at or timezone.now(),
+        heart_rate=80, spo2=98, breathing_rate=18, temperature_c=36.6,
+        prediction_score=score, prediction_label=label,
+    )
+
+
+class LatestVitalSnapshotTests(TestCase):
+    """The latest_* fields on StudentProfile follow saves, edits and deletes of its vitals."""
+
+    def setUp(self):
+        _, _, _, (self.student, self.other) = make_class(2)
+        self.now = timezone.now()
+
+    def snapshot(self):
+        self.student.refresh_from_db()
+        s = self.student
+        return s.latest_vital_id, s.latest_score, s.latest_label, s.latest_recorded_at
+
+    def test_new_reading_becomes_the_snapshot(self):
+        vital = record_vital(self.student, self.now, score=70.0, label="Mild")
+        self.assertEqual(self.snapshot(), (vital.id, 70.0, "Mild", self.now))
+        self.other.refresh_from_db()
+        self.assertIsNone(self.other.latest_vital_id)
+
+    def test_backdated_reading_leaves_the_snapshot_alone(self):
+        latest = record_vital(self.student, self.now)
+        record_vital(self.student, self.now - timedelta(days=2), score=10.0, label="Critical")
+        self.assertEqual(self.snapshot(), (latest.id, 90.0, "Healthy", self.now))
+
+    def test_edit_that_moves_a_reading_in_time(self):
+        latest = record_vital(self.student, self.now)
+        older = record_vital(self.student, self.now - timedelta(days=1), score=50.0, label="Critical")
+        older.recorded_at = self.now + timedelta(hours=1)
+        older.save()
+        self.assertEqual(self.snapshot()[0], older.id)
+        older.recorded_at = self.now - timedelta(days=1)
+        older.save()
+        self.assertEqual(self.snapshot()[0], latest.id)
+
+    def test_delete_falls_back_to_the_previous_reading(self):
+        older = record_vital(self.student, self.now - timedelta(days=1), score=50.0, label="Critical")
+        latest = record_vital(self.student, self.now)
+        latest.delete()
+        self.assertEqual(self.snapshot(), (older.id, 50.0, "Critical", self.now - timedelta(days=1)))
+        older.delete()
+        self.assertEqual(self.snapshot(), (None, None, '', None))
+
+    def test_refresh_queries_do_not_grow_with_history(self):
+        counts = []
+        for days in (1, 20):
+            add_history([self.student, self.other], days=days, per_day=2)
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(refresh_latest_vitals([self.student.id, self.other.id]), 2)
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_refresh_after_bulk_create_and_backfill_command(self):
+        add_history([self.student, self.other], days=3)
+        self.assertIsNone(self.snapshot()[0])
+        call_command('backfill_latest_vitals', stdout=StringIO())
+        expected = VitalRecord.objects.filter(student=self.student).order_by('-recorded_at', '-id').first()
+        self.assertEqual(self.snapshot()[0], expected.id)
+
+
+class StudentDashboardTests(TestCase):
+
+    def setUp(self):
+        _, _, _, (self.student,) = make_class(1)
+        self.client.force_login(self.student.user)
+
+    def test_latest_vital_is_the_newest_reading_of_the_list(self):
+        now = timezone.now()
+        record_vital(self.student, now - timedelta(days=1), score=50.0)
+        record_vital(self.student, now, score=60.0)
+        latest = record_vital(self.student, now, score=70.0)
+        response = self.client.get(reverse('health:student_dashboard'))
+        self.assertEqual(response.context['latest_vital'], latest)
+        self.assertEqual(response.context['vitals'][0], latest)
+
+    def test_no_readings(self):
+        response = self.client.get(reverse('health:student_dashboard'))
+        self.assertIsNone(response.context['latest_vital'])
+
+
+class SchoolLeaderboardTests(TestCase):
+    """The cached podium, its dirty flag and the signal that sets it."""
+
+    def setUp(self):
+        cache.clear()
+        self.school, _, self.vc, self.students = make_class(2)
+        self.now = timezone.now()
+        for student in self.students:
+            record_vital(student, self.now, score=20.0)
+
+    def test_cached_podium_is_served_without_queries(self):
+        podium = leaderboard.get_school_leaderboard(self.school.id)
+        self.assertEqual([(c['rank'], c['score']) for c in podium], [(1, 20.0)])
+        with self.assertNumQueries(0):
+            self.assertEqual(leaderboard.get_school_leaderboard(self.school.id), podium)
+
+    def test_new_reading_is_picked_up_once_the_podium_is_stale(self):
+        leaderboard.get_school_leaderboard(self.school.id)
+        record_vital(self.students[0], self.now + timedelta(minutes=1), score=40.0)
+        self.assertEqual(leaderboard.get_school_leaderboard(self.school.id)[0]['score'], 20.0)
+        with override_settings(LEADERBOARD_STALENESS_SECONDS=0):
+            self.assertEqual(leaderboard.get_school_leaderboard(self.school.id)[0]['score'], 30.0)
+
+    def test_write_during_a_recompute_keeps_the_podium_dirty(self):
+        compute = leaderboard.compute_school_leaderboard
+
+        def compute_with_concurrent_write(school_id):
+            top_classes = compute(school_id)
+            leaderboard.mark_leaderboard_dirty(school_id)
+            return top_classes
+
+        with patch.object(leaderboard, 'compute_school_leaderboard', compute_with_concurrent_write):
+            leaderboard.get_school_leaderboard(self.school.id)
+        self.assertTrue(cache.get(leaderboard._dirty_key(self.school.id)))
+
+    def test_signal_uses_the_loaded_student_for_the_school(self):
+        vital = VitalRecord.objects.select_related('student__user').filter(student=self.students[0]).get()
+        with self.assertNumQueries(0):
+            self.assertEqual(_school_id_for_vital(vital), self.school.id)
+        vital = VitalRecord.objects.filter(student=self.students[0]).get()
+        with self.assertNumQueries(1):
+            self.assertEqual(_school_id_for_vital(vital), self.school.id)
+
+
+class RescoreVitalsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        _, self.teacher, self.vc, self.students = make_class(2)
+        _, _, _, self.others = make_class(1, school_code='oth')
+        self.now = timezone.now()
+        for student in self.students + self.others:
+            for days in range(3):
+                record_vital(student, self.now - timedelta(days=days), score=1.0, label="Stale")
+        VitalRecord.objects.update(model_version='0.9')
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.checkpoint = os.path.join(self.tmpdir.name, 'rescore.json')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def rescore(self, *args):
+        out = StringIO()
+        call_command('rescore_vitals', *args, stdout=out)
+        return out.getvalue()
+
+    def stale(self):
+        return VitalRecord.objects.filter(prediction_label="Stale")
+
+    def test_rescores_and_refreshes_snapshots(self):
+        self.rescore()
+        self.assertFalse(self.stale().exists())
+        self.assertEqual(set(VitalRecord.objects.values_list('model_version', flat=True)), {'1.0'})
+        student = self.students[0]
+        student.refresh_from_db()
+        self.assertEqual(student.latest_score, VitalRecord.objects.get(pk=student.latest_vital_id).prediction_score)
+        # Everything already carries the active version
+        self.assertIn("0 changed", self.rescore('--stale'))
+
+    def test_rescore_changes_the_etags_and_chart_versions(self):
+        student = self.students[0]
+        urls = [reverse('health:student_series', args=[student.id]), reverse('classroom_series', args=[self.vc.id])]
+        self.client.force_login(self.teacher)
+
+        def stamps():
+            student.refresh_from_db()
+            return (
+                [self.client.get(url)['ETag'] for url in urls],
+                [charts.student_chart_version(student), classroom_views._classroom_chart_version(self.vc)],
+            )
+
+        before = stamps()
+        self.rescore()
+        after = stamps()
+        for old, new in zip(before, after):
+            self.assertNotEqual(old[0], new[0])
+            self.assertNotEqual(old[1], new[1])
+
+    def test_dry_run_writes_nothing(self):
+        out = self.rescore('--dry-run', '--checkpoint', self.checkpoint)
+        self.assertIn("Dry run: 9 vitals processed, 9 would change", out)
+        self.assertEqual(self.stale().count(), 9)
+        self.assertFalse(os.path.exists(self.checkpoint))
+
+    def test_filters(self):
+        self.rescore('--school', 'oth')
+        self.assertEqual(set(self.stale().values_list('student__user__school__school_code', flat=True)), {'pps'})
+
+        day = timezone.localdate(self.now - timedelta(days=1)).isoformat()
+        self.rescore('--school', 'pps', '--from', day, '--to', day)
+        self.assertEqual(self.stale().count(), 4)
+
+        VitalRecord.objects.filter(pk=self.stale().first().pk).update(model_version='')
+        self.rescore('--model-version', '0.9')
+        self.assertEqual(self.stale().count(), 1)
+        self.rescore('--model-version', '')
+        self.assertFalse(self.stale().exists())
+
+        with self.assertRaises(CommandError):
+            self.rescore('--school', 'nope')
+
+    def test_checkpoint_and_resume(self):
+        calls = []
+
+        def crash_on_second_chunk(batch, return_version):
+            calls.append(len(batch))
+            if len(calls) == 2:
+                raise RuntimeError("worker killed")
+            return predict_health_batch(batch, return_version=return_version)
+
+        with patch.object(rescore_vitals, 'predict_health_batch', crash_on_second_chunk), \
+             self.assertRaises(RuntimeError):
+            self.rescore('--chunk-size', '4', '--checkpoint', self.checkpoint)
+        with open(self.checkpoint) as fh:
+            state = json.load(fh)
+        self.assertEqual((state['processed'], state['changed']), (4, 4))
+        self.assertEqual(self.stale().count(), 5)
+
+        with self.assertRaises(CommandError):
+            self.rescore('--resume', '--checkpoint', self.checkpoint, '--school', 'oth')
+
+        out = self.rescore('--chunk-size', '4', '--checkpoint', self.checkpoint, '--resume')
+        self.assertIn(f"Resuming after id {state['last_pk']}", out)
+        self.assertIn("9 vitals processed, 9 changed", out)
+        self.assertFalse(self.stale().exists())
+
+
+class VectorizedRulesTests(SimpleTestCase):
+    """predict_health_vectorized must agree with the scalar rules element by element."""
+
+    # Every threshold, a step either side of it, and missing values
+    EDGES = {
+        'heart_rate': [None, 0, 49, 49.9, 50, 100, 100.1, 120, 120.1, 180],
+        'spo2': [None, 0, 84.9, 85, 91.9, 92, 94.9, 95, 100],
+        'breathing_rate': [None, 0, 22, 22.1, 30, 30.1, 60],
+        'temperature_c': [None, 30, 37.4, 37.5, 37.9, 38, 39.9, 40, 43],
+        'weight_kg': [None, 0, 10, 25, 35, 60, 120],
+        'height_cm': [None, 0, 90, 120, 140, 160, 190],
+    }
+    RANGES = {
+        'heart_rate': (30, 200), 'spo2': (70, 100), 'breathing_rate': (5, 45),
+        'temperature_c': (34, 42), 'weight_kg': (5, 150), 'height_cm': (80, 200),
+    }
+
+    def random_readings(self, n, seed):
+        rng = random.Random(seed)
+        readings = []
+        for _ in range(n):
+            reading = {}
+            for field, edges in self.EDGES.items():
+                pick = rng.random()
+                if pick < 0.4:
+                    reading[field] = rng.choice(edges)
+                elif pick < 0.5:
+                    reading[field] = rng.randint(*self.RANGES[field])
+                else:
+                    reading[field] = round(rng.uniform(*self.RANGES[field]), rng.choice([0, 1, 2, 6]))
+            readings.append(reading)
+        return readings
+
+    def assert_matches_scalar(self, readings):
+        columns = {field: [r[field] for r in readings] for field in self.EDGES}
+        scores, labels = predict_health_vectorized(**columns)
+        for i, reading in enumerate(readings):
+            self.assertEqual((float(scores[i]), str(labels[i])), predict_health(**reading), reading)
+
+    def test_random_readings(self):
+        for seed in range(20):
+            self.assert_matches_scalar(self.random_readings(500, seed))
+
+    def test_all_missing_and_all_extreme(self):
+        self.assert_matches_scalar([
+            dict.fromkeys(self.EDGES),
+            {'heart_rate': 10, 'spo2': 50, 'breathing_rate': 60, 'temperature_c': 43, 'weight_kg': 150,
+             'height_cm': 100},
+        ])
+
+    def test_optional_body_measurements(self):
+        scores, labels = predict_health_vectorized([80, 130], [98, 88], [18, 25], [36.6, 38.5])
+        self.assertEqual(
+            list(zip(scores.tolist(), labels.tolist())),
+            [predict_health(80, 98, 18, 36.6), predict_health(130, 88, 25, 38.5)],
+        )
+
+
+class TeacherDashboardQueryTests(TestCase):
+    """The dashboard's query count must not grow with classes, students or notifications."""
+
+    def build(self, n_classes, n_students, n_notifications):
+        school, teacher, vc, students = make_class(n_students, school_code=f"s{n_classes}")
+        add_history(students, days=1)
+        refresh_latest_vitals([s.pk for s in students])
+        for i in range(1, n_classes):
+            extra = VirtualClassroom.objects.create(school=school, teacher=teacher, class_name='6', section=str(i))
+            extra.students.add(*students)
+        Notification.objects.bulk_create([
+            Notification(teacher=teacher, message=f"Alert {i}") for i in range(n_notifications)
+        ])
+        JoinRequest.objects.bulk_create([
+            JoinRequest(student=s, teacher=teacher, class_name='5', section='a') for s in students
+        ])
+        return teacher
+
+    def dashboard_queries(self, teacher):
+        cache.clear()  # include the podium computation
+        self.client.force_login(teacher)
+        with self.assertNumQueries(10):
+            response = self.client.get(reverse('health:teacher_dashboard'))
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_query_count_is_constant(self):
+        small = self.dashboard_queries(self.build(n_classes=1, n_students=1, n_notifications=1))
+        large = self.dashboard_queries(self.build(n_classes=8, n_students=12, n_notifications=45))
+
+        self.assertEqual([c.student_count for c in large.context['my_classes']], [12] * 8)
+        self.assertEqual(len(small.context['top_classes']), 1)
+        self.assertEqual(len(large.context['top_classes']), 3)
+
+    def test_notifications_are_paginated_and_marked_read(self):
+        teacher = self.build(n_classes=1, n_students=1, n_notifications=45)
+        response = self.dashboard_queries(teacher)
+
+        page = response.context['notifications']
+        self.assertEqual(response.context['unread_count'], 45)
+        self.assertEqual(len(page.object_list), 20)
+        self.assertFalse(any(n.is_read for n in page.object_list))  # rendered as unread
+        self.assertFalse(Notification.objects.filter(teacher=teacher, is_read=False).exists())
+
+        response = self.client.get(reverse('health:teacher_dashboard'), {'notifications_page': 3})
+        self.assertEqual(len(response.context['notifications'].object_list), 5)
+        self.assertEqual(response.context['unread_count'], 0)
+
+
+class VitalsExportTests(TestCase):
+    def setUp(self):
+        self.school, self.teacher, self.vc, self.students = make_class(2)
+        add_history(self.students, days=3)
+        self.client.force_login(self.teacher)
+
+    def export(self, **params):
+        response = self.client.get(reverse('health:export_vitals'), params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content)
+
+    def test_csv_export_with_date_range(self):
+        rows = self.export().decode().splitlines()
+        self.assertEqual(rows[0].split(',')[:3], ['vital_id', 'recorded_at', 'student_code'])
+        self.assertEqual(len(rows), 1 + 6)
+        self.assertIn(',5,a,', rows[1])
+
+        today = timezone.localdate().isoformat()
+        self.assertEqual(len(self.export(**{'from': today}).decode().splitlines()), 1 + 2)
+
+    async def test_async_iterator_under_asgi(self):
+        await sync_to_async(self.async_client.force_login)(self.teacher)
+        response = await self.async_client.get(reverse('health:export_vitals'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_async)
+        content = b''.join([chunk async for chunk in response.streaming_content])
+        self.assertEqual(content, await sync_to_async(self.export)())
+
+    def test_iterate_in_thread_closes_the_source(self):
+        closed = []
+
+        def source():
+            try:
+                yield from range(1000)
+            finally:
+                closed.append(True)
+
+        async def first_three():
+            chunks = iterate_in_thread(source(), per_hop=10)
+            taken = [await chunks.__anext__() for _ in range(3)]
+            await chunks.aclose()
+            return taken
+
+        self.assertEqual(async_to_sync(first_three)(), [0, 1, 2])
+        self.assertEqual(closed, [True])
+
+    def test_only_teachers_of_the_school(self):
+        self.client.force_login(self.students[0].user)
+        self.assertEqual(self.client.get(reverse('health:export_vitals')).status_code, 403)
+
+    def test_rejects_unknown_format(self):
+        response = self.client.get(reverse('health:export_vitals'), {'format': 'xlsx'})
+        self.assertEqual(response.status_code, 400)
+
+    @skipUnless(parquet_available(), "pyarrow is not installed")
+    def test_parquet_export(self):
+        import io
+        import pyarrow.parquet as pq
+
+        table = pq.read_table(io.BytesIO(self.export(format='parquet')))
+        self.assertEqual(table.num_rows, 6)
+        self.assertEqual(table.column('class_name').to_pylist(), ['5'] * 6)
+
+
+class ServerChartTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.school, self.teacher, self.vc, self.students = make_class(2)
+        add_history(self.students, days=5)
+        # bulk_create skips the signals that keep the snapshots and class rollup current
+        refresh_latest_vitals([s.id for s in self.students])
+        add_to_daily_health(list(VitalRecord.objects.all()))
+        self.student = self.students[0]
+        self.student.refresh_from_db()
+        self.client.force_login(self.student.user)
+
+    def test_versioned_chart_is_immutable_and_drawn_once(self):
+        url = charts.student_chart_url(self.student, 'recent')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/svg+xml')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertTrue(response.content.startswith(b'<svg'))
+        self.assertEqual(response.content.count(b'<path'), 3)
+
+        with patch.object(charts, 'line_chart_svg') as draw:
+            self.assertEqual(self.client.get(url).content, response.content)
+        draw.assert_not_called()
+
+        # Unversioned requests revalidate, and get a 304 while no new vitals arrived
+        plain = reverse('health:student_chart', args=[self.student.id, 'recent'])
+        self.assertIn('no-cache', self.client.get(plain)['Cache-Control'])
+        self.assertEqual(self.client.get(plain, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+    def test_new_vitals_change_the_chart_url(self):
+        before = charts.student_chart_url(self.student, 'score')
+        self.client.post(reverse('health:add_vital'), {
+            'heart_rate': 90, 'spo2': 97, 'breathing_rate': 18, 'temperature': 37,
+        })
+        self.student.refresh_from_db()
+        self.assertNotEqual(charts.student_chart_url(self.student, 'score'), before)
+
+    def test_dashboards_use_svg_when_enabled(self):
+        with self.settings(SERVER_SIDE_CHARTS=True):
+            response = self.client.get(reverse('health:student_dashboard'))
+        self.assertContains(response, charts.student_chart_url(self.student, 'recent').replace('&', '&amp;'))
+        self.assertNotContains(response, 'chart.js')
+
+        self.client.force_login(self.teacher)
+        response = self.client.get(reverse('classroom_detail', args=[self.vc.id]) + '?charts=svg')
+        self.assertContains(response, reverse('classroom_chart', args=[self.vc.id]))
+        svg = self.client.get(reverse('classroom_chart', args=[self.vc.id]), {'size': 'sm'})
+        self.assertEqual(svg.content.count(b'<path'), 1)
+
+    def test_other_students_and_unknown_sizes(self):
+        other = reverse('health:student_chart', args=[self.students[1].id, 'recent'])
+        self.assertEqual(self.client.get(other).status_code, 404)
+        mine = reverse('health:student_chart', args=[self.student.id, 'recent'])
+        self.assertEqual(self.client.get(mine, {'size': 'xl'}).status_code, 400)
+
+
+class VitalSeriesTests(TestCase):
+    """ETags of the series APIs and chart versions follow every insert and delete."""
+
+    def setUp(self):
+        self.school, self.teacher, self.vc, self.students = make_class(2)
+        self.student = self.students[0]
+        self.now = timezone.now()
+        self.latest = record_vital(self.student, self.now)
+        self.url = reverse('health:student_series', args=[self.student.id])
+        self.class_url = reverse('classroom_series', args=[self.vc.id])
+
+    def etag(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+        return response['ETag']
+
+    def chart_versions(self):
+        self.student.refresh_from_db()
+        return charts.student_chart_version(self.student), classroom_views._classroom_chart_version(self.vc)
+
+    def test_backdated_insert_and_delete_change_the_etags(self):
+        self.client.force_login(self.teacher)
+        etags, versions = [(self.etag(self.url), self.etag(self.class_url))], [self.chart_versions()]
+
+        backdated = record_vital(self.student, self.now - timedelta(days=3), score=40.0)
+        etags.append((self.etag(self.url), self.etag(self.class_url)))
+        versions.append(self.chart_versions())
+
+        backdated.delete()
+        etags.append((self.etag(self.url), self.etag(self.class_url)))
+        versions.append(self.chart_versions())
+
+        # Each write changes both tags; undoing the insert brings back the original data, and tags
+        for changes in (etags, versions):
+            for kind in (0, 1):
+                self.assertNotEqual(changes[0][kind], changes[1][kind])
+                self.assertNotEqual(changes[1][kind], changes[2][kind])
+                self.assertEqual(changes[0][kind], changes[2][kind])
+        response = self.client.get(self.url)
+        self.assertEqual(len(response.json()['timestamps']), 1)
+
+    def test_bare_to_date_includes_that_whole_day(self):
+        day = timezone.localdate(self.now)
+        start, end = parse_time_range({'from': day.isoformat(), 'to': day.isoformat()})
+        self.assertEqual(end - start, timedelta(days=1))
+        self.client.force_login(self.teacher)
+        response = self.client.get(self.url, {'from': day.isoformat(), 'to': day.isoformat()})
+        self.assertEqual(len(response.json()['timestamps']), 1)
+        with self.assertRaises(ValueError):
+            parse_time_range({'from': '2024-13-01'})
+
+    def test_permission_lookup_runs_once_per_request(self):
+        self.client.force_login(self.teacher)
+        etag = self.etag(self.url)
+        with patch.object(views, '_find_series_student', wraps=views._find_series_student) as find:
+            self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+            self.assertEqual(self.client.get(self.url).status_code, 200)
+        self.assertEqual(find.call_count, 2)
+
+    def test_other_students_series_is_not_found(self):
+        self.client.force_login(self.student.user)
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+        other = reverse('health:student_series', args=[self.students[1].id])
+        self.assertEqual(self.client.get(other).status_code, 404)
+        self.assertEqual(self.client.get(self.class_url).status_code, 404)
+
+
+class GatherQueriesTests(SimpleTestCase):
+    def test_runs_blocks_concurrently_in_order(self):
+        def block(value):
+            def run():
+                time.sleep(0.2)
+                return value, threading.get_ident()
+            return run
+
+        start = time.perf_counter()
+        results = asyncio.run(gather_queries(block(1), block(2), block(3)))
+        self.assertLess(time.perf_counter() - start, 0.5)
+        self.assertEqual([value for value, _ in results], [1, 2, 3])
+        self.assertEqual(len({thread for _, thread in results}), 3)
+
+
+class AsyncDashboardTestsMixin:
+    """The async dashboards render what the sync ones do."""
+
+    def setUp(self):
+        cache.clear()
+        self.school, self.teacher, self.vc, self.students = make_class(3)
+        add_history(self.students, days=3)
+        refresh_latest_vitals([s.id for s in self.students])
+
+    def get(self, view, user, **kwargs):
+        request = RequestFactory().get('/')
+        request.user = user
+        request.session = SessionStore()
+        request._messages = FallbackStorage(request)
+        response = view(request, **kwargs)
+        if asyncio.iscoroutine(response):
+            response = async_to_sync(lambda: response)()
+        # Every render gets a fresh CSRF token
+        response.content = re.sub(rb'name="csrfmiddlewaretoken" value="[^"]*"', b'', response.content)
+        return response
+
+    def assertSamePage(self, sync_view, async_view, user, **kwargs):
+        expected = self.get(sync_view, User.objects.get(pk=user.pk), **kwargs)
+        actual = self.get(async_view, User.objects.get(pk=user.pk), **kwargs)
+        self.assertEqual(actual.status_code, 200)
+        self.assertEqual(actual.content.decode(), expected.content.decode())
+        return actual
+
+    def test_student_dashboard(self):
+        self.assertSamePage(views.student_dashboard, views.student_dashboard_async, self.students[0].user)
+
+    def test_teacher_dashboard(self):
+        JoinRequest.objects.create(student=self.students[0], teacher=self.teacher, class_name='5', section='a')
+        response = self.assertSamePage(views.teacher_dashboard, views.teacher_dashboard_async, self.teacher)
+        self.assertContains(response, self.school.name)
+
+    def test_classroom_detail(self):
+        response = self.assertSamePage(
+            classroom_views.classroom_detail, classroom_views.classroom_detail_async, self.teacher, pk=self.vc.id
+        )
+        self.assertContains(response, self.students[0].student_code)
+
+    def test_other_requests_go_to_the_sync_view(self):
+        self.assertEqual(self.get(views.teacher_dashboard_async, AnonymousUser()).status_code, 302)
+        student = self.students[0].user
+        response = self.get(views.teacher_dashboard_async, student)
+        self.assertEqual(response['Location'], reverse('health:student_dashboard'))
+        other = User.objects.create_user('other_teacher', is_teacher=True, school=self.school)
+        with self.assertRaises(Http404):
+            self.get(classroom_views.classroom_detail_async, other, pk=self.vc.id)
+
+
+class AsyncDashboardTests(AsyncDashboardTestsMixin, TestCase):
+    """Inside the test transaction gather_queries runs the blocks one after another."""
+
+
+class ConcurrentAsyncDashboardTests(AsyncDashboardTestsMixin, TransactionTestCase):
+    """Committed fixtures, so gather_queries spreads the blocks over its pool threads."""
+
+    def get(self, view, user, **kwargs):
+        with patch.object(async_db, '_on_own_connection', wraps=async_db._on_own_connection) as pooled:
+            response = super().get(view, user, **kwargs)
+        if view in (views.student_dashboard_async, views.teacher_dashboard_async,
+                    classroom_views.classroom_detail_async) and response.status_code == 200:
+            self.assertTrue(pooled.called)
+        return response
+
+    def test_pool_queries_are_timed_and_bounded(self):
+        def query():
+            return threading.current_thread().name, VitalRecord.objects.count()
+
+        timings, token = start_request_timings()
+        try:
+            results = asyncio.run(gather_queries(query, query, query))
+        finally:
+            stop_request_timings(token)
+        self.assertEqual([count for _, count in results], [9] * 3)
+        self.assertTrue(all(name.startswith('async-db') for name, _ in results))
+        self.assertEqual(timings.query_count, 3)
+        self.assertEqual(async_db._query_executor()._max_workers, settings.ASYNC_DB_POOL_SIZE)
@@ -1,12 +1,22 @@
 # health/urls.py
+from django.conf import settings
 from django.urls import path
 from . import views
 
 app_name = 'health' # <-- Add this line
 
+# Under ASGI the dashboards' independent queries run concurrently
+if settings.ASYNC_DASHBOARDS:
+    student_dashboard, teacher_dashboard = views.student_dashboard_async, views.teacher_dashboard_async
+else:
+    student_dashboard, teacher_dashboard = views.student_dashboard, views.teacher_dashboard
+
 urlpatterns = [
     path('add/', views.add_vital_record, name='add_vital'),
-    path('student/dashboard/', views.student_dashboard, name='student_dashboard'),
-    path('teacher/dashboard/', views.teacher_dashboard, name='teacher_dashboard'),
+    path('student/dashboard/', student_dashboard, name='student_dashboard'),
+    path('teacher/dashboard/', teacher_dashboard, name='teacher_dashboard'),
     path('add/<str:student_code>/', views.add_vital_record, name='add_vital_for_student'),
+    path('api/student/<int:student_id>/series/', views.student_vital_series, name='student_series'),
+    path('api/student/<int:student_id>/chart/<str:chart>.svg', views.student_vital_chart, name='student_chart'),
+    path('export/vitals/', views.export_school_vitals, name='export_vitals'),
 ]
\ No newline at end of file
@@ -1,5 +1,10 @@
 # WARNING: This is a simple heuristic model for demonstration.
 # Not medical advice. Use proper clinical models for production.
+import numpy as np
+
+# model_version recorded on vitals scored by these rules (see ai_engine.utils)
+RULES_VERSION = 'rules'
+
 
 def predict_health(heart_rate, spo2, breathing_rate, temperature_c, weight_kg=None, height_cm=None):
     """
@@ -78,3 +83,47 @@ def predict_health(heart_rate, spo2, breathing_rate, temperature_c, weight_kg=No
 
     if score > 100: score = 100.0
     return round(score, 1), label
+
+
+def _column(values, n):
+    """Float array of length n from values (None -> NaN); a scalar or None is broadcast."""
+    if values is None or np.ndim(values) == 0:
+        values = [values] * n
+    return np.array(values, dtype=float).reshape(n)
+
+
+def predict_health_vectorized(heart_rate, spo2, breathing_rate, temperature_c, weight_kg=None, height_cm=None):
+    """
+    predict_health() over whole arrays: same thresholds, same missing-value
+    handling (None or NaN counts as missing). Returns (scores, labels) arrays.
+    """
+    n = len(heart_rate)
+    hr, spo2, br, temp = (_column(v, n) for v in (heart_rate, spo2, breathing_rate, temperature_c))
+    weight, height = _column(weight_kg, n), _column(height_cm, n)
+
+    # np.select takes the first matching condition, like the if/elif chains above
+    score = np.select(
+        [np.isnan(spo2), spo2 < 85, spo2 < 92, spo2 < 95], [5, 50, 30, 10], 0.0
+    )
+    score += np.select(
+        [np.isnan(temp), temp >= 40, temp >= 38, temp >= 37.5], [2, 40, 20, 8], 0.0
+    )
+    score += np.select(
+        [np.isnan(hr), hr < 50, hr <= 100, hr <= 120], [2, 20, 0, 15], 30.0
+    )
+    score += np.select(
+        [np.isnan(br), br > 30, br > 22], [2, 30, 15], 0.0
+    )
+
+    # BMI only counts when both weight and height are given and non-zero
+    has_bmi = ~np.isnan(weight) & ~np.isnan(height) & (weight != 0) & (height != 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        bmi = weight / (height / 100.0) ** 2
+    score += np.where(
+        has_bmi,
+        np.select([(bmi < 16) | (bmi > 35), (bmi < 18.5) | (bmi > 30)], [10, 5], 0.0),
+        0.0,
+    )
+
+    labels = np.select([score < 10, score < 30], ["Normal", "Watch"], "High Risk")
+    return np.round(np.minimum(score, 100.0), 1), labels
@@ -1,16 +1,27 @@
 # health/views.py
+from asgiref.sync import sync_to_async
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import JsonResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_GET
 
 from classroom.models import VirtualClassroom
 from .models import VitalRecord
-from accounts.models import StudentProfile, TeacherProfile, Notification, JoinRequest
+from accounts.models import School, StudentProfile, TeacherProfile, Notification, JoinRequest
 from ai_engine.utils import predict_health
 from ai_engine.translate import get_translated_text
+from . import charts
+from .async_db import gather_queries, iterate_in_thread, request_user
+from .export import EXPORT_FORMATS, export_rows, iter_export, parquet_available
+from .leaderboard import get_school_leaderboard
+from .series import downsample, parse_time_range, point_budget, series_etag
 
-from django.db.models import Avg, Prefetch
+from django.core.paginator import Paginator
+from django.db.models import Avg, Count
+from django.db.models.functions import TruncDay, TruncHour
 
 
 # 🩺 ADD VITAL RECORD
@@ -35,7 +46,7 @@ def add_vital_record(request, student_code=None):
         weight = request.POST.get('weight_kg') or student_profile.weight_kg
         height = request.POST.get('height_cm') or student_profile.height_cm
 
-        score, label = predict_health(hr, spo2, br, temp, weight, height)
+        score, label, model_version = predict_health(hr, spo2, br, temp, weight, height, return_version=True)
 
         VitalRecord.objects.create(
             student=student_profile,
@@ -46,7 +57,8 @@ def add_vital_record(request, student_code=None):
             weight_kg=weight,
             height_cm=height,
             prediction_score=score,
-            prediction_label=label
+            prediction_label=label,
+            model_version=model_version
         )
 
         return render(request, 'health/add_vital.html', {
@@ -66,27 +78,43 @@ def student_dashboard(request):
         return redirect('health:teacher_dashboard')
 
     profile = request.user.student_profile
-    vitals_qs = profile.vitals.all().order_by('-recorded_at')
-    latest_vital = vitals_qs.first()
-    vitals = list(vitals_qs[:30])
+    recent = _recent_vitals(VitalRecord.objects.filter(student=profile))
+    return _render_student_dashboard(request, profile, recent)
 
-    labels = [v.recorded_at.strftime("%d %b %H:%M") for v in reversed(vitals)]
-    hr_data = [v.heart_rate for v in reversed(vitals)]
-    spo2_data = [v.spo2 for v in reversed(vitals)]
-    temp_data = [v.temperature_c for v in reversed(vitals)]
 
+async def student_dashboard_async(request):
+    """student_dashboard, with the profile and vitals queries issued together (ASGI)."""
+    user = await request_user(request)
+    if not (user.is_authenticated and user.is_student):
+        return await sync_to_async(student_dashboard)(request)
+
+    vitals = VitalRecord.objects.filter(student__user=user)
+    profile, recent = await gather_queries(
+        lambda: user.student_profile,
+        lambda: _recent_vitals(vitals),
+    )
+    return await sync_to_async(_render_student_dashboard)(request, profile, recent)
+
+
+def _recent_vitals(vitals):
+    return list(vitals.order_by('-recorded_at', '-id')[:30])
+
+
+def _render_student_dashboard(request, profile, vitals):
+    # The chart is fetched from student_vital_series, or drawn server-side as SVG
     return render(request, 'health/student_dashboard.html', {
         'profile': profile,
         'vitals': vitals,
-        'latest_vital': latest_vital,
-        'labels': labels,
-        'hr_data': hr_data,
-        'spo2_data': spo2_data,
-        'temp_data': temp_data
+        # Newest first, so the latest reading is already loaded
+        'latest_vital': vitals[0] if vitals else None,
+        'chart_svg_url': charts.student_chart_url(profile, 'recent') if charts.use_server_charts(request) else None,
     })
 
 
 # 🧑‍🏫 TEACHER DASHBOARD
+NOTIFICATIONS_PAGE_SIZE = 20
+
+
 @login_required
 def teacher_dashboard(request):
     teacher = request.user
@@ -120,67 +148,274 @@ def teacher_dashboard(request):
         return redirect('health:teacher_dashboard')
 
     # --- Get Teacher-Specific Data ---
-    notifications = Notification.objects.filter(teacher=teacher).order_by('-created_at')
+    notification_page, unread_count = _teacher_notifications(request, teacher)
+    my_classes = _teacher_classes(teacher)
+    pending_requests = _pending_requests(teacher)
+
+    # --- Top 3 Classes (Podium), cached per school ---
+    top_classes = get_school_leaderboard(school.id)
+
+    return _render_teacher_dashboard(request, my_classes, notification_page, unread_count, pending_requests, top_classes)
+
+
+async def teacher_dashboard_async(request):
+    """
+    teacher_dashboard's GET, with notifications, classes, join requests and
+    the podium fetched concurrently (ASGI). Everything else (class creation,
+    redirects) goes to the sync view.
+    """
+    teacher = await request_user(request)
+    if request.method == 'POST' or not (
+        teacher.is_authenticated and getattr(teacher, 'is_teacher', False) and teacher.school_id
+    ):
+        return await sync_to_async(teacher_dashboard)(request)
+
+    (notification_page, unread_count), my_classes, pending_requests, top_classes, _ = await gather_queries(
+        lambda: _teacher_notifications(request, teacher),
+        lambda: _teacher_classes(teacher),
+        lambda: _pending_requests(teacher),
+        lambda: get_school_leaderboard(teacher.school_id),
+        lambda: teacher.school,  # for the podium heading
+    )
+    return await sync_to_async(_render_teacher_dashboard)(
+        request, my_classes, notification_page, unread_count, pending_requests, top_classes
+    )
+
+
+def _teacher_notifications(request, teacher):
+    """(page of notifications, unread count); marks them all read."""
+    # Fetch the visible page before marking everything read, so unread ones still stand out
+    notifications = Notification.objects.filter(teacher=teacher).order_by('-created_at', '-id')
     unread_count = notifications.filter(is_read=False).count()
-    Notification.objects.filter(teacher=teacher, is_read=False).update(is_read=True)
+    notification_page = Paginator(notifications, NOTIFICATIONS_PAGE_SIZE).get_page(
+        request.GET.get('notifications_page')
+    )
+    notification_page.object_list = list(notification_page.object_list)
+    if unread_count:
+        Notification.objects.filter(teacher=teacher, is_read=False).update(is_read=True)
+    return notification_page, unread_count
+
+
+def _teacher_classes(teacher):
+    return list(VirtualClassroom.objects.filter(teacher=teacher).annotate(
+        student_count=Count('students')
+    ).order_by('id'))
 
-    my_classes = VirtualClassroom.objects.filter(teacher=teacher)
-    for c in my_classes:
-        c.student_count = c.students.count()
 
-    pending_requests = JoinRequest.objects.filter(
+def _pending_requests(teacher):
+    return list(JoinRequest.objects.filter(
         teacher=teacher, approved=False
-    ).select_related('student__user')
+    ).select_related('student__user'))
 
-    # --- Top 3 Classes (Podium) ---
-    latest_vitals_prefetch = Prefetch(
-        'vitals',
-        queryset=VitalRecord.objects.order_by('-recorded_at'),
-        to_attr='vitals_list'
-    )
-    all_students_in_school = StudentProfile.objects.filter(
-        user__school=school
-    ).prefetch_related(latest_vitals_prefetch)
-
-    student_scores_map = {}
-    for student in all_students_in_school:
-        if student.vitals_list:
-            student_scores_map[student.id] = student.vitals_list[0].prediction_score
-
-    all_school_classes = VirtualClassroom.objects.filter(
-        school=school
-    ).prefetch_related('students')
-
-    class_rankings = []
-    for vc in all_school_classes:
-        class_scores = []
-        for student in vc.students.all(): 
-            if student.id in student_scores_map:
-                class_scores.append(student_scores_map[student.id])
-        
-        if class_scores:
-            avg_score = sum(class_scores) / len(class_scores)
-            class_rankings.append({
-                'vc': vc,
-                'avg_risk_score': avg_score
-            })
-
-    class_rankings.sort(key=lambda x: x['avg_risk_score'])
-
-    top_classes = []
-    for rank, item in enumerate(class_rankings[:3], 1):
-        top_classes.append({
-            'rank': rank,
-            'name': f"{item['vc'].class_name}-{item['vc'].section}",
-            'teacher': item['vc'].teacher.get_full_name() or item['vc'].teacher.username,
-            'score': round(item['avg_risk_score'], 1)
-        })
-    
+
+def _render_teacher_dashboard(request, my_classes, notification_page, unread_count, pending_requests, top_classes):
     context = {
         'my_classes': my_classes,
-        'notifications': notifications,
+        'notifications': notification_page,
         'unread_count': unread_count,
         'pending_requests': pending_requests,
         'top_classes': top_classes,
     }
-    return render(request, 'health/teacher_dashboard.html', context)
\ No newline at end of file
+    return render(request, 'health/teacher_dashboard.html', context)
+
+
+# 📈 VITAL SERIES API (JSON)
+SERIES_RESOLUTIONS = {
+    'hour': TruncHour,
+    'day': TruncDay,
+}
+
+
+def _series_student(request, student_id):
+    """
+    The student whose series `request.user` may read, or None. Looked up once
+    per request: the condition() callbacks and the view all ask for it.
+    """
+    found = request.__dict__.setdefault('_series_students', {})
+    if student_id not in found:
+        found[student_id] = _find_series_student(request.user, student_id)
+    return found[student_id]
+
+
+def _find_series_student(user, student_id):
+    if getattr(user, 'is_student', False):
+        profile = getattr(user, 'student_profile', None)
+        return profile if profile and profile.id == student_id else None
+    if getattr(user, 'is_teacher', False):
+        return StudentProfile.objects.filter(id=student_id, user__school=user.school).first()
+    return None
+
+
+def _student_series_last_modified(request, student_id):
+    student = _series_student(request, student_id)
+    return student.latest_recorded_at if student else None
+
+
+def _student_series_etag(request, student_id):
+    student = _series_student(request, student_id)
+    if student is None:
+        return None
+    stamp = VitalRecord.objects.filter(student=student).version_stamp()
+    return series_etag('student', student.id, student.latest_vital_id, student.latest_recorded_at, *stamp)
+
+
+@login_required
+@require_GET
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=_student_series_etag, last_modified_func=_student_series_last_modified)
+def student_vital_series(request, student_id):
+    """
+    A student's vitals as chart series.
+      ?from=&to=       date or ISO datetime range
+      ?resolution=     raw (default, LTTB-downsampled to ?points=), hour or day (averages)
+      ?limit=N         only the N most recent raw readings
+    """
+    student = _series_student(request, student_id)
+    if student is None:
+        return JsonResponse({'error': 'Student not found.'}, status=404)
+
+    try:
+        start, end = parse_time_range(request.GET)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    resolution = request.GET.get('resolution', 'raw')
+    if resolution != 'raw' and resolution not in SERIES_RESOLUTIONS:
+        return JsonResponse({'error': f"Unknown resolution '{resolution}'."}, status=400)
+
+    vitals = VitalRecord.objects.filter(student=student)
+    if start:
+        vitals = vitals.filter(recorded_at__gte=start)
+    if end:
+        vitals = vitals.filter(recorded_at__lt=end)
+
+    fields = ('heart_rate', 'spo2', 'temperature_c', 'prediction_score')
+    if resolution == 'raw':
+        limit = request.GET.get('limit')
+        if limit and limit.isdigit():
+            rows = list(vitals.order_by('-recorded_at', '-id').values('recorded_at', *fields)[:int(limit)])
+            rows.reverse()
+        else:
+            rows = list(vitals.order_by('recorded_at', 'id').values('recorded_at', *fields))
+            rows = downsample(rows, fields[:3], point_budget(request.GET.get('points')))
+        label_format = "%d %b %H:%M"
+    else:
+        buckets = (
+            vitals.annotate(bucket=SERIES_RESOLUTIONS[resolution]('recorded_at'))
+            .values('bucket')
+            .annotate(**{f'avg_{field}': Avg(field) for field in fields})
+            .order_by('bucket')
+        )
+        rows = [
+            {'recorded_at': b['bucket'], **{field: b[f'avg_{field}'] for field in fields}}
+            for b in buckets
+        ]
+        label_format = "%d %b %H:00" if resolution == 'hour' else "%d %b %Y"
+
+    def rounded(value):
+        return round(value, 1) if value is not None else None
+
+    return JsonResponse({
+        'student_id': student.id,
+        'resolution': resolution,
+        'timestamps': [row['recorded_at'].isoformat() for row in rows],
+        'labels': [row['recorded_at'].strftime(label_format) for row in rows],
+        'hr_data': [rounded(row['heart_rate']) for row in rows],
+        'spo2_data': [rounded(row['spo2']) for row in rows],
+        'temp_data': [rounded(row['temperature_c']) for row in rows],
+        'score_data': [rounded(row['prediction_score']) for row in rows],
+    })
+
+
+# 🖼️ SERVER-RENDERED STUDENT CHARTS (SVG)
+# chart -> number of most recent readings drawn (None: the whole history, LTTB-downsampled)
+STUDENT_CHARTS = {
+    'recent': 30,
+    'history': None,
+    'score': 30,
+}
+
+
+def _render_student_chart(student, chart, size):
+    vitals = VitalRecord.objects.filter(student=student)
+    fields = ('heart_rate', 'spo2', 'temperature_c', 'prediction_score')
+    limit = STUDENT_CHARTS[chart]
+    if limit:
+        rows = list(vitals.order_by('-recorded_at', '-id').values('recorded_at', *fields)[:limit])
+        rows.reverse()
+    else:
+        rows = list(vitals.order_by('recorded_at', 'id').values('recorded_at', *fields))
+
+    if chart == 'score':
+        return charts.sparkline_svg([row['prediction_score'] for row in rows], size)
+    return charts.line_chart_svg(
+        [row['recorded_at'].strftime("%d %b") for row in rows],
+        [
+            ('Heart Rate (bpm)', [row['heart_rate'] for row in rows], charts.COLOR_DANGER),
+            ('SpO₂ (%)', [row['spo2'] for row in rows], charts.COLOR_SUCCESS),
+            ('Temperature (°C)', [row['temperature_c'] for row in rows], charts.COLOR_PRIMARY),
+        ],
+        size,
+    )
+
+
+@login_required
+@require_GET
+def student_vital_chart(request, student_id, chart):
+    """
+    A student's vitals drawn as SVG: 'recent' and 'history' line charts or a
+    'score' sparkline, ?size=sm|md|lg. Link it with ?v=student_chart_version()
+    to let the browser keep it until the next reading.
+    """
+    student = _series_student(request, student_id)
+    if student is None or chart not in STUDENT_CHARTS:
+        return JsonResponse({'error': 'Chart not found.'}, status=404)
+    size = request.GET.get('size', charts.DEFAULT_CHART_SIZE)
+    if size not in charts.CHART_SIZES:
+        return JsonResponse({'error': f"Unknown size '{size}'."}, status=400)
+
+    version = charts.student_chart_version(student)
+    return charts.chart_response(request, version, lambda: charts.cached_chart(
+        f'student-{chart}', student.id, version, size,
+        lambda: _render_student_chart(student, chart, size),
+    ))
+
+
+# 📤 SCHOOL VITALS EXPORT (streamed)
+EXPORT_CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+
+@login_required
+@require_GET
+def export_school_vitals(request):
+    """
+    Stream every vital of the teacher's school (?format=csv|parquet,
+    ?from=&to=). Staff may pick any school with ?school=<school_code>.
+    """
+    user = request.user
+    if user.is_staff and request.GET.get('school'):
+        school = get_object_or_404(School, school_code=request.GET['school'])
+    elif getattr(user, 'is_teacher', False) and user.school_id:
+        school = user.school
+    else:
+        return JsonResponse({'error': 'Only teachers can export their school.'}, status=403)
+
+    fmt = request.GET.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS:
+        return HttpResponseBadRequest(f"Unknown format '{fmt}'.")
+    if fmt == 'parquet' and not parquet_available():
+        return HttpResponseBadRequest("Parquet export is not available on this server (pyarrow missing).")
+    try:
+        start, end = parse_time_range(request.GET)
+    except ValueError as e:
+        return HttpResponseBadRequest(str(e))
+
+    chunks = iter_export(fmt, export_rows(school, start, end))
+    if isinstance(request, ASGIRequest):
+        chunks = iterate_in_thread(chunks)
+    response = StreamingHttpResponse(chunks, content_type=EXPORT_CONTENT_TYPES[fmt])
+    response['Content-Disposition'] = f'attachment; filename="vitals-{school.school_code}.{fmt}"'
+    return response
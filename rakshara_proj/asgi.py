@@ -12,5 +12,11 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'rakshara_proj.settings')
+os.environ.setdefault('ASYNC_DASHBOARDS', 'True')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# The live classroom board streams outside Django's middleware (see classroom.asgi)
+from classroom.asgi import LiveBoardRouter  # noqa: E402  (needs the app registry loaded above)
+
+application = LiveBoardRouter(django_application)